@@ -1,8 +1,8 @@
-try:
-    from scipy import stats
-    SCIPY_AVAILABLE = True
-except ImportError:
-    SCIPY_AVAILABLE = False
+import importlib.util
+
+# scipy.stats n'est importé qu'à la première utilisation
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+if not SCIPY_AVAILABLE:
     print("Warning: scipy not available, using fallback statistical methods")
 
 import numpy as np
@@ -16,6 +16,11 @@ import json
 from .metrics import MetricType, StatisticalMethod
 from .corrections import MultipleTestingCorrection
 from ..utils.json_encoder import clean_json_nan
+from ..utils.progress import ProgressTracker, JobCancelledError
+from ..utils.data_profile import DataProfile
+from ..utils.lazy_import import LazyModule
+
+stats = LazyModule("scipy.stats")
 
 from ..models import (
     AnalysisRequest, AnalysisResult, MetricResult, OverallResults,
@@ -64,7 +69,8 @@ class ABTestAnalyzer:
         metrics_config: List[Dict[str, Any]],
         variation_column: str,
         user_column: Optional[str] = None,
-        data_type: str = "aggregated"
+        data_type: str = "aggregated",
+        progress: Optional[ProgressTracker] = None
     ) -> Dict[str, Any]:
         """
         Main analysis method
@@ -74,19 +80,68 @@ class ABTestAnalyzer:
             metrics_config: Configuration for metrics to analyze
             variation_column: Column containing variation labels
             user_column: Column containing user identifiers
+            progress: Optional tracker updated at each stage and metric
+            
+        Returns:
+            Complete analysis results
+        """
+        return self.analyze_frame(
+            pd.DataFrame(data),
+            metrics_config,
+            variation_column,
+            user_column,
+            data_type,
+            progress
+        )
+    
+    def analyze_frame(
+        self,
+        df: pd.DataFrame,
+        metrics_config: List[Dict[str, Any]],
+        variation_column: str,
+        user_column: Optional[str] = None,
+        data_type: str = "aggregated",
+        progress: Optional[ProgressTracker] = None,
+        profile: Optional[DataProfile] = None
+    ) -> Dict[str, Any]:
+        """
+        Main analysis method on an already built (cleaned) DataFrame
+        
+        Args:
+            df: Data to analyze (left untouched)
+            metrics_config: Configuration for metrics to analyze
+            variation_column: Column containing variation labels
+            user_column: Column containing user identifiers
+            progress: Optional tracker updated at each stage and metric
+            profile: Optional column profile of df (ignored if df differs)
             
         Returns:
             Complete analysis results
         """
         start_time = time.time()
+        progress = progress or ProgressTracker()
+        if profile is not None and (profile.row_count != len(df) or profile.columns != list(df.columns)):
+            profile = None
         
         try:
-            # Convert data to DataFrame
-            df = pd.DataFrame(data)
+            progress.start_stage("validation")
+            
+            # Copie superficielle: la colonne de variation est remplacée, pas modifiée sur place
+            df = df.copy(deep=False)
+            
+            # Profil utilisable pour la détection des dimensions (variations inchangées)
+            dimension_profile = profile
             
             # Clean variation column: strip whitespace and quotes
             if variation_column in df.columns and df[variation_column].dtype == 'object':
+                original_variations = df[variation_column]
                 df[variation_column] = df[variation_column].str.strip().str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+                # Les valeurs non textuelles deviennent NaN: le profil n'est alors plus à jour
+                if profile is not None and profile.missing_counts[variation_column] != df[variation_column].isnull().sum():
+                    profile = None
+                # Variations renommées: la couverture par variation du profil n'est plus exacte
+                if profile is None or not df[variation_column].equals(original_variations):
+                    dimension_profile = None
             
             # Validate data structure
             self._validate_data(df, variation_column, user_column)
@@ -102,31 +157,37 @@ class ABTestAnalyzer:
             
             
             # Identify dimension columns for filtering
-            dimension_columns = self._identify_dimension_columns(df, variation_column, user_column)
+            progress.start_stage("dimension_detection")
+            dimension_columns = self._identify_dimension_columns(df, variation_column, user_column, dimension_profile)
             
             # Calculate metrics for each configured metric
             metric_results = []
             warnings = []
             recommendations = []
             
+            progress.start_stage("metrics", total_steps=len(metrics_config))
             for metric_config in metrics_config:
-                try:
-                    result = self._analyze_metric(
-                        df, metric_config, variation_column, 
-                        control_variation, treatment_variations, user_column,
-                        data_type
-                    )
-                    metric_results.append(result)
-                except Exception as e:
-                    import traceback
-                    pass  # Error already logged
-                    warnings.append(f"Failed to analyze metric '{getattr(metric_config, 'name', 'Unknown')}': {str(e)}")
-                    continue
+                # Point d'annulation coopératif entre les métriques
+                progress.checkpoint()
+                with progress.step(getattr(metric_config, 'name', 'Unknown')):
+                    try:
+                        result = self._analyze_metric(
+                            df, metric_config, variation_column, 
+                            control_variation, treatment_variations, user_column,
+                            data_type
+                        )
+                        metric_results.append(result)
+                    except Exception as e:
+                        import traceback
+                        pass  # Error already logged
+                        warnings.append(f"Failed to analyze metric '{getattr(metric_config, 'name', 'Unknown')}': {str(e)}")
+                        continue
             
             if not metric_results:
                 raise ValueError("No metrics could be analyzed successfully")
             
             # Apply multiple testing correction
+            progress.start_stage("correction")
             if self.multiple_testing_correction != MultipleTestingCorrection.NONE:
                 metric_results, adjusted_alpha = self.correction_handler.apply_correction(
                     metric_results, self.multiple_testing_correction, self.alpha
@@ -135,9 +196,10 @@ class ABTestAnalyzer:
                 adjusted_alpha = None
             
             # Calculate overall results
+            progress.start_stage("summary")
             overall_results = self._calculate_overall_results(
                 df, variation_column, control_variation, treatment_variations,
-                metric_results, adjusted_alpha, data_type
+                metric_results, adjusted_alpha, data_type, profile
             )
             
             # Generate recommendations
@@ -160,6 +222,8 @@ class ABTestAnalyzer:
                 }
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             raise RuntimeError(f"Analysis failed: {str(e)}")
     
@@ -195,8 +259,21 @@ class ABTestAnalyzer:
         # Default to first alphabetically
         return sorted(variations)[0]
     
-    def _identify_dimension_columns(self, df: pd.DataFrame, variation_column: str, user_column: Optional[str] = None) -> Dict[str, Any]:
-        """Identify dimension columns that can be used for filtering"""
+    def _identify_dimension_columns(
+        self,
+        df: pd.DataFrame,
+        variation_column: str,
+        user_column: Optional[str] = None,
+        profile: Optional[DataProfile] = None
+    ) -> Dict[str, Any]:
+        """
+        Identify dimension columns that can be used for filtering.
+        With an exact profile of df grouped by variation_column, distinct values
+        and per-variation coverage are read from it instead of scanning each column.
+        """
+        column_stats = None
+        if profile is not None and profile.exact and profile.group_column == variation_column:
+            column_stats = profile.column_stats()
         
         # Columns to exclude from dimensions (system columns and metrics)
         excluded_columns = {variation_column}
@@ -205,6 +282,7 @@ class ABTestAnalyzer:
         
         # Get variation values to exclude them from dimension values
         variation_values = set(df[variation_column].dropna().astype(str).unique()) if variation_column in df.columns else set()
+        variation_unique_count = df[variation_column].nunique(dropna=False) if variation_column in df.columns else 0
         
         # Common metric column patterns to exclude
         metric_patterns = [
@@ -235,7 +313,16 @@ class ABTestAnalyzer:
             
             # Check if it's a categorical dimension
             if df[column].dtype == 'object' or df[column].dtype.name == 'category':
-                unique_values = df[column].dropna().astype(str).unique()
+                stats = column_stats.get(column) if column_stats is not None else None
+                if stats is not None and stats['unique_values'] - len(variation_values) > 50:
+                    # Trop de valeurs distinctes, même après retrait des variations
+                    continue
+                
+                if stats is not None and 'values' in stats:
+                    unique_values = list(dict.fromkeys(str(v) for v in stats['values']))
+                else:
+                    stats = None
+                    unique_values = df[column].dropna().astype(str).unique()
                 
                 # Filter out variation values that might appear in this column
                 dimension_values = [v for v in unique_values if str(v) not in variation_values]
@@ -244,7 +331,11 @@ class ABTestAnalyzer:
                 if 2 <= len(dimension_values) <= 50:
                     # Additional check: ensure it's actually a dimension column
                     # by checking if values are consistent across variations
-                    is_dimension = self._validate_dimension_column(df, column, variation_column)
+                    if stats is not None:
+                        column_unique_count = stats['unique_values'] + (1 if stats['missing_count'] else 0)
+                        is_dimension = stats['max_groups_per_value'] > 1 and column_unique_count != variation_unique_count
+                    else:
+                        is_dimension = self._validate_dimension_column(df, column, variation_column)
                     
                     if is_dimension:
                         dimension_columns[column] = {
@@ -297,7 +388,8 @@ class ABTestAnalyzer:
         variation_column: str,
         filters: Dict[str, List[str]] = None,
         user_column: Optional[str] = None,
-        data_type: str = "aggregated"
+        data_type: str = "aggregated",
+        progress: Optional[ProgressTracker] = None
     ) -> Dict[str, Any]:
         """
         Perform analysis with applied filters
@@ -309,31 +401,65 @@ class ABTestAnalyzer:
             filters: Dictionary of column -> list of values to filter by
             user_column: Column containing user identifiers
             data_type: Type of data (aggregated or raw)
+            progress: Optional tracker updated at each stage and metric
             
         Returns:
             Complete analysis results for filtered data
         """
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
+        return self.analyze_frame_with_filters(
+            pd.DataFrame(data),
+            metrics_config,
+            variation_column,
+            filters,
+            user_column,
+            data_type,
+            progress
+        )
+    
+    def analyze_frame_with_filters(
+        self,
+        df: pd.DataFrame,
+        metrics_config: List[Dict[str, Any]],
+        variation_column: str,
+        filters: Dict[str, List[str]] = None,
+        user_column: Optional[str] = None,
+        data_type: str = "aggregated",
+        progress: Optional[ProgressTracker] = None,
+        profile: Optional[DataProfile] = None
+    ) -> Dict[str, Any]:
+        """
+        Perform analysis with applied filters on a DataFrame
         
+        Args:
+            df: Data to analyze (left untouched)
+            metrics_config: Configuration for metrics to analyze
+            variation_column: Column containing variation labels
+            filters: Dictionary of column -> list of values to filter by
+            user_column: Column containing user identifiers
+            data_type: Type of data (aggregated or raw)
+            progress: Optional tracker updated at each stage and metric
+            profile: Optional column profile of df (unused if filters remove rows)
+            
+        Returns:
+            Complete analysis results for filtered data
+        """
         # Apply filters if provided
         if filters:
-            df = self._apply_dimension_filters(df, filters)
+            df = self._apply_dimension_filters(df, filters).reset_index(drop=True)
         
-        # Convert back to list of dicts and run regular analysis
-        filtered_data = df.to_dict('records')
-        
-        return self.analyze(
-            filtered_data,
+        return self.analyze_frame(
+            df,
             metrics_config,
             variation_column,
             user_column,
-            data_type
+            data_type,
+            progress,
+            profile
         )
     
     def _apply_dimension_filters(self, df: pd.DataFrame, filters: Dict[str, List[str]]) -> pd.DataFrame:
-        """Apply dimension filters to dataframe"""
-        filtered_df = df.copy()
+        """Apply dimension filters to dataframe (boolean indexing already returns new frames)"""
+        filtered_df = df
         
         for column, values in filters.items():
             if column in df.columns and values:
@@ -459,7 +585,8 @@ class ABTestAnalyzer:
         treatment_variations: List[str],
         metric_results: List[Dict[str, Any]],
         adjusted_alpha: Optional[float],
-        data_type: str = "aggregated"
+        data_type: str = "aggregated",
+        profile: Optional[DataProfile] = None
     ) -> Dict[str, Any]:
         """Calculate overall analysis results for multiple variations"""
         
@@ -492,8 +619,10 @@ class ABTestAnalyzer:
             })
         
         # Calculate data quality metrics
-        total_cells = len(df) * len(df.columns)
-        missing_cells = df.isnull().sum().sum()
+        # Réutiliser le profil calculé au nettoyage
+        profile = profile or DataProfile(df)
+        total_cells = profile.total_cells
+        missing_cells = profile.missing_cells
         missing_percentage = (missing_cells / total_cells) * 100
         data_quality_score = max(0.0, 1.0 - (missing_percentage / 100))
         
@@ -1,8 +1,10 @@
 import numpy as np
 from typing import List, Dict, Any, Tuple
-from scipy.stats import false_discovery_control
 
 from ..models import MultipleTestingCorrection
+from ..utils.lazy_import import LazyModule
+
+stats = LazyModule("scipy.stats")
 
 class MultipleTestingCorrector:
     """Handler for multiple testing corrections"""
@@ -76,7 +78,7 @@ class MultipleTestingCorrector:
         
         try:
             # Use scipy's FDR control
-            rejected, adjusted_p_values = false_discovery_control(
+            rejected, adjusted_p_values = stats.false_discovery_control(
                 p_values, 
                 alpha=original_alpha, 
                 method='bh'
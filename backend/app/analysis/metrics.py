@@ -1,11 +1,12 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
-from scipy import stats
-from scipy.stats import bootstrap
 import warnings
 
 from ..models import MetricType, StatisticalMethod
+from ..utils.lazy_import import LazyModule
+
+stats = LazyModule("scipy.stats")
 
 class MetricCalculator:
     """Calculator for different types of metrics"""
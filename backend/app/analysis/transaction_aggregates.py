@@ -0,0 +1,240 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, Optional, Set, Tuple
+import logging
+
+from ..utils.fingerprint import (
+    transaction_row_hashes,
+    reduce_row_hashes,
+    combine_fingerprint_parts,
+    format_transaction_fingerprint
+)
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMN_CANDIDATES = ['user_id', 'customer_id', 'visitor_id', 'session_id']
+
+
+def find_user_column(columns) -> str:
+    """User identifier column of a transaction frame (transaction_id as a proxy if none)"""
+    for col in USER_COLUMN_CANDIDATES:
+        if col in columns:
+            return col
+    return 'transaction_id'
+
+
+def build_variation_table(
+    transaction_df: pd.DataFrame,
+    row_hashes: Optional[np.ndarray] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Group transactions by variation in a single pass.
+
+    Returns, per variation (in order of first appearance): transaction count,
+    revenue sum, sum of squares, sample variance and the sorted revenue array.
+    Every revenue metric reads from this table instead of re-masking the
+    transactions. Sorting makes the arrays (and the bootstrap drawn from them)
+    independent of the upload order of the transactions.
+
+    With row_hashes, each variation also gets the fingerprint of its own rows,
+    so results that only involve unchanged variations can be reused.
+    """
+    codes, variations = pd.factorize(transaction_df['variation'], sort=False)
+    revenue = transaction_df['revenue'].to_numpy(dtype=float)
+    n_variations = len(variations)
+
+    counts = np.bincount(codes, minlength=n_variations)
+    sums = np.bincount(codes, weights=revenue, minlength=n_variations)
+    sums_sq = np.bincount(codes, weights=revenue * revenue, minlength=n_variations)
+
+    # Tri par (variation, revenue): chaque variation est une tranche contiguë
+    order = np.lexsort((revenue, codes))
+    sorted_revenue = revenue[order]
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    sorted_hashes = row_hashes[order] if row_hashes is not None else None
+
+    table = {}
+    for i, variation in enumerate(variations):
+        revenues = sorted_revenue[bounds[i]:bounds[i + 1]]
+        count = int(counts[i])
+        table[variation] = {
+            'count': count,
+            'sum': float(sums[i]),
+            'sum_sq': float(sums_sq[i]),
+            'var': float(np.var(revenues, ddof=1)) if count > 1 else float('nan'),
+            'revenues': revenues
+        }
+        if sorted_hashes is not None:
+            parts = reduce_row_hashes(sorted_hashes[bounds[i]:bounds[i + 1]])
+            table[variation]['fingerprint_parts'] = parts
+            table[variation]['fingerprint'] = format_transaction_fingerprint(parts)
+
+    return table
+
+
+def _isin_sorted(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Membership of values in a sorted array via binary search"""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+def _merge_sorted(sorted_values: np.ndarray, new_sorted_values: np.ndarray) -> np.ndarray:
+    """Merge two sorted arrays in O(n + m)"""
+    return np.insert(sorted_values, np.searchsorted(sorted_values, new_sorted_values), new_sorted_values)
+
+
+class TransactionIdIndex:
+    """
+    Set of transaction ids stored as sorted 64-bit hashes.
+
+    New ids go to a small sorted buffer that is merged into the main array once
+    it grows past a fraction of it, so checking and registering m new ids costs
+    O(m log n) amortized instead of rebuilding the index.
+    """
+
+    MERGE_RATIO = 0.125
+    MIN_BUFFER = 4096
+
+    def __init__(self):
+        self._main = np.empty(0, dtype=np.uint64)
+        self._buffer = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._main) + len(self._buffer)
+
+    @staticmethod
+    def hash_ids(transaction_ids: pd.Series) -> np.ndarray:
+        return pd.util.hash_array(transaction_ids.astype(str).to_numpy(dtype=object))
+
+    def add_new(self, transaction_ids: pd.Series) -> np.ndarray:
+        """
+        Register unseen ids and return the mask of rows to keep: ids not already
+        indexed, first occurrence only within the batch.
+        """
+        hashes = self.hash_ids(transaction_ids)
+
+        first_occurrence = np.zeros(len(hashes), dtype=bool)
+        first_occurrence[np.unique(hashes, return_index=True)[1]] = True
+
+        keep = first_occurrence & ~(_isin_sorted(self._main, hashes) | _isin_sorted(self._buffer, hashes))
+        self._insert(np.sort(hashes[keep]))
+        return keep
+
+    def _insert(self, sorted_hashes: np.ndarray):
+        self._buffer = _merge_sorted(self._buffer, sorted_hashes)
+        if len(self._buffer) > max(self.MERGE_RATIO * len(self._main), self.MIN_BUFFER):
+            self._main = _merge_sorted(self._main, self._buffer)
+            self._buffer = np.empty(0, dtype=np.uint64)
+
+
+class TransactionAggregates:
+    """
+    Incrementally maintained aggregates of a cached transaction upload.
+
+    Holds the per-variation table (see build_variation_table), per-variation
+    sufficient statistics of revenue per purchasing user, the running total of
+    each user and a hash index of transaction ids. append() folds new orders in
+    at a cost proportional to their number (plus the merge of the sorted
+    revenue arrays of the variations they touch).
+    """
+
+    def __init__(self, transaction_df: pd.DataFrame):
+        self.user_column = find_user_column(transaction_df.columns)
+
+        row_hashes = transaction_row_hashes(transaction_df, self.user_column)
+        self.variation_table = build_variation_table(transaction_df, row_hashes)
+        self._fingerprint_parts = reduce_row_hashes(row_hashes)
+
+        self.id_index = TransactionIdIndex()
+        self.id_index.add_new(transaction_df['transaction_id'])
+
+        # Total par (utilisateur, variation), clés normalisées en texte
+        totals = transaction_df.groupby(
+            [self.user_column, 'variation'], observed=True, sort=False
+        )['revenue'].sum()
+        self.user_totals: Dict[Tuple[str, str], float] = {
+            (str(user), str(variation)): float(total)
+            for (user, variation), total in totals.items()
+        }
+
+        self.user_variation_table: Dict[str, Dict[str, float]] = {}
+        for (_, variation), total in self.user_totals.items():
+            self._add_user_total(variation, None, total)
+
+    @property
+    def row_count(self) -> int:
+        return self._fingerprint_parts[0]
+
+    @property
+    def user_count(self) -> int:
+        return len(self.user_totals)
+
+    @property
+    def transaction_hash(self) -> str:
+        return format_transaction_fingerprint(self._fingerprint_parts)
+
+    def append(self, transaction_df: pd.DataFrame) -> Tuple[pd.DataFrame, Set[str]]:
+        """
+        Fold new transactions into the aggregates.
+
+        Rows whose transaction_id is already known (or repeated in the batch)
+        are skipped.
+
+        Returns:
+            Tuple of the rows actually added and the variations they touched
+        """
+        if self.user_column not in transaction_df.columns:
+            raise ValueError(f"Appended transactions must include the '{self.user_column}' column")
+
+        keep = self.id_index.add_new(transaction_df['transaction_id'])
+        added = transaction_df[keep].reset_index(drop=True)
+        skipped = len(transaction_df) - len(added)
+        if skipped:
+            logger.info(f"Skipped {skipped} already known transactions")
+        if added.empty:
+            return added, set()
+
+        row_hashes = transaction_row_hashes(added, self.user_column)
+        self._fingerprint_parts = combine_fingerprint_parts(
+            self._fingerprint_parts, reduce_row_hashes(row_hashes)
+        )
+
+        added_table = build_variation_table(added, row_hashes)
+        for variation, delta in added_table.items():
+            current = self.variation_table.get(variation)
+            if current is None:
+                self.variation_table[variation] = delta
+                continue
+
+            revenues = _merge_sorted(current['revenues'], delta['revenues'])
+            count = current['count'] + delta['count']
+            parts = combine_fingerprint_parts(current['fingerprint_parts'], delta['fingerprint_parts'])
+            self.variation_table[variation] = {
+                'count': count,
+                'sum': current['sum'] + delta['sum'],
+                'sum_sq': current['sum_sq'] + delta['sum_sq'],
+                'var': float(np.var(revenues, ddof=1)) if count > 1 else float('nan'),
+                'revenues': revenues,
+                'fingerprint_parts': parts,
+                'fingerprint': format_transaction_fingerprint(parts)
+            }
+
+        totals = added.groupby([self.user_column, 'variation'], observed=True, sort=False)['revenue'].sum()
+        for (user, variation), revenue in totals.items():
+            key = (str(user), str(variation))
+            previous = self.user_totals.get(key)
+            self.user_totals[key] = (previous or 0.0) + float(revenue)
+            self._add_user_total(key[1], previous, self.user_totals[key])
+
+        return added, set(added_table.keys())
+
+    def _add_user_total(self, variation: str, previous: Optional[float], total: float):
+        """Update purchaser statistics when a user's total goes from previous (None = new) to total"""
+        stats = self.user_variation_table.setdefault(variation, {'purchasers': 0, 'sum': 0.0, 'sum_sq': 0.0})
+        if previous is None:
+            stats['purchasers'] += 1
+            previous = 0.0
+        stats['sum'] += total - previous
+        stats['sum_sq'] += total * total - previous * previous
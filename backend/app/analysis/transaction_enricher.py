@@ -1,10 +1,17 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
-from scipy import stats
-from scipy.stats import bootstrap
 import logging
-import hashlib
+import copy
+
+from ..utils.progress import ProgressTracker, JobCancelledError
+from ..utils.fingerprint import transaction_row_hashes, reduce_row_hashes, format_transaction_fingerprint
+from ..utils.result_cache import LRUCache
+from ..utils.transaction_store import prepare_transaction_frame
+from ..utils.lazy_import import LazyModule
+from .transaction_aggregates import TransactionAggregates, build_variation_table, find_user_column
+
+stats = LazyModule("scipy.stats")
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +22,40 @@ class TransactionEnricher:
     VERSION CORRIGÉE avec calculs statistiques fiables
     """
     
-    def __init__(self, original_results: Dict[str, Any], transaction_data: List[Dict[str, Any]]):
+    def __init__(
+        self,
+        original_results: Dict[str, Any],
+        transaction_data: Optional[List[Dict[str, Any]]] = None,
+        progress: Optional[ProgressTracker] = None,
+        cache: Optional[LRUCache] = None,
+        transaction_frame: Optional[pd.DataFrame] = None,
+        aggregates: Optional[TransactionAggregates] = None
+    ):
         """
         Initialize the enricher with original results and transaction data.
         
         Args:
             original_results: Original analysis results from analyzer
             transaction_data: List of transaction records with required columns
+                (not needed when transaction_frame is given)
+            progress: Optional tracker updated at each enrichment stage and metric
+            cache: Optional LRU cache shared between enrichments, holding user
+                aggregations and enriched metrics keyed by transaction fingerprint
+            transaction_frame: Optional frame already prepared by
+                prepare_transaction_frame (e.g. from the transaction cache)
+            aggregates: Optional incrementally maintained aggregates of the cached
+                transactions, used instead of any transaction frame
         """
         self.original_results = original_results
         self.transaction_data = transaction_data
-        self.transaction_df = None
+        self.transaction_df = transaction_frame
+        self.variation_table = None
+        self.user_variation_table = None
+        self._user_table_source = None
         self.enriched_results = None
+        self.progress = progress or ProgressTracker()
+        self.cache = cache
+        self.aggregates = aggregates
         
         # Extract statistical configuration from original results
         self.confidence_level = original_results.get('configuration', {}).get('confidence_level', 95.0)
@@ -46,8 +75,14 @@ class TransactionEnricher:
         # Les variation breakdown actuels à utiliser pour les calculs (peut être filtré)
         self.current_variation_breakdown = self.original_variation_breakdown.copy()
         
-        # Create transaction data hash for caching
-        self.transaction_hash = self._create_transaction_hash(transaction_data)
+        # Empreinte des transactions (calculée sur les colonnes typées à la validation)
+        self.transaction_hash = None
+        
+        # Agrégats incrémentaux: pas de frame à valider ni à agréger
+        if aggregates is not None:
+            self.variation_table = aggregates.variation_table
+            self.user_variation_table = aggregates.user_variation_table
+            self.transaction_hash = aggregates.transaction_hash
         
     def validate_transaction_data(self) -> bool:
         """
@@ -57,37 +92,14 @@ class TransactionEnricher:
             bool: True if validation passes, False otherwise
         """
         try:
-            # Convert to DataFrame
-            self.transaction_df = pd.DataFrame(self.transaction_data)
-            
-            # Check required columns
-            required_columns = ['transaction_id', 'variation', 'revenue']
-            missing_columns = [col for col in required_columns if col not in self.transaction_df.columns]
-            
-            if missing_columns:
-                logger.error(f"Missing required columns: {missing_columns}")
-                return False
-            
-            # Add quantity column if missing (default to 1)
-            if 'quantity' not in self.transaction_df.columns:
-                self.transaction_df['quantity'] = 1
-                logger.info("Added default quantity column (value=1)")
-            
-            # Clean and validate data types
-            self.transaction_df['revenue'] = pd.to_numeric(self.transaction_df['revenue'], errors='coerce')
-            self.transaction_df['quantity'] = pd.to_numeric(self.transaction_df['quantity'], errors='coerce').fillna(1)
-            
-            # Remove rows with invalid revenue
-            initial_count = len(self.transaction_df)
-            self.transaction_df = self.transaction_df.dropna(subset=['revenue'])
-            final_count = len(self.transaction_df)
-            
-            if initial_count != final_count:
-                logger.warning(f"Removed {initial_count - final_count} rows with invalid revenue values")
-            
-            # Clean variation column (important pour la cohérence)
-            if 'variation' in self.transaction_df.columns:
-                self.transaction_df['variation'] = self.transaction_df['variation'].astype(str).str.strip()
+            # Les données déjà typées (cache de transactions) ne sont pas reconstruites
+            if self.transaction_df is None:
+                initial_count = len(self.transaction_data or [])
+                self.transaction_df = prepare_transaction_frame(self.transaction_data or [])
+                final_count = len(self.transaction_df)
+                
+                if initial_count != final_count:
+                    logger.warning(f"Removed {initial_count - final_count} rows with invalid revenue values")
             
             # Validate variations match original analysis
             original_variations = set()
@@ -97,7 +109,13 @@ class TransactionEnricher:
                         for var_stat in metric['variation_stats']:
                             original_variations.add(var_stat['variation'])
             
-            transaction_variations = set(self.transaction_df['variation'].unique())
+            # Empreinte indépendante de l'ordre des lignes (utilisateurs compris), utilisable
+            # comme clé de cache, et statistiques par variation (avec leur propre empreinte)
+            row_hashes = transaction_row_hashes(self.transaction_df, find_user_column(self.transaction_df.columns))
+            self.transaction_hash = format_transaction_fingerprint(reduce_row_hashes(row_hashes))
+            self.variation_table = build_variation_table(self.transaction_df, row_hashes)
+            
+            transaction_variations = set(self.variation_table.keys())
             missing_variations = original_variations - transaction_variations
             
             if missing_variations:
@@ -112,21 +130,49 @@ class TransactionEnricher:
             logger.error(f"Transaction data validation failed: {str(e)}")
             return False
     
-    def _create_transaction_hash(self, transaction_data: List[Dict[str, Any]]) -> str:
+    def _get_user_variation_table(self, user_data: pd.DataFrame) -> Dict[str, Dict[str, float]]:
         """
-        Create a hash of transaction data for caching purposes.
+        Per-variation sufficient statistics of revenue per purchasing user:
+        number of purchasers, sum and sum of squares of their total revenue.
+        Built once per user aggregation and shared by all RPU metrics.
         """
-        try:
-            # Create a stable string representation of the data
-            data_str = str(sorted([
-                (item.get('transaction_id', ''), item.get('variation', ''), 
-                 item.get('revenue', 0), item.get('quantity', 1))
-                for item in transaction_data
-            ]))
-            return hashlib.md5(data_str.encode()).hexdigest()
-        except Exception as e:
-            logger.warning(f"Failed to create transaction hash: {str(e)}")
-            return "unknown"
+        if user_data is None:
+            # Agrégats incrémentaux: la table est maintenue par TransactionAggregates
+            return self.user_variation_table
+        
+        if self.user_variation_table is None or self._user_table_source is not user_data:
+            codes, variations = pd.factorize(user_data['variation'], sort=False)
+            user_revenue = user_data['total_revenue'].to_numpy(dtype=float)
+            n_variations = len(variations)
+            
+            purchasers = np.bincount(codes, minlength=n_variations)
+            sums = np.bincount(codes, weights=user_revenue, minlength=n_variations)
+            sums_sq = np.bincount(codes, weights=user_revenue * user_revenue, minlength=n_variations)
+            
+            self.user_variation_table = {
+                variation: {
+                    'purchasers': int(purchasers[i]),
+                    'sum': float(sums[i]),
+                    'sum_sq': float(sums_sq[i])
+                }
+                for i, variation in enumerate(variations)
+            }
+            self._user_table_source = user_data
+        
+        return self.user_variation_table
+    
+    def _rpu_moments(self, variation: str, total_users: int) -> Tuple[float, float]:
+        """
+        Mean and sum of squared deviations of revenue per user over ALL users of
+        a variation, non-purchasers counting as zeros, without materializing them:
+        SS = sum(x²) - (sum x)² / n, the zeros adding nothing to either sum.
+        """
+        user_stats = (self.user_variation_table or {}).get(variation, {'sum': 0.0, 'sum_sq': 0.0})
+        if total_users <= 0:
+            return 0.0, 0.0
+        mean = user_stats['sum'] / total_users
+        sum_sq_dev = max(user_stats['sum_sq'] - user_stats['sum'] * mean, 0.0)
+        return mean, sum_sq_dev
     
     def validate_data_consistency(self) -> Dict[str, Any]:
         """
@@ -139,7 +185,7 @@ class TransactionEnricher:
         try:
             # Vérifier que toutes les variations existent
             original_variations = set(self.original_variation_breakdown.keys())
-            transaction_variations = set(self.transaction_df['variation'].unique())
+            transaction_variations = set(self.variation_table.keys())
             
             missing_in_transaction = original_variations - transaction_variations
             if missing_in_transaction:
@@ -149,22 +195,32 @@ class TransactionEnricher:
             if extra_in_transaction:
                 warnings.append(f"Extra variations in transaction data (will be ignored): {extra_in_transaction}")
             
+            # Compter les utilisateurs uniques par variation en un seul groupby
+            user_column = None
+            if self.aggregates is not None:
+                # Acheteurs distincts déjà comptés par les agrégats incrémentaux
+                if self.aggregates.user_column in ('user_id', 'customer_id'):
+                    user_column = self.aggregates.user_column
+                    users_per_variation = {
+                        variation: stats['purchasers']
+                        for variation, stats in self.user_variation_table.items()
+                    }
+            elif 'user_id' in self.transaction_df.columns:
+                user_column = 'user_id'
+            elif 'customer_id' in self.transaction_df.columns:
+                user_column = 'customer_id'
+            elif 'users' in self.transaction_df.columns:
+                user_column = 'users'
+            
+            if user_column and self.aggregates is None:
+                users_per_variation = self.transaction_df.groupby('variation', sort=False, observed=True)[user_column].nunique()
+            
             # Vérifier les ordres de grandeur
             for variation in original_variations & transaction_variations:
                 original_users = self.original_variation_breakdown[variation]
                 
-                # Compter les utilisateurs uniques dans les données transaction
-                user_column = None
-                if 'user_id' in self.transaction_df.columns:
-                    user_column = 'user_id'
-                elif 'customer_id' in self.transaction_df.columns:
-                    user_column = 'customer_id'
-                elif 'users' in self.transaction_df.columns:
-                    user_column = 'users'
-                
                 if user_column:
-                    variation_df = self.transaction_df[self.transaction_df['variation'] == variation]
-                    transaction_users = len(variation_df[user_column].unique())
+                    transaction_users = int(users_per_variation.get(variation, 0))
                     
                     # Ratio de conversion attendu : entre 0.1% et 30% typiquement
                     conversion_rate = transaction_users / original_users if original_users > 0 else 0
@@ -175,7 +231,7 @@ class TransactionEnricher:
                         warnings.append(f"Variation {variation}: very low conversion rate ({conversion_rate:.3%})")
                 
                 # Vérifier la distribution des transactions
-                variation_transactions = len(self.transaction_df[self.transaction_df['variation'] == variation])
+                variation_transactions = self.variation_table[variation]['count']
                 if variation_transactions < 10:
                     warnings.append(f"Variation {variation}: very few transactions ({variation_transactions}), statistical power may be limited")
             
@@ -224,20 +280,13 @@ class TransactionEnricher:
             pd.DataFrame: Aggregated data by user
         """
         try:
-            # Déterminer la colonne utilisateur
-            user_column = None
-            for col in ['user_id', 'customer_id', 'visitor_id', 'session_id']:
-                if col in self.transaction_df.columns:
-                    user_column = col
-                    break
-            
-            # Si pas de colonne user, utiliser transaction_id comme proxy
-            if user_column is None:
-                user_column = 'transaction_id'
+            # Déterminer la colonne utilisateur (transaction_id comme proxy si absente)
+            user_column = find_user_column(self.transaction_df.columns)
+            if user_column == 'transaction_id':
                 logger.warning("No user column found, using transaction_id as proxy")
             
             # Aggregate by user and variation
-            user_aggregated = self.transaction_df.groupby([user_column, 'variation']).agg({
+            user_aggregated = self.transaction_df.groupby([user_column, 'variation'], observed=True).agg({
                 'revenue': ['sum', 'count', 'mean'],
                 'quantity': 'sum',
                 'transaction_id': 'count'  # Compter les transactions par utilisateur
@@ -278,7 +327,7 @@ class TransactionEnricher:
             logger.info(f"Metric '{metric_name}' classified as type: {metric_type}")
             
             # Get control and treatment groups
-            variations = self.transaction_df['variation'].unique()
+            variations = list(self.variation_table.keys())
             control_variation = self._identify_control_variation(variations)
             
             # Calculate variation statistics
@@ -307,9 +356,13 @@ class TransactionEnricher:
                     continue
                 
                 # Perform statistical test avec les bonnes données
-                comparison = self._perform_statistical_test_v2(
-                    control_stats, stats, control_variation, 
-                    stats['variation'], metric_type
+                # (réutilisé tant que ni le contrôle ni la variante n'ont changé)
+                comparison = self._cached(
+                    self._comparison_cache_key(metric_type, control_variation, stats['variation']),
+                    lambda: self._perform_statistical_test_v2(
+                        control_stats, stats, control_variation,
+                        stats['variation'], metric_type
+                    )
                 )
                 
                 pairwise_comparisons.append(comparison)
@@ -343,9 +396,9 @@ class TransactionEnricher:
         VERSION CORRIGÉE: Calculate stats for revenue total metrics
         Pour les totaux de revenue, on reporte le total comme métrique principale
         """
-        variation_data = self.transaction_df[self.transaction_df['variation'] == variation]
+        variation_stats = self.variation_table.get(variation)
         
-        if len(variation_data) == 0:
+        if not variation_stats or variation_stats['count'] == 0:
             return {
                 'variation': variation,
                 'sample_size': 0,
@@ -355,13 +408,13 @@ class TransactionEnricher:
                 'transaction_count': 0
             }
         
-        total_revenue = float(variation_data['revenue'].sum())
-        transaction_count = len(variation_data)
+        total_revenue = variation_stats['sum']
+        transaction_count = variation_stats['count']
         
         # Pour les totaux, la moyenne n'est pas la métrique principale
         # mais on la calcule pour référence
-        mean_per_transaction = variation_data['revenue'].mean()
-        std_per_transaction = variation_data['revenue'].std()
+        mean_per_transaction = total_revenue / transaction_count
+        std_per_transaction = np.sqrt(variation_stats['var'])
         
         return {
             'variation': variation,
@@ -378,9 +431,9 @@ class TransactionEnricher:
         VERSION CORRIGÉE: Calculate AOV (Average Order Value) stats
         AOV = Total Revenue / Number of Orders
         """
-        variation_data = self.transaction_df[self.transaction_df['variation'] == variation]
+        variation_stats = self.variation_table.get(variation)
         
-        if len(variation_data) == 0:
+        if not variation_stats or variation_stats['count'] == 0:
             return {
                 'variation': variation,
                 'sample_size': 0,
@@ -390,14 +443,14 @@ class TransactionEnricher:
                 'transaction_count': 0
             }
         
-        total_revenue = float(variation_data['revenue'].sum())
-        transaction_count = len(variation_data)
+        total_revenue = variation_stats['sum']
+        transaction_count = variation_stats['count']
         
         # AOV = Total Revenue / Number of Transactions
         aov = total_revenue / transaction_count if transaction_count > 0 else 0
         
         # Standard deviation des valeurs de transaction
-        std = float(variation_data['revenue'].std()) if len(variation_data) > 1 else 0
+        std = float(np.sqrt(variation_stats['var'])) if transaction_count > 1 else 0
         
         logger.info(f"AOV for {variation}: €{aov:.2f} ({transaction_count} transactions)")
         
@@ -415,8 +468,8 @@ class TransactionEnricher:
         VERSION CORRIGÉE: Calculate RPU (Revenue Per User) stats
         RPU = Total Revenue / Total Users (incluant les non-acheteurs)
         """
-        variation_data = self.transaction_df[self.transaction_df['variation'] == variation]
-        user_variation_data = user_data[user_data['variation'] == variation]
+        variation_stats = self.variation_table.get(variation, {'count': 0, 'sum': 0.0})
+        user_stats = self._get_user_variation_table(user_data).get(variation, {'purchasers': 0})
         
         # Total users from CURRENT analysis (peut être filtré)
         total_users = self.current_variation_breakdown.get(variation, 0)
@@ -434,24 +487,19 @@ class TransactionEnricher:
                 'transaction_count': 0
             }
         
-        total_revenue = float(variation_data['revenue'].sum())
-        transaction_count = len(variation_data)
-        users_with_purchases = len(user_variation_data)
+        total_revenue = variation_stats['sum']
+        transaction_count = variation_stats['count']
+        users_with_purchases = user_stats['purchasers']
         
         # RPU = Total Revenue / Total Users
         rpu = total_revenue / total_users
         
         # Pour le calcul de l'écart-type, on doit considérer tous les utilisateurs
-        # y compris ceux avec 0€ de revenue
+        # y compris ceux avec 0€ de revenue (calcul analytique, sans tableau de zéros)
         if users_with_purchases > 0:
-            # Revenue values for purchasers
-            purchaser_revenues = user_variation_data['total_revenue'].values
-            
-            # Create full distribution including zeros for non-purchasers
-            zeros = np.zeros(total_users - users_with_purchases)
-            all_user_revenues = np.concatenate([purchaser_revenues, zeros])
-            
-            std = float(np.std(all_user_revenues))
+            population = max(total_users, users_with_purchases)
+            _, sum_sq_dev = self._rpu_moments(variation, population)
+            std = float(np.sqrt(sum_sq_dev / population))
         else:
             std = 0
         
@@ -521,6 +569,8 @@ class TransactionEnricher:
                 'effect_size': test_result.get('effect_size', 0)
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Statistical test failed: {str(e)}")
             return {
@@ -546,13 +596,8 @@ class TransactionEnricher:
         """
         Bootstrap test for revenue totals comparison
         """
-        control_data = self.transaction_df[
-            self.transaction_df['variation'] == control_variation
-        ]['revenue'].values
-        
-        treatment_data = self.transaction_df[
-            self.transaction_df['variation'] == treatment_variation
-        ]['revenue'].values
+        control_data = self.variation_table[control_variation]['revenues']
+        treatment_data = self.variation_table[treatment_variation]['revenues']
         
         if len(control_data) < 2 or len(treatment_data) < 2:
             return {
@@ -571,10 +616,13 @@ class TransactionEnricher:
         
         # Bootstrap pour la différence des moyennes
         n_bootstrap = 10000
+        batch_size = 500  # Point d'annulation coopératif entre chaque lot
         np.random.seed(42)
         
         bootstrap_diffs = []
-        for _ in range(n_bootstrap):
+        for i in range(n_bootstrap):
+            if i % batch_size == 0:
+                self.progress.checkpoint()
             control_sample = np.random.choice(control_data, size=len(control_data), replace=True)
             treatment_sample = np.random.choice(treatment_data, size=len(treatment_data), replace=True)
             bootstrap_diffs.append(treatment_sample.sum() - control_sample.sum())
@@ -618,15 +666,11 @@ class TransactionEnricher:
         """
         T-test for AOV comparison
         """
-        control_revenues = self.transaction_df[
-            self.transaction_df['variation'] == control_variation
-        ]['revenue'].values
-        
-        treatment_revenues = self.transaction_df[
-            self.transaction_df['variation'] == treatment_variation
-        ]['revenue'].values
+        control = self.variation_table[control_variation]
+        treatment = self.variation_table[treatment_variation]
+        n_control, n_treatment = control['count'], treatment['count']
         
-        if len(control_revenues) < 2 or len(treatment_revenues) < 2:
+        if n_control < 2 or n_treatment < 2:
             return {
                 'p_value': 1.0,
                 'confidence_interval': {
@@ -642,33 +686,46 @@ class TransactionEnricher:
                 'effect_size': 0
             }
         
+        # Moyennes et variances depuis la table par variation (pas de re-masquage)
+        control_mean = control['sum'] / n_control
+        treatment_mean = treatment['sum'] / n_treatment
+        control_var = control['var']  # ddof=1
+        treatment_var = treatment['var']
+        
         # Welch's t-test (ne présume pas des variances égales)
-        t_stat, p_value = stats.ttest_ind(treatment_revenues, control_revenues, equal_var=False)
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            treatment_mean, np.sqrt(treatment_var), n_treatment,
+            control_mean, np.sqrt(control_var), n_control,
+            equal_var=False
+        )
+        
+        # Variances de population (ddof=0) pour Cohen's d et l'intervalle, comme np.var()
+        control_var_pop = control_var * (n_control - 1) / n_control
+        treatment_var_pop = treatment_var * (n_treatment - 1) / n_treatment
         
         # Effect size (Cohen's d)
         pooled_std = np.sqrt(
-            ((len(control_revenues) - 1) * control_revenues.var() + 
-             (len(treatment_revenues) - 1) * treatment_revenues.var()) / 
-            (len(control_revenues) + len(treatment_revenues) - 2)
+            ((n_control - 1) * control_var_pop + 
+             (n_treatment - 1) * treatment_var_pop) / 
+            (n_control + n_treatment - 2)
         )
         
-        cohens_d = (treatment_revenues.mean() - control_revenues.mean()) / pooled_std if pooled_std > 0 else 0
+        cohens_d = (treatment_mean - control_mean) / pooled_std if pooled_std > 0 else 0
         
         # Confidence interval for difference
         se_diff = np.sqrt(
-            control_revenues.var()/len(control_revenues) + 
-            treatment_revenues.var()/len(treatment_revenues)
+            control_var_pop/n_control + 
+            treatment_var_pop/n_treatment
         )
         
-        dof = len(control_revenues) + len(treatment_revenues) - 2
+        dof = n_control + n_treatment - 2
         t_critical = stats.t.ppf(1 - self.alpha/2, dof)
         
-        diff = treatment_revenues.mean() - control_revenues.mean()
+        diff = treatment_mean - control_mean
         ci_lower = diff - t_critical * se_diff
         ci_upper = diff + t_critical * se_diff
         
         # Convert to relative terms
-        control_mean = control_revenues.mean()
         if control_mean != 0:
             ci_lower_rel = (ci_lower / abs(control_mean)) * 100
             ci_upper_rel = (ci_upper / abs(control_mean)) * 100
@@ -692,38 +749,14 @@ class TransactionEnricher:
     
     def _ttest_for_rpu(self, control_stats: Dict[str, Any], treatment_stats: Dict[str, Any]) -> Dict[str, Any]:
         """
-        T-test for RPU comparison (includes zeros for non-purchasers)
+        T-test for RPU comparison (includes zeros for non-purchasers).
+        Uses the per-user revenue sum and sum of squares of each variation, so
+        memory is proportional to purchasers and no zero arrays are built.
         """
-        # Recréer les distributions complètes avec les zéros
         control_n = control_stats['sample_size']
         treatment_n = treatment_stats['sample_size']
         
-        # Pour le control
-        control_purchasers = control_stats.get('users_with_purchases', 0)
-        control_revenue_per_purchaser = (
-            control_stats['total_revenue'] / control_purchasers 
-            if control_purchasers > 0 else 0
-        )
-        
-        # Distribution: valeurs de revenue pour les acheteurs + zéros pour les non-acheteurs
-        control_values = np.concatenate([
-            np.full(control_purchasers, control_revenue_per_purchaser),
-            np.zeros(control_n - control_purchasers)
-        ])
-        
-        # Pour le treatment
-        treatment_purchasers = treatment_stats.get('users_with_purchases', 0)
-        treatment_revenue_per_purchaser = (
-            treatment_stats['total_revenue'] / treatment_purchasers 
-            if treatment_purchasers > 0 else 0
-        )
-        
-        treatment_values = np.concatenate([
-            np.full(treatment_purchasers, treatment_revenue_per_purchaser),
-            np.zeros(treatment_n - treatment_purchasers)
-        ])
-        
-        if len(control_values) < 2 or len(treatment_values) < 2:
+        if control_n < 2 or treatment_n < 2:
             return {
                 'p_value': 1.0,
                 'confidence_interval': {
@@ -739,33 +772,43 @@ class TransactionEnricher:
                 'effect_size': 0
             }
         
-        # Welch's t-test
-        t_stat, p_value = stats.ttest_ind(treatment_values, control_values, equal_var=False)
+        control_mean, control_ss = self._rpu_moments(control_stats['variation'], control_n)
+        treatment_mean, treatment_ss = self._rpu_moments(treatment_stats['variation'], treatment_n)
+        
+        # Welch's t-test à partir des statistiques suffisantes (variances ddof=1)
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            treatment_mean, np.sqrt(treatment_ss / (treatment_n - 1)), treatment_n,
+            control_mean, np.sqrt(control_ss / (control_n - 1)), control_n,
+            equal_var=False
+        )
+        
+        # Variances de population (ddof=0) pour l'effect size et l'intervalle
+        control_var = control_ss / control_n
+        treatment_var = treatment_ss / treatment_n
         
         # Effect size
         pooled_std = np.sqrt(
-            ((len(control_values) - 1) * control_values.var() + 
-             (len(treatment_values) - 1) * treatment_values.var()) / 
-            (len(control_values) + len(treatment_values) - 2)
+            ((control_n - 1) * control_var + 
+             (treatment_n - 1) * treatment_var) / 
+            (control_n + treatment_n - 2)
         )
         
-        cohens_d = (treatment_values.mean() - control_values.mean()) / pooled_std if pooled_std > 0 else 0
+        cohens_d = (treatment_mean - control_mean) / pooled_std if pooled_std > 0 else 0
         
         # Confidence interval
         se_diff = np.sqrt(
-            control_values.var()/len(control_values) + 
-            treatment_values.var()/len(treatment_values)
+            control_var/control_n + 
+            treatment_var/treatment_n
         )
         
-        dof = len(control_values) + len(treatment_values) - 2
+        dof = control_n + treatment_n - 2
         t_critical = stats.t.ppf(1 - self.alpha/2, dof)
         
-        diff = treatment_values.mean() - control_values.mean()
+        diff = treatment_mean - control_mean
         ci_lower = diff - t_critical * se_diff
         ci_upper = diff + t_critical * se_diff
         
         # Convert to relative terms
-        control_mean = control_values.mean()
         if control_mean != 0:
             ci_lower_rel = (ci_lower / abs(control_mean)) * 100
             ci_upper_rel = (ci_upper / abs(control_mean)) * 100
@@ -860,6 +903,46 @@ class TransactionEnricher:
         
         return revenue_metrics
     
+    def _metric_cache_key(self, metric_name: str) -> Tuple:
+        """Everything an enriched metric depends on: transactions, breakdown and test settings"""
+        breakdown = tuple(sorted(self.current_variation_breakdown.items()))
+        return (
+            'metric', self.transaction_hash, breakdown, metric_name,
+            self.confidence_level, self.statistical_method
+        )
+    
+    def _comparison_cache_key(self, metric_type: str, control_variation: str, treatment_variation: str) -> Tuple:
+        """
+        A pairwise comparison only depends on the rows and user counts of its two
+        variations: keyed by their own fingerprints, it survives changes (e.g.
+        appended orders) that touch other variations only.
+        """
+        def variation_key(variation):
+            return (
+                variation,
+                self.variation_table[variation].get('fingerprint'),
+                self.current_variation_breakdown.get(variation, 0)
+            )
+        return (
+            'comparison', metric_type, variation_key(control_variation), variation_key(treatment_variation),
+            self.confidence_level, self.statistical_method
+        )
+    
+    def _cached(self, key: Tuple, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        if self.cache is None:
+            return compute()
+        
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            self.cache.put(key, value)
+        else:
+            logger.info(f"Enrichment cache hit: {key[0]}")
+        
+        # Les résultats de métriques sont des dicts: copie pour ne pas partager l'entrée du cache
+        return copy.deepcopy(value) if isinstance(value, dict) else value
+    
     def enrich_results(self) -> Dict[str, Any]:
         """
         Enrich original results with transaction-level data.
@@ -869,7 +952,8 @@ class TransactionEnricher:
             Dict: Enriched analysis results
         """
         try:
-            if not self.validate_transaction_data():
+            self.progress.start_stage("transaction_validation")
+            if self.variation_table is None and not self.validate_transaction_data():
                 raise ValueError("Transaction data validation failed")
             
             # Validate data consistency
@@ -880,15 +964,24 @@ class TransactionEnricher:
             
             logger.info(f"Data consistency warnings: {consistency_check['warnings']}")
             
-            # Aggregate transaction data by user
-            user_data = self.aggregate_by_user()
+            # Aggregate transaction data by user (réutilisé si ces transactions ont déjà été agrégées)
+            self.progress.start_stage("user_aggregation")
+            if self.aggregates is not None:
+                user_data = None
+                transaction_users = self.aggregates.user_count
+                transaction_records = self.aggregates.row_count
+            else:
+                user_data = self._cached(('user_aggregation', self.transaction_hash), self.aggregate_by_user)
+                transaction_users = len(user_data)
+                transaction_records = len(self.transaction_df)
             
-            # Start with original results
+            # Start with original results: the dicts modified below are copied so the
+            # original job (and the result cache sharing it) keep their own results
             self.enriched_results = self.original_results.copy()
+            self.enriched_results['configuration'] = copy.deepcopy(self.original_results.get('configuration') or {})
+            self.enriched_results['overall_results'] = copy.deepcopy(self.original_results.get('overall_results') or {})
             
             # Store configuration for later use
-            if 'configuration' not in self.enriched_results:
-                self.enriched_results['configuration'] = {}
             self.enriched_results['configuration']['confidence_level'] = self.confidence_level
             
             # Identify revenue metrics to enrich
@@ -900,14 +993,22 @@ class TransactionEnricher:
             
             # Update metric results
             updated_metrics = []
+            self.progress.start_stage("enrichment", total_steps=len(revenue_metrics))
             
             for metric in self.enriched_results.get('metric_results', []):
                 metric_name = metric.get('metric_name', '')
                 
                 if self._is_revenue_metric(metric_name):
+                    # Point d'annulation coopératif entre les métriques
+                    self.progress.checkpoint()
+                    
                     # Recalculate with transaction data
                     logger.info(f"Enriching metric: {metric_name}")
-                    enriched_metric = self.recalculate_statistics(metric_name, user_data)
+                    with self.progress.step(metric_name):
+                        enriched_metric = self._cached(
+                            self._metric_cache_key(metric_name),
+                            lambda: self.recalculate_statistics(metric_name, user_data)
+                        )
                     updated_metrics.append(enriched_metric)
                 else:
                     # Keep original metric unchanged
@@ -916,15 +1017,12 @@ class TransactionEnricher:
             self.enriched_results['metric_results'] = updated_metrics
             
             # Update overall results
-            if 'overall_results' not in self.enriched_results:
-                self.enriched_results['overall_results'] = {}
-            
             # Keep the original user count from the main analysis
-            original_total_users = self.enriched_results['overall_results'].get('total_users', len(user_data))
+            original_total_users = self.enriched_results['overall_results'].get('total_users', transaction_users)
             self.enriched_results['overall_results']['total_users'] = original_total_users
             self.enriched_results['overall_results']['enriched_with_transaction_data'] = True
-            self.enriched_results['overall_results']['transaction_records_processed'] = len(self.transaction_df)
-            self.enriched_results['overall_results']['transaction_users'] = len(user_data)
+            self.enriched_results['overall_results']['transaction_records_processed'] = transaction_records
+            self.enriched_results['overall_results']['transaction_users'] = transaction_users
             self.enriched_results['overall_results']['transaction_hash'] = self.transaction_hash
             self.enriched_results['overall_results']['data_consistency'] = consistency_check
             
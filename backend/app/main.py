@@ -1,17 +1,42 @@
+import time
+_import_started = time.perf_counter()
+
 import os
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uuid
-from typing import Dict, Any, Optional
+import json
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
+import threading
+import tracemalloc
 from datetime import datetime
 import hashlib
+import pandas as pd
 
-from .models import AnalysisRequest, AnalysisStatus, AnalysisResult, FilterRequest, TransactionEnrichmentRequest
+from .models import (
+    AnalysisRequest, AnalysisStatus, AnalysisResult, FilterRequest,
+    TransactionEnrichmentRequest, TransactionAppendRequest, MetricConfig, StatisticalMethod,
+    BatchAnalysisRequest, BatchExperiment
+)
 from .analysis.analyzer import ABTestAnalyzer
 from .utils.data_validator import DataValidator
 from .utils.json_encoder import clean_json_nan
+from .utils.progress import ProgressTracker, JobCancelledError
+from .utils.fingerprint import analysis_fingerprint, derived_fingerprint, dataset_digest
+from .utils.result_cache import LRUCache, approximate_size
+from .utils.monitoring import Counter, Histogram, metric_lines, process_rss_bytes
+from .utils.sampling_profiler import SamplingProfiler
+from .utils.transaction_store import TransactionStore, prepare_transaction_frame
+
+# Durées de démarrage du processus (imports du module, warm-up)
+startup_timings: Dict[str, Optional[float]] = {
+    "import_seconds": round(time.perf_counter() - _import_started, 3),
+    "warmup_seconds": None,
+}
 
 # Détection de l'environnement
 ENV = os.getenv("ENVIRONMENT", "development")
@@ -55,9 +80,124 @@ app.add_middleware(
 # In-memory storage (production devrait utiliser Redis)
 analysis_jobs: Dict[str, Dict[str, Any]] = {}
 
-# Cache pour les données de transaction originales (avec colonnes de segmentation)
+# Cache pour les données de transaction originales (avec colonnes de segmentation),
+# conservées sous forme de colonnes typées (TransactionStore) plutôt que de dicts bruts
 transaction_data_cache: Dict[str, Dict[str, Any]] = {}
 
+# Compteurs du cache de transactions (mêmes champs que LRUCache.stats())
+transaction_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_transaction_cache_stats_lock = threading.Lock()
+
+# Optionnel: répertoire où les uploads de transactions sont écrits en .npy et mappés en mémoire
+TRANSACTION_SPILL_DIR = os.getenv("TRANSACTION_SPILL_DIR") or None
+TRANSACTION_SPILL_MIN_ROWS = int(os.getenv("TRANSACTION_SPILL_MIN_ROWS", "0"))
+
+# Index adressé par contenu (empreinte de l'analyse -> job terminé): les résultats
+# restent dans analysis_jobs, le cache ne garde que la référence au job
+analysis_result_cache = LRUCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "128"))
+)
+
+# Cache d'enrichissement (agrégats par utilisateur et métriques enrichies par empreinte de transactions)
+enrichment_cache = LRUCache(
+    max_entries=int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("ENRICHMENT_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+
+# Les workers écrivent l'état de leur job pendant que DELETE peut l'annuler
+# depuis la boucle d'événements: ces écritures passent par ce verrou
+_job_status_lock = threading.Lock()
+
+# Jobs en cours par empreinte (single-flight)
+inflight_fingerprints: Dict[str, str] = {}
+
+# Dernier job de filtrage en attente par (job parent, client) pour la supersession
+pending_filter_jobs: Dict[Any, str] = {}
+
+# Fenêtre optionnelle de regroupement des filtres rapides (0 = désactivée)
+FILTER_DEBOUNCE_SECONDS = float(os.getenv("FILTER_DEBOUNCE_SECONDS", "0"))
+
+# Optionnel: pic de mémoire allouée par étape et par métrique via tracemalloc (ralentit les jobs)
+JOB_TRACEMALLOC = os.getenv("JOB_TRACEMALLOC", "false").lower() == "true"
+
+# Intervalle d'échantillonnage des jobs lancés avec ?profile=true
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+# Analyses en ligne: résultats renvoyés directement par POST /api/analyze si le calcul
+# tient dans le budget, sinon le job continue et se suit comme un job en file d'attente
+INLINE_BUDGET_SECONDS = float(os.getenv("INLINE_BUDGET_SECONDS", "2"))
+# Mode en ligne automatique (sans ?sync) jusqu'à lignes x métriques (0 = désactivé)
+INLINE_AUTO_MAX_CELLS = int(os.getenv("INLINE_AUTO_MAX_CELLS", "5000"))
+
+# Jobs en ligne ayant dépassé leur budget (références gardées jusqu'à la fin du calcul)
+overrun_inline_tasks: set = set()
+
+# Lots d'analyses (POST /api/analyze/batch): analyses d'un lot exécutées en parallèle
+analysis_batches: Dict[str, Dict[str, Any]] = {}
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+# Intervalle de vérification des jobs d'un lot (jobs dédupliqués, flux de résultats)
+BATCH_POLL_SECONDS = 0.1
+
+# Optionnel: mini-analyse au démarrage (imports scipy, chemins de calcul) avant de servir les requêtes
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+# Poids relatifs des étapes pour le calcul du pourcentage de progression
+ANALYSIS_STAGE_WEIGHTS = {
+    "data_cleaning": 10,
+    "validation": 5,
+    "dimension_detection": 5,
+    "metrics": 70,
+    "correction": 5,
+    "summary": 5,
+}
+ENRICHMENT_STAGE_WEIGHTS = {
+    "transaction_validation": 10,
+    "user_aggregation": 10,
+    "enrichment": 80,
+}
+
+# Métriques Prometheus (propres à chaque processus worker, comme les jobs en mémoire)
+jobs_finished_total = Counter(
+    "ab_jobs_finished_total", "Jobs that stopped running, by job type and final status", ("type", "status")
+)
+job_duration_seconds = Histogram(
+    "ab_job_duration_seconds", "Wall time of finished jobs", ("type",)
+)
+stage_duration_seconds = Histogram(
+    "ab_job_stage_duration_seconds", "Wall time of job stages", ("type", "stage")
+)
+
+
+_warmup_lock = threading.Lock()
+
+
+def warm_up() -> float:
+    """
+    Import the lazily loaded statistical modules and run a tiny analysis once per process.
+
+    Called at startup when WARMUP_ON_STARTUP is set, and by the gunicorn master
+    before forking when preloading so that workers inherit the warmed modules.
+    """
+    with _warmup_lock:
+        if startup_timings["warmup_seconds"] is not None:
+            return startup_timings["warmup_seconds"]
+
+        start = time.perf_counter()
+        from .analysis import transaction_enricher  # noqa: F401
+
+        frame = DataValidator(variation_column="variation").validate_and_clean_frame(pd.DataFrame({
+            "variation": ["Control", "Control", "Variation 1", "Variation 1"],
+            "users": [100, 120, 110, 115],
+            "conversions": [10, 12, 14, 13],
+            "revenue": [500.0, 610.0, 720.0, 650.0],
+        }))
+        ABTestAnalyzer().analyze_frame(frame, [
+            MetricConfig(name="Conversion", column="conversions", type="conversion"),
+            MetricConfig(name="Revenue", column="revenue", type="revenue"),
+        ], "variation")
+
+        startup_timings["warmup_seconds"] = round(time.perf_counter() - start, 3)
+        return startup_timings["warmup_seconds"]
 
 
 # Health check endpoint pour Render
@@ -70,7 +210,9 @@ async def health_check():
         "environment": ENV,
         "version": "1.0.0",
         "service": "ab-test-analysis-api",
-        "port": PORT
+        "port": PORT,
+        "warmed_up": startup_timings["warmup_seconds"] is not None,
+        "startup_timings": startup_timings
     }
 
 
@@ -86,10 +228,17 @@ async def root():
         "endpoints": {
             "health": "/health",
             "analyze": "/api/analyze",
+            "batch": "/api/analyze/batch",
+            "batch_status": "/api/batch/{batch_id}",
+            "batch_stream": "/api/batch/{batch_id}/stream",
             "enrich_transaction": "/api/analyze/enrich-transaction",
+            "append_transactions": "/api/analyze/enrich-transaction/{job_id}/append",
             "filter": "/api/analyze/filter",
             "status": "/api/status/{job_id}",
             "results": "/api/results/{job_id}",
+            "cancel": "/api/jobs/{job_id}",
+            "profile": "/api/jobs/{job_id}/profile",
+            "metrics": "/metrics",
             "documentation": "/api-docs" if IS_PRODUCTION else "/docs"
         },
         "deployment": {
@@ -99,19 +248,83 @@ async def root():
         }
     }
 
-async def run_analysis(job_id: str, request: AnalysisRequest):
-    """Background task to run the analysis"""
+def _clean_frame(
+    data: List[Dict[str, Any]],
+    request: AnalysisRequest,
+    data_filters: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[pd.DataFrame, DataValidator]:
+    """Build the frame from the records, apply data_filters in order and clean it"""
+    validator = DataValidator(
+        duplicate_subset=request.duplicate_key_columns,
+        variation_column=request.variation_column
+    )
+    frame = pd.DataFrame(data)
+    for filters in data_filters or []:
+        frame = validator.apply_filters_frame(frame, filters)
+    if frame.empty:
+        raise ValueError("No data left after applying filters")
+    return validator.validate_and_clean_frame(frame), validator
+
+def _shared_clean_frame(shared: Dict[str, Any], request: AnalysisRequest) -> Tuple[pd.DataFrame, DataValidator]:
+    """Clean a batch dataset once; the experiments sharing it reuse the frame (or its error)"""
+    with shared["lock"]:
+        if "result" not in shared:
+            try:
+                shared["result"] = _clean_frame(shared["data"], request, shared["data_filters"])
+            except Exception as e:
+                shared["result"] = e
+    if isinstance(shared["result"], Exception):
+        raise ValueError(str(shared["result"]))
+    return shared["result"]
+
+def run_analysis(
+    job_id: str,
+    request: AnalysisRequest,
+    data_filters: Optional[List[Dict[str, Any]]] = None,
+    shared_dataset: Optional[Dict[str, Any]] = None
+):
+    """
+    Background task to run the analysis.
+    Plain function so Starlette runs it in its threadpool and status polls
+    stay responsive while the CPU-bound analysis is running.
+    data_filters (filtered analyses) are applied in order to the raw frame
+    before cleaning, the records are never rebuilt.
+    shared_dataset (batches) provides the data cleaned once for every
+    experiment of the batch using it, instead of request.data.
+    """
+    progress = analysis_jobs[job_id]["progress"]
+    
+    # Laisser une requête de filtre plus récente remplacer celle-ci
+    if FILTER_DEBOUNCE_SECONDS > 0 and analysis_jobs[job_id].get("supersede_key") is not None:
+        time.sleep(FILTER_DEBOUNCE_SECONDS)
+    
+    if progress.is_cancelled:
+        # Annulé avant d'avoir démarré: libérer le worker immédiatement
+        return
+    
+    supersede_key = analysis_jobs[job_id].get("supersede_key")
+    if supersede_key is not None and pending_filter_jobs.get(supersede_key) == job_id:
+        del pending_filter_jobs[supersede_key]
+    
+    # Profilage par échantillonnage uniquement sur demande (?profile=true)
+    profiler = None
+    if analysis_jobs[job_id].get("profiling"):
+        profiler = SamplingProfiler(interval=PROFILER_INTERVAL_MS / 1000)
+        profiler.start()
+    
     try:
         # Update job status
-        analysis_jobs[job_id]["status"] = "processing"
-        analysis_jobs[job_id]["started_at"] = datetime.utcnow().isoformat()
+        _update_running_job(job_id, status="processing", started_at=datetime.utcnow().isoformat())
         
         # Log pour monitoring
         print(f"[{datetime.utcnow().isoformat()}] Starting analysis job: {job_id}")
         
         # Validate data
-        validator = DataValidator()
-        validated_data = validator.validate_and_clean(request.data)
+        progress.start_stage("data_cleaning")
+        if shared_dataset is not None:
+            validated_frame, validator = _shared_clean_frame(shared_dataset, request)
+        else:
+            validated_frame, validator = _clean_frame(request.data, request, data_filters)
         
         # Initialize analyzer
         analyzer = ABTestAnalyzer(
@@ -122,44 +335,155 @@ async def run_analysis(job_id: str, request: AnalysisRequest):
         
         # Run analysis with filters
         if request.filters:
-            results = analyzer.analyze_with_filters(
-                data=validated_data,
+            results = analyzer.analyze_frame_with_filters(
+                df=validated_frame,
                 metrics_config=request.metrics_config,
                 variation_column=request.variation_column,
                 filters=request.filters,
                 user_column=request.user_column,
-                data_type=request.data_type
+                data_type=request.data_type,
+                progress=progress,
+                profile=validator.profile
             )
         else:
-            results = analyzer.analyze(
-                data=validated_data,
+            results = analyzer.analyze_frame(
+                df=validated_frame,
                 metrics_config=request.metrics_config,
                 variation_column=request.variation_column,
                 user_column=request.user_column,
-                data_type=request.data_type
+                data_type=request.data_type,
+                progress=progress,
+                profile=validator.profile
             )
         
+        # Doublons retirés au nettoyage, par variation
+        results["data_quality"] = {
+            "duplicate_rows": validator.duplicate_rows,
+            "duplicate_rows_by_variation": validator.duplicate_counts
+        }
+        
+        progress.checkpoint()
+        progress.finish()
+        
         # Update job with results
-        analysis_jobs[job_id]["status"] = "completed"
-        analysis_jobs[job_id]["results"] = results
-        analysis_jobs[job_id]["completed_at"] = datetime.utcnow().isoformat()
+        _update_running_job(
+            job_id, status="completed", results=results, completed_at=datetime.utcnow().isoformat()
+        )
         
-        print(f"[{datetime.utcnow().isoformat()}] Completed analysis job: {job_id}")
+        fingerprint = analysis_jobs[job_id].get("fingerprint")
+        if fingerprint:
+            analysis_result_cache.put(fingerprint, {
+                "job_id": job_id,
+                "completed_at": analysis_jobs[job_id]["completed_at"]
+            })
+        
+        print(f"[{datetime.utcnow().isoformat()}] Completed analysis job: {job_id} ({_stage_timings(progress)})")
+        
+    except JobCancelledError:
+        _confirm_cancelled(job_id)
+        print(f"[{datetime.utcnow().isoformat()}] Cancelled analysis job: {job_id}")
         
     except Exception as e:
+        if progress.is_cancelled:
+            return
+        
         # Update job with error
-        analysis_jobs[job_id]["status"] = "failed"
-        analysis_jobs[job_id]["error"] = str(e)
-        analysis_jobs[job_id]["failed_at"] = datetime.utcnow().isoformat()
+        _fail_running_job(job_id, e)
         
         print(f"[{datetime.utcnow().isoformat()}] Failed analysis job {job_id}: {str(e)}")
+    
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            analysis_jobs[job_id]["profile"] = {"collapsed": profiler.collapsed(), **profiler.summary()}
+        _release_fingerprint(job_id)
+        _record_job_metrics(job_id)
+
+def _update_running_job(job_id: str, **fields):
+    """Write the state of a running job, unless it was cancelled meanwhile"""
+    with _job_status_lock:
+        if analysis_jobs[job_id]["progress"].is_cancelled:
+            raise JobCancelledError()
+        analysis_jobs[job_id].update(fields)
+
+def _fail_running_job(job_id: str, error: Exception):
+    """Mark a running job as failed, unless it was cancelled meanwhile"""
+    with _job_status_lock:
+        if analysis_jobs[job_id]["progress"].is_cancelled:
+            return
+        analysis_jobs[job_id].update(status="failed", error=str(error), failed_at=datetime.utcnow().isoformat())
+
+def _confirm_cancelled(job_id: str):
+    """Keep a job that stopped on JobCancelledError in the cancelled state"""
+    with _job_status_lock:
+        job = analysis_jobs[job_id]
+        job["status"] = "cancelled"
+        job.setdefault("cancelled_at", datetime.utcnow().isoformat())
+
+def _stage_timings(progress: ProgressTracker) -> str:
+    """One-line wall/CPU time summary of a finished job's stages for the logs"""
+    return ", ".join(
+        f"{stage['name']} {stage['elapsed_seconds']:.3f}s/{stage['cpu_seconds']:.3f}s cpu"
+        for stage in progress.snapshot()["stages"]
+        if stage["cpu_seconds"] is not None
+    )
 
-async def run_transaction_enrichment(job_id: str, request: TransactionEnrichmentRequest):
-    """Background task to run transaction data enrichment"""
+def _job_type(job: Dict[str, Any]) -> str:
+    """analysis, filter or enrichment (transaction enrichments and appends)"""
+    if job.get("enrichment_type"):
+        return "enrichment"
+    return "filter" if job.get("parent_job_id") else "analysis"
+
+def _record_job_metrics(job_id: str):
+    """Count a job that stopped running and observe its stage durations"""
+    job = analysis_jobs.get(job_id)
+    if job is None or job.get("progress") is None:
+        return
+    job_type = _job_type(job)
+    snapshot = job["progress"].snapshot()
+    jobs_finished_total.inc(type=job_type, status=job["status"])
+    job_duration_seconds.observe(snapshot["elapsed_seconds"], type=job_type)
+    for stage in snapshot["stages"]:
+        if stage["status"] == "completed":
+            stage_duration_seconds.observe(stage["elapsed_seconds"], type=job_type, stage=stage["name"])
+
+def _release_fingerprint(job_id: str):
+    """Remove a job from the single-flight registry once it is no longer running"""
+    fingerprint = analysis_jobs.get(job_id, {}).get("fingerprint")
+    if fingerprint and inflight_fingerprints.get(fingerprint) == job_id:
+        del inflight_fingerprints[fingerprint]
+
+def _find_existing_analysis(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Return the response for an identical in-flight or completed analysis, if any"""
+    inflight_job_id = inflight_fingerprints.get(fingerprint)
+    if inflight_job_id and analysis_jobs.get(inflight_job_id, {}).get("status") in ("queued", "processing"):
+        return {
+            "job_id": inflight_job_id,
+            "status": analysis_jobs[inflight_job_id]["status"],
+            "deduplicated": True
+        }
+    
+    cached = analysis_result_cache.get(fingerprint)
+    if cached is None:
+        return None
+    
+    cached_job = analysis_jobs.get(cached["job_id"])
+    if cached_job and cached_job["status"] == "completed" and cached_job["results"] is not None:
+        return {"job_id": cached["job_id"], "status": "completed", "deduplicated": True}
+    
+    # Job disparu ou vidé: l'entrée ne pointe plus vers des résultats
+    analysis_result_cache.pop(fingerprint)
+    return None
+
+def run_transaction_enrichment(job_id: str, request: TransactionEnrichmentRequest):
+    """Background task to run transaction data enrichment (runs in the threadpool)"""
+    progress = analysis_jobs[job_id]["progress"]
+    if progress.is_cancelled:
+        return
+    
     try:
         # Update job status
-        analysis_jobs[job_id]["status"] = "processing"
-        analysis_jobs[job_id]["started_at"] = datetime.utcnow().isoformat()
+        _update_running_job(job_id, status="processing", started_at=datetime.utcnow().isoformat())
         
         # Get original job results
         original_job = analysis_jobs[request.job_id]
@@ -171,10 +495,28 @@ async def run_transaction_enrichment(job_id: str, request: TransactionEnrichment
         # Import the enricher
         from .analysis.transaction_enricher import TransactionEnricher
         
+        # Sans lignes postées: filtrer côté serveur les transactions typées du cache
+        transaction_frame = None
+        if request.transaction_data is None:
+            store = transaction_data_cache[analysis_jobs[job_id]["transaction_cache_key"]]["store"]
+            transaction_frame = store.frame(request.transaction_filters)
+            
+            # Aucune transaction dans ce segment: l'analyse filtrée reste telle quelle
+            if transaction_frame.empty:
+                progress.finish()
+                _update_running_job(
+                    job_id, status="completed", results=original_results,
+                    completed_at=datetime.utcnow().isoformat()
+                )
+                return
+        
         # Initialize enricher with original results (will be updated with filtered data)
         enricher = TransactionEnricher(
             original_results=original_results,
-            transaction_data=request.transaction_data
+            transaction_data=request.transaction_data,
+            progress=progress,
+            cache=enrichment_cache,
+            transaction_frame=transaction_frame
         )
         
         # CRITIQUE: Si l'analyse originale était filtrée, on doit utiliser ses variation breakdowns
@@ -185,28 +527,217 @@ async def run_transaction_enrichment(job_id: str, request: TransactionEnrichment
         if not enricher.validate_transaction_data():
             raise ValueError("Transaction data validation failed")
         
+        # Conserver le frame typé pour les enrichissements filtrés suivants
+        _store_transaction_frame(job_id, enricher.transaction_df)
+        
         # Check data consistency
         consistency_check = enricher.validate_data_consistency()
         
         # Enrich results
         enriched_results = enricher.enrich_results()
+        progress.checkpoint()
+        progress.finish()
         
         # Update job with enriched results
-        analysis_jobs[job_id]["status"] = "completed"
-        analysis_jobs[job_id]["results"] = enriched_results
-        analysis_jobs[job_id]["completed_at"] = datetime.utcnow().isoformat()
-        analysis_jobs[job_id]["data_consistency"] = consistency_check
+        _update_running_job(
+            job_id, status="completed", results=enriched_results,
+            completed_at=datetime.utcnow().isoformat(), data_consistency=consistency_check
+        )
+        
+        print(f"[{datetime.utcnow().isoformat()}] Completed enrichment job: {job_id} ({_stage_timings(progress)})")
+        
+    except JobCancelledError:
+        _confirm_cancelled(job_id)
+        print(f"[{datetime.utcnow().isoformat()}] Cancelled enrichment job: {job_id}")
         
     except Exception as e:
+        if progress.is_cancelled:
+            return
+        
         # Update job with error
-        analysis_jobs[job_id]["status"] = "failed"
-        analysis_jobs[job_id]["error"] = str(e)
-        analysis_jobs[job_id]["failed_at"] = datetime.utcnow().isoformat()
+        _fail_running_job(job_id, e)
+    
+    finally:
+        _record_job_metrics(job_id)
+
+def run_transaction_append(job_id: str, cache_key: str, request: TransactionAppendRequest):
+    """Background task folding new orders into a cached upload and refreshing its enrichment"""
+    progress = analysis_jobs[job_id]["progress"]
+    if progress.is_cancelled:
+        return
+    
+    try:
+        _update_running_job(job_id, status="processing", started_at=datetime.utcnow().isoformat())
+        
+        entry = _transaction_cache_lookup(cache_key)
+        if entry is None:
+            raise ValueError("Transaction data not found in cache")
+        original_results = analysis_jobs[entry["original_job_id"]]["results"]
+        
+        from .analysis.transaction_enricher import TransactionEnricher
+        from .analysis.transaction_aggregates import TransactionAggregates
+        
+        # Un seul ajout à la fois par upload: les agrégats sont modifiés en place
+        with entry["lock"]:
+            progress.start_stage("transaction_validation")
+            new_frame = prepare_transaction_frame(request.transaction_data)
+            
+            # Agrégats construits au premier ajout, puis mis à jour avec les seules nouvelles lignes
+            aggregates = entry.get("aggregates")
+            if aggregates is None:
+                aggregates = TransactionAggregates(entry["store"].frame())
+                entry["aggregates"] = aggregates
+            progress.checkpoint()
+            
+            added, affected_variations = aggregates.append(new_frame)
+            entry["store"].append(added)
+            entry["records"] = aggregates.row_count
+            
+            # Seules les comparaisons impliquant une variation modifiée sont recalculées
+            enricher = TransactionEnricher(
+                original_results=original_results,
+                progress=progress,
+                cache=enrichment_cache,
+                aggregates=aggregates
+            )
+            consistency_check = enricher.validate_data_consistency()
+            enriched_results = enricher.enrich_results()
+        
+        progress.checkpoint()
+        progress.finish()
+        
+        _update_running_job(
+            job_id, status="completed", results=enriched_results,
+            completed_at=datetime.utcnow().isoformat(), data_consistency=consistency_check,
+            append_summary={
+                "received_records": len(request.transaction_data),
+                "added_records": len(added),
+                "skipped_records": len(request.transaction_data) - len(added),
+                "affected_variations": sorted(affected_variations),
+                "total_records": aggregates.row_count
+            }
+        )
+        
+    except JobCancelledError:
+        _confirm_cancelled(job_id)
+        print(f"[{datetime.utcnow().isoformat()}] Cancelled transaction append job: {job_id}")
+        
+    except Exception as e:
+        if progress.is_cancelled:
+            return
+        
+        _fail_running_job(job_id, e)
+    
+    finally:
+        _record_job_metrics(job_id)
+
+def _transaction_cache_lookup(cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Cached transaction entry for cache_key, counted as a hit or a miss"""
+    entry = transaction_data_cache.get(cache_key) if cache_key is not None else None
+    with _transaction_cache_stats_lock:
+        transaction_cache_stats["hits" if entry is not None else "misses"] += 1
+    return entry
+
+def _store_transaction_frame(job_id: str, frame):
+    """Attach the validated upload frame to the cache entry created by its enrichment job"""
+    job = analysis_jobs[job_id]
+    if job.get("enrichment_type") != "transaction_data":
+        return
+    entry = _transaction_cache_lookup(job.get("transaction_cache_key"))
+    if entry is None or entry.get("store") is not None:
+        return
+    
+    spill_dir = TRANSACTION_SPILL_DIR if len(frame) >= TRANSACTION_SPILL_MIN_ROWS else None
+    entry["store"] = TransactionStore(frame, spill_dir=spill_dir)
+    entry["records"] = len(frame)
+
+def _analysis_config(request: AnalysisRequest) -> Dict[str, Any]:
+    """Everything besides the data that changes the results of an analysis"""
+    return {
+        "metrics_config": [metric.dict() for metric in request.metrics_config],
+        "variation_column": request.variation_column,
+        "user_column": request.user_column,
+        "data_type": request.data_type,
+        "filters": request.filters,
+        "duplicate_key_columns": request.duplicate_key_columns,
+        "confidence_level": request.confidence_level,
+        "statistical_method": request.statistical_method.value,
+        "multiple_testing_correction": request.multiple_testing_correction.value
+    }
+
+def _inline_eligible(request: AnalysisRequest) -> bool:
+    """Small, cheap analyses run inline when ?sync is not given"""
+    if INLINE_AUTO_MAX_CELLS <= 0 or request.statistical_method == StatisticalMethod.BOOTSTRAP:
+        return False
+    return len(request.data) * max(len(request.metrics_config), 1) <= INLINE_AUTO_MAX_CELLS
+
+
+def _completed_response(job_id: str) -> Dict[str, Any]:
+    """Response body of a completed job, as served by /api/results/{job_id}"""
+    job = analysis_jobs[job_id]
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "results": clean_json_nan(job["results"]),
+        "completed_at": job["completed_at"]
+    }
+    if job.get("append_summary") is not None:
+        response["append_summary"] = job["append_summary"]
+    return response
+
+
+async def _run_inline(job_id: str, request: AnalysisRequest) -> Dict[str, Any]:
+    """
+    Run the analysis job in the threadpool and wait for it up to the inline budget.
+    Past the budget the job keeps running and the client polls it like any queued job.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(run_analysis, job_id, request))
+    done, _ = await asyncio.wait({task}, timeout=INLINE_BUDGET_SECONDS)
+    if not done:
+        overrun_inline_tasks.add(task)
+        task.add_done_callback(overrun_inline_tasks.discard)
+        return {
+            "job_id": job_id,
+            "status": analysis_jobs[job_id]["status"],
+            "inline": False,
+            "message": f"Analysis exceeded the inline budget ({INLINE_BUDGET_SECONDS}s), continuing as a queued job"
+        }
+    
+    job = analysis_jobs[job_id]
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "completed":
+        # Annulé pendant le calcul
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    return {**_completed_response(job_id), "inline": True}
+
 
 @app.post("/api/analyze")
-async def analyze(request: AnalysisRequest, background_tasks: BackgroundTasks):
-    """Launch analysis and return job_id"""
+async def analyze(
+    request: AnalysisRequest,
+    background_tasks: BackgroundTasks,
+    profile: bool = False,
+    sync: Optional[bool] = None
+):
+    """
+    Launch analysis and return job_id.
+    With ?sync=true (or automatically for small analyses when sync is not given)
+    the results are returned in the same response when they are computed within
+    INLINE_BUDGET_SECONDS; otherwise the job continues and is polled as usual.
+    With ?profile=true the job always runs (no deduplication) under a sampling
+    profiler, whose stacks are served by /api/jobs/{job_id}/profile.
+    """
+    inline = sync if sync is not None else _inline_eligible(request)
     try:
+        # Réutiliser une analyse identique en cours ou déjà terminée
+        # Hors de la boucle d'événements: l'empreinte parcourt toutes les lignes
+        fingerprint = await run_in_threadpool(analysis_fingerprint, request.data, _analysis_config(request))
+        existing = _find_existing_analysis(fingerprint) if not profile else None
+        if existing:
+            if inline and existing["status"] == "completed":
+                return {**_completed_response(existing["job_id"]), "inline": True, "deduplicated": True}
+            return {**existing, "message": "Identical analysis already submitted"}
+        
         # Generate unique job ID
         job_id = str(uuid.uuid4())
         
@@ -216,20 +747,27 @@ async def analyze(request: AnalysisRequest, background_tasks: BackgroundTasks):
             "created_at": datetime.utcnow().isoformat(),
             "request": request.dict(),
             "results": None,
-            "error": None
+            "error": None,
+            "fingerprint": fingerprint,
+            "progress": ProgressTracker(ANALYSIS_STAGE_WEIGHTS),
+            "profiling": profile
         }
+        inflight_fingerprints[fingerprint] = job_id
         
-        # Start background analysis
-        background_tasks.add_task(run_analysis, job_id, request)
-        
-        return {
-            "job_id": job_id,
-            "status": "queued",
-            "message": "Analysis started successfully"
-        }
+        if not inline:
+            # Start background analysis
+            background_tasks.add_task(run_analysis, job_id, request)
+            
+            return {
+                "job_id": job_id,
+                "status": "queued",
+                "message": "Analysis started successfully"
+            }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start analysis: {str(e)}")
+    
+    return await _run_inline(job_id, request)
 
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
@@ -238,6 +776,9 @@ async def get_status(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     
     job = analysis_jobs[job_id]
+    progress = job.get("progress")
+    progress_snapshot = progress.snapshot() if progress else None
+    
     return {
         "job_id": job_id,
         "status": job["status"],
@@ -245,9 +786,100 @@ async def get_status(job_id: str):
         "started_at": job.get("started_at"),
         "completed_at": job.get("completed_at"),
         "failed_at": job.get("failed_at"),
-        "error": job.get("error")
+        "cancelled_at": job.get("cancelled_at"),
+        "superseded_by": job.get("superseded_by"),
+        "error": job.get("error"),
+        "progress_percentage": progress_snapshot["percentage"] if progress_snapshot else 0.0,
+        "progress": progress_snapshot
+    }
+
+def _release_job_data(job_id: str):
+    """Free memory held only by a job: its payload, results and transaction cache entries"""
+    job = analysis_jobs[job_id]
+    job["request"] = None
+    job["results"] = None
+    
+    # Ne supprimer une entrée du cache que si aucun autre job ne l'utilise encore
+    shared_keys = {
+        other.get("transaction_cache_key")
+        for other_id, other in analysis_jobs.items()
+        if other_id != job_id and other["status"] != "cancelled"
+    }
+    for cache_key in [
+        key for key, entry in transaction_data_cache.items()
+        if entry.get("enrichment_job_id") == job_id and key not in shared_keys
+    ]:
+        store = transaction_data_cache.pop(cache_key).get("store")
+        with _transaction_cache_stats_lock:
+            transaction_cache_stats["evictions"] += 1
+        if store is not None:
+            store.release()
+
+def _mark_cancelled(job_id: str, superseded_by: Optional[str] = None) -> str:
+    """
+    Flag a queued or running job as cancelled and free everything it holds.
+    Returns the status the job had; finished jobs are left untouched.
+    """
+    job = analysis_jobs[job_id]
+    with _job_status_lock:
+        previous_status = job["status"]
+        if previous_status not in ("queued", "processing"):
+            return previous_status
+        job["progress"].cancel()
+        job["status"] = "cancelled"
+        job["cancelled_at"] = datetime.utcnow().isoformat()
+    if superseded_by:
+        job["superseded_by"] = superseded_by
+    _release_fingerprint(job_id)
+    _release_job_data(job_id)
+    return previous_status
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job.
+    Running work stops at its next cooperative checkpoint (between metrics,
+    bootstrap batches or enrichment metrics), which frees the worker slot.
+    """
+    if job_id not in analysis_jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Vérifié et annulé sous le verrou: le job peut se terminer en parallèle
+    previous_status = _mark_cancelled(job_id)
+    
+    if previous_status in ("completed", "failed"):
+        raise HTTPException(status_code=409, detail=f"Job is already {previous_status}")
+    
+    return {
+        "job_id": job_id,
+        "status": "cancelled",
+        "previous_status": previous_status,
+        "message": "Job cancelled"
     }
 
+@app.get("/api/jobs/{job_id}/profile", response_class=PlainTextResponse)
+async def get_job_profile(job_id: str):
+    """
+    Collapsed-stack profile of a job launched with ?profile=true
+    (flamegraph.pl / speedscope format: one "frame;frame;frame count" per line)
+    """
+    if job_id not in analysis_jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job = analysis_jobs[job_id]
+    if not job.get("profiling"):
+        raise HTTPException(status_code=404, detail="Job was not profiled (use ?profile=true on /api/analyze)")
+    
+    profile = job.get("profile")
+    if profile is None:
+        raise HTTPException(status_code=202, detail=f"Analysis is {job['status']}")
+    
+    return PlainTextResponse(profile["collapsed"], headers={
+        "Content-Disposition": f'attachment; filename="profile-{job_id}.folded"',
+        "X-Profile-Samples": str(profile["samples"]),
+        "X-Profile-Interval-Seconds": str(profile["interval_seconds"]),
+    })
+
 @app.get("/api/results/{job_id}")
 async def get_results(job_id: str):
     """Get complete analysis results"""
@@ -259,18 +891,13 @@ async def get_results(job_id: str):
     if job["status"] == "failed":
         raise HTTPException(status_code=500, detail=job["error"])
     
+    if job["status"] == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    
     if job["status"] != "completed":
         raise HTTPException(status_code=202, detail=f"Analysis is {job['status']}")
     
-    # Clean results before returning
-    cleaned_results = clean_json_nan(job["results"])
-    
-    return {
-        "job_id": job_id,
-        "status": job["status"],
-        "results": cleaned_results,
-        "completed_at": job["completed_at"]
-    }
+    return _completed_response(job_id)
 
 @app.post("/api/analyze/filter")
 async def analyze_with_filters(request: FilterRequest, background_tasks: BackgroundTasks):
@@ -283,46 +910,60 @@ async def analyze_with_filters(request: FilterRequest, background_tasks: Backgro
         raise HTTPException(status_code=400, detail="Original job must be completed")
     
     try:
+        # Réutiliser un filtrage identique du même job parent
+        fingerprint = derived_fingerprint(original_job["fingerprint"], filters=request.filters) if original_job.get("fingerprint") else None
+        existing = _find_existing_analysis(fingerprint) if fingerprint else None
+        if existing:
+            return {
+                **existing,
+                "parent_job_id": request.job_id,
+                "filters_applied": request.filters,
+                "message": "Identical filtered analysis already submitted"
+            }
+        
         # Create new job ID for filtered analysis
         new_job_id = str(uuid.uuid4())
+        # Supersession uniquement entre requêtes d'un même client identifié
+        supersede_key = (request.job_id, request.client_id) if request.client_id else None
         
-        # Get original request and apply filters
+        # Les filtres sont appliqués aux données du job parent dans le job lui-même
         original_request = AnalysisRequest(**original_job["request"])
-        
-        # Apply filters to data
-        validator = DataValidator()
-        filtered_data = validator.apply_filters(original_request.data, request.filters)
-        
-        # Create new request with filtered data
-        filtered_request = AnalysisRequest(
-            data=filtered_data,
-            metrics_config=original_request.metrics_config,
-            variation_column=original_request.variation_column,
-            user_column=original_request.user_column,
-            confidence_level=original_request.confidence_level,
-            statistical_method=original_request.statistical_method,
-            multiple_testing_correction=original_request.multiple_testing_correction,
-            data_type=original_request.data_type
-        )
+        filtered_request = original_request.copy(update={"filters": {}})
+        data_filters = original_job.get("data_filters", []) + [request.filters]
         
         # Initialize new job
         analysis_jobs[new_job_id] = {
             "status": "queued",
             "created_at": datetime.utcnow().isoformat(),
-            "request": filtered_request.dict(),
+            "request": original_job["request"],
+            "data_filters": data_filters,
             "results": None,
             "error": None,
             "parent_job_id": request.job_id,
-            "filters_applied": request.filters
+            "filters_applied": request.filters,
+            "fingerprint": fingerprint,
+            "supersede_key": supersede_key,
+            "progress": ProgressTracker(ANALYSIS_STAGE_WEIGHTS)
         }
+        if fingerprint:
+            inflight_fingerprints[fingerprint] = new_job_id
+        
+        # Les filtres précédents du même client encore en file d'attente sont obsolètes
+        superseded_job_id = None
+        if supersede_key is not None:
+            superseded_job_id = pending_filter_jobs.get(supersede_key)
+            if superseded_job_id and analysis_jobs.get(superseded_job_id, {}).get("status") == "queued":
+                _mark_cancelled(superseded_job_id, superseded_by=new_job_id)
+            pending_filter_jobs[supersede_key] = new_job_id
         
         # Start background analysis
-        background_tasks.add_task(run_analysis, new_job_id, filtered_request)
+        background_tasks.add_task(run_analysis, new_job_id, filtered_request, data_filters)
         
         return {
             "job_id": new_job_id,
             "parent_job_id": request.job_id,
             "status": "queued",
+            "superseded_job_id": superseded_job_id,
             "filters_applied": request.filters,
             "message": "Filtered analysis started successfully"
         }
@@ -363,8 +1004,12 @@ async def enrich_with_transaction_data(request: TransactionEnrichmentRequest, ba
         # CRITIQUE: Cacher les données de transaction originales pour le filtrage futur
         # Utiliser l'enrichment_job_id comme clé car c'est ce qui sera utilisé pour la recherche
         cache_key = f"transaction_data_{enrichment_job_id}"
+        # Le frame typé est rattaché par le job une fois les transactions validées
         transaction_data_cache[cache_key] = {
-            "data": request.transaction_data,
+            "store": None,
+            "aggregates": None,
+            "lock": threading.Lock(),
+            "records": len(request.transaction_data),
             "created_at": datetime.utcnow().isoformat(),
             "enrichment_job_id": enrichment_job_id,
             "original_job_id": request.job_id  # Garder une référence au job original
@@ -375,12 +1020,13 @@ async def enrich_with_transaction_data(request: TransactionEnrichmentRequest, ba
         analysis_jobs[enrichment_job_id] = {
             "status": "queued",
             "created_at": datetime.utcnow().isoformat(),
-            "request": request.dict(),
+            "request": request.dict(exclude={"transaction_data"}),
             "results": None,
             "error": None,
             "parent_job_id": request.job_id,
             "enrichment_type": "transaction_data",
-            "transaction_cache_key": cache_key
+            "transaction_cache_key": cache_key,
+            "progress": ProgressTracker(ENRICHMENT_STAGE_WEIGHTS)
         }
         
         # Start background enrichment
@@ -406,7 +1052,8 @@ async def enrich_with_filtered_transaction_data(
 ):
     """
     Enrichit les résultats d'analyse avec les données de transaction FILTRÉES.
-    Utilise le cache pour récupérer les données originales et appliquer les filtres.
+    Sans transaction_data, les transaction_filters sont appliqués côté serveur aux
+    transactions typées du cache ; les lignes déjà filtrées par le frontend restent acceptées.
     """
     try:
         # Le job_id est maintenant l'enrichment_job_id (celui qui a le cache)
@@ -426,15 +1073,15 @@ async def enrich_with_filtered_transaction_data(
         cache_key = f"transaction_data_{request.job_id}"
         
         
-        if cache_key not in transaction_data_cache:
+        cached_data = _transaction_cache_lookup(cache_key)
+        if cached_data is None:
             raise HTTPException(status_code=404, detail="Transaction data not found in cache. Please re-upload.")
         
-        cached_data = transaction_data_cache[cache_key]
-        original_transaction_data = cached_data["data"]
-        
-        # Appliquer les filtres aux données de transaction originales
-        # Les filtres sont déjà appliqués côté frontend dans request.transaction_data
-        # Mais ici on utilise les données du cache pour garder les colonnes de segmentation
+        if request.transaction_data is None and cached_data["store"] is None:
+            raise HTTPException(
+                status_code=409,
+                detail="Cached transaction data is not ready yet. Wait for the transaction enrichment to complete."
+            )
         
         # Generate new job ID for filtered enrichment
         enrichment_job_id = str(uuid.uuid4())
@@ -443,18 +1090,20 @@ async def enrich_with_filtered_transaction_data(
         analysis_jobs[enrichment_job_id] = {
             "status": "queued", 
             "created_at": datetime.utcnow().isoformat(),
-            "request": request.dict(),
+            "request": request.dict(exclude={"transaction_data"}),
             "results": None,
             "error": None,
             "parent_job_id": request.job_id,
             "enrichment_type": "filtered_transaction_data",
-            "transaction_cache_key": cache_key
+            "transaction_cache_key": cache_key,
+            "progress": ProgressTracker(ENRICHMENT_STAGE_WEIGHTS)
         }
         
         # Créer une nouvelle requête avec les données filtrées mais depuis le cache
         filtered_request = TransactionEnrichmentRequest(
             job_id=job_to_enrich,  # Le job à enrichir (analyse filtrée)
-            transaction_data=request.transaction_data  # Données déjà filtrées côté frontend
+            transaction_data=request.transaction_data,  # Données déjà filtrées côté frontend (ancien mode)
+            transaction_filters=request.transaction_filters  # Filtres appliqués au cache sinon
         )
         
         # Start background enrichment
@@ -464,8 +1113,9 @@ async def enrich_with_filtered_transaction_data(
             "job_id": enrichment_job_id,
             "parent_job_id": request.job_id,
             "status": "queued",
-            "transaction_records": len(request.transaction_data),
-            "cached_records": len(original_transaction_data),
+            "transaction_records": len(request.transaction_data) if request.transaction_data is not None else None,
+            "cached_records": cached_data["records"],
+            "transaction_filters": request.transaction_filters,
             "message": "Filtered transaction enrichment started successfully"
         }
         
@@ -474,8 +1124,357 @@ async def enrich_with_filtered_transaction_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start filtered transaction enrichment: {str(e)}")
 
+@app.post("/api/analyze/enrich-transaction/{job_id}/append")
+async def append_transaction_data(
+    job_id: str,
+    request: TransactionAppendRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Ajoute de nouvelles commandes aux transactions mises en cache par un enrichissement
+    (job_id = job d'enrichissement) et relance l'enrichissement de l'analyse d'origine.
+    Les transaction_id déjà connus sont ignorés ; le coût est proportionnel aux nouvelles lignes.
+    """
+    try:
+        cache_key = f"transaction_data_{job_id}"
+        cached_data = _transaction_cache_lookup(cache_key)
+        if cached_data is None:
+            raise HTTPException(status_code=404, detail="Transaction data not found in cache. Please re-upload.")
+        
+        if cached_data["store"] is None:
+            raise HTTPException(
+                status_code=409,
+                detail="Cached transaction data is not ready yet. Wait for the transaction enrichment to complete."
+            )
+        
+        original_job = analysis_jobs.get(cached_data["original_job_id"])
+        if original_job is None or original_job["status"] != "completed":
+            raise HTTPException(status_code=400, detail="Original job must be completed before enrichment")
+        
+        append_job_id = str(uuid.uuid4())
+        analysis_jobs[append_job_id] = {
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "request": {"job_id": job_id},
+            "results": None,
+            "error": None,
+            "parent_job_id": job_id,
+            "enrichment_type": "transaction_append",
+            "transaction_cache_key": cache_key,
+            "progress": ProgressTracker(ENRICHMENT_STAGE_WEIGHTS)
+        }
+        
+        background_tasks.add_task(run_transaction_append, append_job_id, cache_key, request)
+        
+        return {
+            "job_id": append_job_id,
+            "parent_job_id": job_id,
+            "status": "queued",
+            "transaction_records": len(request.transaction_data),
+            "cached_records": cached_data["records"],
+            "message": "Transaction append started successfully"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start transaction append: {str(e)}")
+
+def _job_store_bytes() -> int:
+    """
+    Approximate bytes of the payloads and results held by analysis_jobs.
+    Objects shared between jobs (filtered jobs reuse their parent's request)
+    are counted once; sizes are memoized on the job until the object changes.
+    """
+    counted = set()
+    total = 0
+    for job in list(analysis_jobs.values()):
+        estimates = job.setdefault("size_estimates", {})
+        for field in ("request", "results"):
+            value = job.get(field)
+            if value is None or id(value) in counted:
+                continue
+            counted.add(id(value))
+            estimate = estimates.get(field)
+            if estimate is None or estimate[0] != id(value):
+                try:
+                    estimate = (id(value), approximate_size(value))
+                except RuntimeError:
+                    # Résultats modifiés pendant la mesure: garder l'estimation précédente
+                    continue
+                estimates[field] = estimate
+            total += estimate[1]
+    return total
+
+def _batch_entry(batch: Dict[str, Any], index: int, with_results: bool = False) -> Dict[str, Any]:
+    """Status (and optionally results or error) of one experiment of a batch"""
+    entry = dict(batch["experiments"][index])
+    job = analysis_jobs.get(entry["job_id"])
+    if job is None:
+        return {**entry, "status": "unknown"}
+    entry["status"] = job["status"]
+    if job.get("progress") is not None:
+        entry["progress_percentage"] = job["progress"].percentage
+    if job["status"] == "failed":
+        entry["error"] = job["error"]
+    if with_results and job["status"] == "completed":
+        entry["results"] = clean_json_nan(job["results"])
+        entry["completed_at"] = job["completed_at"]
+    return entry
+
+async def run_batch(batch_id: str, runs: List[Tuple[int, str, BatchExperiment, Optional[Dict[str, Any]]]]):
+    """
+    Run the experiments of a batch in the threadpool, at most BATCH_MAX_CONCURRENCY
+    at a time. runs: (index, job_id, experiment, shared dataset); experiments
+    deduplicated against an existing job (no shared dataset) are only awaited.
+    """
+    batch = analysis_batches[batch_id]
+    batch["status"] = "processing"
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def run_one(index: int, job_id: str, experiment: BatchExperiment, shared: Optional[Dict[str, Any]]):
+        if shared is not None:
+            async with semaphore:
+                await run_in_threadpool(run_analysis, job_id, experiment, None, shared)
+        while analysis_jobs.get(job_id, {}).get("status") in ("queued", "processing"):
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch["finished"].append(index)
+    
+    try:
+        # Imports et premiers appels payés une fois pour tout le lot
+        await run_in_threadpool(warm_up)
+        await asyncio.gather(*(run_one(*run) for run in runs))
+    finally:
+        batch["status"] = "completed"
+        batch["completed_at"] = datetime.utcnow().isoformat()
+        print(f"[{datetime.utcnow().isoformat()}] Completed batch {batch_id}: {len(runs)} experiments")
+
+def _batch_fingerprints(
+    experiments: List[BatchExperiment],
+    source_keys: List[Any],
+    sources: Dict[Any, Dict[str, Any]]
+) -> List[str]:
+    """Fingerprint of each batch experiment, hashing every shared dataset once"""
+    fingerprints = []
+    for experiment, key in zip(experiments, source_keys):
+        source = sources[key]
+        if source["digest"] is None:
+            source["digest"] = dataset_digest(source["data"])
+        config = _analysis_config(experiment)
+        if source["data_filters"]:
+            config["data_filters"] = source["data_filters"]
+        fingerprints.append(analysis_fingerprint(source["data"], config, source["digest"]))
+    return fingerprints
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest, background_tasks: BackgroundTasks):
+    """
+    Schedule several analyses at once and return a batch_id.
+    Each experiment references its data by dataset key, completed job_id or
+    inline rows; a dataset shared by several experiments is hashed, parsed
+    and cleaned once. Each experiment is a regular analysis job (deduplicated,
+    usable for filters and enrichment); /api/batch/{batch_id} gives their
+    status and /api/batch/{batch_id}/stream streams results as they finish.
+    """
+    # Résoudre toutes les références de données avant de créer le moindre job
+    sources: Dict[Any, Dict[str, Any]] = {}
+    source_keys = []
+    for index, experiment in enumerate(request.experiments):
+        if experiment.dataset is not None:
+            if experiment.dataset not in request.datasets:
+                raise HTTPException(status_code=400, detail=f"Experiment {index}: unknown dataset '{experiment.dataset}'")
+            key = ("dataset", experiment.dataset)
+            data, data_filters = request.datasets[experiment.dataset], []
+        elif experiment.job_id is not None:
+            referenced_job = analysis_jobs.get(experiment.job_id)
+            if referenced_job is None or referenced_job.get("request") is None:
+                raise HTTPException(status_code=404, detail=f"Experiment {index}: job {experiment.job_id} not found")
+            if referenced_job["status"] != "completed":
+                raise HTTPException(status_code=400, detail=f"Experiment {index}: job {experiment.job_id} must be completed")
+            key = ("job", experiment.job_id)
+            data, data_filters = referenced_job["request"]["data"], referenced_job.get("data_filters", [])
+        else:
+            key = ("inline", index)
+            data, data_filters = experiment.data, []
+        if key not in sources:
+            sources[key] = {"data": data, "data_filters": data_filters, "digest": None, "cleaned": {}}
+        source_keys.append(key)
+    
+    try:
+        batch_id = str(uuid.uuid4())
+        experiments = []
+        runs = []
+        # Hors de la boucle d'événements: le hachage parcourt toutes les lignes de chaque jeu de données
+        fingerprints = await run_in_threadpool(_batch_fingerprints, request.experiments, source_keys, sources)
+        for index, (experiment, key, fingerprint) in enumerate(zip(request.experiments, source_keys, fingerprints)):
+            source = sources[key]
+            existing = _find_existing_analysis(fingerprint)
+            if existing:
+                experiments.append({"index": index, "name": experiment.name, "job_id": existing["job_id"], "deduplicated": True})
+                runs.append((index, existing["job_id"], experiment, None))
+                continue
+            
+            # Nettoyage partagé par les expériences d'un même jeu de données et de mêmes colonnes clés
+            cleaning_key = (experiment.variation_column, tuple(experiment.duplicate_key_columns or ()))
+            if cleaning_key not in source["cleaned"]:
+                source["cleaned"][cleaning_key] = {
+                    "lock": threading.Lock(), "data": source["data"], "data_filters": source["data_filters"]
+                }
+            
+            job_id = str(uuid.uuid4())
+            analysis_jobs[job_id] = {
+                "status": "queued",
+                "created_at": datetime.utcnow().isoformat(),
+                # Les lignes d'un jeu de données partagé ne sont pas copiées par job
+                "request": {**experiment.dict(exclude={"name", "dataset", "job_id", "data"}), "data": source["data"]},
+                "data_filters": source["data_filters"],
+                "results": None,
+                "error": None,
+                "fingerprint": fingerprint,
+                "batch_id": batch_id,
+                "progress": ProgressTracker(ANALYSIS_STAGE_WEIGHTS)
+            }
+            inflight_fingerprints[fingerprint] = job_id
+            experiments.append({"index": index, "name": experiment.name, "job_id": job_id, "deduplicated": False})
+            runs.append((index, job_id, experiment, source["cleaned"][cleaning_key]))
+        
+        analysis_batches[batch_id] = {
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "completed_at": None,
+            "experiments": experiments,
+            "finished": []
+        }
+        background_tasks.add_task(run_batch, batch_id, runs)
+        
+        return {
+            "batch_id": batch_id,
+            "status": "queued",
+            "experiments": experiments,
+            "message": f"Batch of {len(experiments)} analyses started successfully"
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start batch: {str(e)}")
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Per-experiment status of a batch"""
+    if batch_id not in analysis_batches:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    batch = analysis_batches[batch_id]
+    experiments = [_batch_entry(batch, index) for index in range(len(batch["experiments"]))]
+    counts: Dict[str, int] = {}
+    for experiment in experiments:
+        counts[experiment["status"]] = counts.get(experiment["status"], 0) + 1
+    
+    return {
+        "batch_id": batch_id,
+        "status": batch["status"],
+        "created_at": batch["created_at"],
+        "completed_at": batch["completed_at"],
+        "counts": counts,
+        "experiments": experiments
+    }
+
+@app.get("/api/batch/{batch_id}/stream")
+async def stream_batch_results(batch_id: str):
+    """
+    Results of a batch as newline-delimited JSON, one line per experiment in
+    completion order (already finished experiments first); ends with the batch.
+    """
+    if batch_id not in analysis_batches:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    batch = analysis_batches[batch_id]
+    
+    async def lines():
+        sent = 0
+        while True:
+            finished = batch["finished"]
+            while sent < len(finished):
+                yield json.dumps(_batch_entry(batch, finished[sent], with_results=True), default=str) + "\n"
+                sent += 1
+            if batch["status"] == "completed" and sent >= len(batch["finished"]):
+                return
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics of this worker process: jobs, stage latencies, caches
+    and memory. Plain function so sizing the job store runs in the threadpool.
+    """
+    jobs = list(analysis_jobs.values())
+    job_counts: Dict[Any, int] = {}
+    for job in jobs:
+        key = (_job_type(job), job["status"])
+        job_counts[key] = job_counts.get(key, 0) + 1
+    
+    lines = metric_lines("ab_jobs", "gauge", "Jobs held in memory by type and status", [
+        ({"type": job_type, "status": status}, count) for (job_type, status), count in sorted(job_counts.items())
+    ])
+    lines += metric_lines("ab_job_queue_depth", "gauge", "Jobs waiting for a worker thread", [
+        ({}, sum(1 for job in jobs if job["status"] == "queued"))
+    ])
+    lines += metric_lines("ab_jobs_in_flight", "gauge", "Jobs currently processing", [
+        ({}, sum(1 for job in jobs if job["status"] == "processing"))
+    ])
+    lines += jobs_finished_total.collect()
+    lines += job_duration_seconds.collect()
+    lines += stage_duration_seconds.collect()
+    
+    transaction_entries = list(transaction_data_cache.values())
+    caches = {
+        "analysis_results": analysis_result_cache.stats(),
+        "enrichment": enrichment_cache.stats(),
+        "transactions": {
+            **transaction_cache_stats,
+            "entries": len(transaction_entries),
+            "bytes": sum(entry["store"].nbytes for entry in transaction_entries if entry.get("store") is not None),
+        },
+    }
+    for name, documentation, field in (
+        ("ab_cache_hits_total", "Cache lookups that found an entry", "hits"),
+        ("ab_cache_misses_total", "Cache lookups that found nothing", "misses"),
+        ("ab_cache_evictions_total", "Entries evicted to respect the cache limits", "evictions"),
+    ):
+        lines += metric_lines(name, "counter", documentation, [
+            ({"cache": cache}, stats[field]) for cache, stats in caches.items()
+        ])
+    
+    lines += metric_lines("ab_cache_entries", "gauge", "Entries held by each cache", [
+        ({"cache": cache}, stats["entries"]) for cache, stats in caches.items()
+    ])
+    lines += metric_lines("ab_cache_bytes", "gauge", "Approximate bytes held by each cache", [
+        ({"cache": cache}, stats["bytes"]) for cache, stats in caches.items()
+    ])
+    lines += metric_lines("ab_job_store_bytes", "gauge", "Approximate bytes of payloads and results held by jobs", [
+        ({}, _job_store_bytes())
+    ])
+    
+    rss = process_rss_bytes()
+    if rss is not None:
+        lines += metric_lines("process_resident_memory_bytes", "gauge", "Resident memory size in bytes", [({}, rss)])
+    
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 # Startup event pour logs
 @app.on_event("startup")
 async def startup_event():
     """Log startup information"""
-    print(f"A/B Test Analysis API Starting - Environment: {ENV} - Port: {PORT}")
\ No newline at end of file
+    print(f"A/B Test Analysis API Starting - Environment: {ENV} - Port: {PORT}")
+    if JOB_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        print("tracemalloc enabled: per-stage allocation peaks are recorded on jobs")
+    if WARMUP_ON_STARTUP:
+        # Le serveur n'accepte les connexions (et /health ne répond) qu'une fois le warm-up terminé
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+    warmup = startup_timings["warmup_seconds"]
+    print(
+        f"Startup timings (pid {os.getpid()}): imports {startup_timings['import_seconds']:.3f}s, "
+        f"warm-up {f'{warmup:.3f}s' if warmup is not None else 'skipped'}"
+    )
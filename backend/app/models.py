@@ -1,7 +1,6 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, root_validator
 from typing import Dict, List, Any, Optional, Union, Literal
 from enum import Enum
-import pandas as pd
 
 class StatisticalMethod(str, Enum):
     FREQUENTIST = "frequentist"
@@ -24,6 +23,7 @@ class AnalysisStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class MetricConfig(BaseModel):
     """Configuration for a single metric"""
@@ -42,9 +42,8 @@ class MetricConfig(BaseModel):
     currency: Optional[str] = Field(None, description="Currency symbol if unit is currency")
     decimals: Optional[int] = Field(None, description="Number of decimal places")
     
-class AnalysisRequest(BaseModel):
-    """Request model for analysis"""
-    data: List[Dict[str, Any]] = Field(..., description="Raw data as list of dictionaries")
+class AnalysisConfig(BaseModel):
+    """Everything in an analysis request besides the data"""
     metrics_config: List[MetricConfig] = Field(..., description="Configuration for metrics to analyze")
     variation_column: str = Field(..., description="Column name containing variation labels")
     user_column: Optional[str] = Field(None, description="Column name containing user identifiers")
@@ -56,6 +55,10 @@ class AnalysisRequest(BaseModel):
         default_factory=dict,
         description="Dimension filters to apply: column_name -> list of values to include"
     )
+    duplicate_key_columns: Optional[List[str]] = Field(
+        None,
+        description="Columns identifying a duplicate row (e.g. user + variation); whole row by default"
+    )
     
     # Statistical configuration
     confidence_level: float = Field(
@@ -73,18 +76,22 @@ class AnalysisRequest(BaseModel):
         description="Multiple testing correction method"
     )
     
-    @validator('data')
-    def validate_data_not_empty(cls, v):
-        if not v:
-            raise ValueError('Data cannot be empty')
-        return v
-    
     @validator('metrics_config')
     def validate_metrics_not_empty(cls, v):
         if not v:
             raise ValueError('At least one metric must be configured')
         return v
 
+class AnalysisRequest(AnalysisConfig):
+    """Request model for analysis"""
+    data: List[Dict[str, Any]] = Field(..., description="Raw data as list of dictionaries")
+    
+    @validator('data')
+    def validate_data_not_empty(cls, v):
+        if not v:
+            raise ValueError('Data cannot be empty')
+        return v
+
 class VariationStats(BaseModel):
     """Statistics for a single variation"""
     variation: str = Field(..., description="Variation name")
@@ -218,6 +225,7 @@ class JobStatus(BaseModel):
     started_at: Optional[str] = Field(None, description="ISO timestamp when processing started")
     completed_at: Optional[str] = Field(None, description="ISO timestamp when job completed")
     failed_at: Optional[str] = Field(None, description="ISO timestamp when job failed")
+    cancelled_at: Optional[str] = Field(None, description="ISO timestamp when job was cancelled")
     error: Optional[str] = Field(None, description="Error message if job failed")
     progress_percentage: Optional[float] = Field(None, ge=0.0, le=100.0, description="Progress percentage")
 
@@ -225,6 +233,10 @@ class FilterRequest(BaseModel):
     """Request to apply filters to existing analysis"""
     job_id: str = Field(..., description="Original job ID to filter")
     filters: Dict[str, Any] = Field(..., description="Filters to apply to the data")
+    client_id: Optional[str] = Field(
+        None,
+        description="Client/tab identifier: a newer filter request from the same client supersedes queued ones"
+    )
     
     @validator('filters')
     def validate_filters_not_empty(cls, v):
@@ -235,11 +247,20 @@ class FilterRequest(BaseModel):
 class TransactionEnrichmentRequest(BaseModel):
     """Request to enrich analysis with transaction-level data"""
     job_id: str = Field(..., description="Job ID to enrich (can be filtered analysis)")
-    transaction_data: List[Dict[str, Any]] = Field(..., description="Transaction-level data")
+    transaction_data: Optional[List[Dict[str, Any]]] = Field(
+        None,
+        description="Transaction-level data (optional for filtered enrichment from the cache)"
+    )
     original_job_id: Optional[str] = Field(None, description="Original job ID for cache lookup")
+    transaction_filters: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Filters applied server-side to the cached transactions (same format as analysis filters)"
+    )
     
     @validator('transaction_data')
     def validate_transaction_data_not_empty(cls, v):
+        if v is None:
+            return v
         if not v:
             raise ValueError('Transaction data cannot be empty')
         
@@ -251,4 +272,55 @@ class TransactionEnrichmentRequest(BaseModel):
             if missing_columns:
                 raise ValueError(f'Missing required columns: {missing_columns}')
         
-        return v 
\ No newline at end of file
+        return v 
+
+class TransactionAppendRequest(BaseModel):
+    """New transactions appended to a cached transaction upload"""
+    transaction_data: List[Dict[str, Any]] = Field(..., description="New transaction-level records")
+    
+    @validator('transaction_data')
+    def validate_transaction_data_not_empty(cls, v):
+        if not v:
+            raise ValueError('Transaction data cannot be empty')
+        
+        required_columns = ['transaction_id', 'variation', 'revenue']
+        missing_columns = [col for col in required_columns if col not in v[0]]
+        if missing_columns:
+            raise ValueError(f'Missing required columns: {missing_columns}')
+        
+        return v
+
+class BatchExperiment(AnalysisConfig):
+    """One experiment of a batch: a dataset reference plus its analysis configuration"""
+    name: Optional[str] = Field(None, description="Label of the experiment in the batch status")
+    dataset: Optional[str] = Field(None, description="Key of a dataset shared through BatchAnalysisRequest.datasets")
+    job_id: Optional[str] = Field(None, description="Completed analysis job whose data is reused")
+    data: Optional[List[Dict[str, Any]]] = Field(None, description="Inline data, when no dataset reference is given")
+    
+    @root_validator(skip_on_failure=True)
+    def validate_single_dataset_reference(cls, values):
+        references = [key for key in ('dataset', 'job_id', 'data') if values.get(key)]
+        if len(references) != 1:
+            raise ValueError('Exactly one of dataset, job_id or data must be given')
+        return values
+
+class BatchAnalysisRequest(BaseModel):
+    """Several analyses scheduled together, possibly sharing datasets"""
+    datasets: Dict[str, List[Dict[str, Any]]] = Field(
+        default_factory=dict,
+        description="Datasets referenced by key from the experiments (parsed and cleaned once)"
+    )
+    experiments: List[BatchExperiment] = Field(..., description="Experiments to analyze")
+    
+    @validator('datasets')
+    def validate_datasets_not_empty(cls, v):
+        empty = [key for key, rows in v.items() if not rows]
+        if empty:
+            raise ValueError(f'Empty datasets: {empty}')
+        return v
+    
+    @validator('experiments')
+    def validate_experiments_not_empty(cls, v):
+        if not v:
+            raise ValueError('At least one experiment must be given')
+        return v
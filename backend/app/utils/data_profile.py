@@ -0,0 +1,198 @@
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# En dessous de ce nombre de lignes, les statistiques de colonnes sont exactes
+DEFAULT_EXACT_MAX_ROWS = 1_000_000
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Number of leading zero bits of each uint64 (64 for zero)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        # Les moitiés de 32 bits sont exactes en float64, log2 l'est donc aussi
+        high_bits = np.where(high > 0, np.floor(np.log2(high)) + 1, 0)
+        low_bits = np.where(low > 0, np.floor(np.log2(low)) + 1, 0)
+    return np.where(high > 0, 32 - high_bits, 64 - low_bits).astype(np.uint8)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit hashes.
+
+    Uses 2**precision one-byte registers (16 KB at the default precision) for
+    a relative standard error of about 1.04 / sqrt(2**precision). Counters
+    built on separate chunks can be merged.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        remainder = hashes << np.uint64(self.precision)
+        rank = np.minimum(_leading_zeros(remainder) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters of different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            # Petites cardinalités: comptage linéaire
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Mergeable heavy-hitter summary keeping at most `capacity` counters.
+
+    Counts are upper bounds of the true frequencies, overestimated by at
+    most the smallest retained count (floor) when the summary is full.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.floor = 0
+
+    def add_counts(self, counts: pd.Series):
+        """Merge exact (value -> count) counts of a chunk, sorted by decreasing count"""
+        chunk_floor = int(counts.iloc[self.capacity]) if len(counts) > self.capacity else 0
+        chunk_counts = {key: int(count) for key, count in counts.head(self.capacity).items()}
+        self._merge(chunk_counts, chunk_floor)
+
+    def merge(self, other: "SpaceSaving"):
+        self._merge(other.counts, other.floor)
+
+    def _merge(self, counts: Dict[Any, int], floor: int):
+        merged = {
+            key: self.counts.get(key, self.floor) + counts.get(key, floor)
+            for key in set(self.counts) | set(counts)
+        }
+        ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)
+        dropped = ranked[self.capacity:]
+        self.counts = dict(ranked[:self.capacity])
+        # Une valeur absente des compteurs a au plus floor occurrences
+        self.floor = max(self.floor + floor, dropped[0][1] if dropped else 0)
+
+    def top(self, k: int) -> List[Tuple[Any, int]]:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class DataProfile:
+    """
+    Column profile of a cleaned frame, shared by validation, the quality
+    report, the improvement suggestions and the overall results.
+
+    Missing counts are computed up front in a single pass. Distinct counts and
+    most common values are computed on first use, one scan per column: exact
+    (value_counts) up to exact_max_rows rows, otherwise streamed by chunks into a
+    HyperLogLog counter and a SpaceSaving summary so memory stays bounded.
+
+    With group_column (the variation column), exact profiles also keep the
+    values of low-cardinality columns and the largest number of groups a
+    single value appears in, which is all dimension detection needs.
+
+    The profile is a snapshot: it must not be reused after rows or columns of
+    the frame change.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        exact_max_rows: int = DEFAULT_EXACT_MAX_ROWS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        precision: int = 14,
+        sketch_size: int = 64,
+        group_column: Optional[str] = None,
+        value_list_max: int = 64
+    ):
+        self._df = df
+        self.row_count = len(df)
+        self.columns = list(df.columns)
+        self.exact = self.row_count <= exact_max_rows
+        self.chunk_size = chunk_size
+        self.precision = precision
+        self.sketch_size = sketch_size
+        self.group_column = group_column if group_column in self.columns else None
+        self.value_list_max = value_list_max
+
+        self.missing_counts: Dict[str, int] = {
+            column: int(count) for column, count in df.isnull().sum().items()
+        }
+        self._column_stats: Optional[Dict[str, Dict[str, Any]]] = None
+        # Un profil peut être partagé par plusieurs analyses concurrentes (lots)
+        self._lock = threading.Lock()
+
+    @property
+    def total_cells(self) -> int:
+        return self.row_count * len(self.columns)
+
+    @property
+    def missing_cells(self) -> int:
+        return sum(self.missing_counts.values())
+
+    @property
+    def distinct_tolerance(self) -> float:
+        """Relative tolerance of distinct counts (0 in exact mode, about 3 standard errors otherwise)"""
+        return 0.0 if self.exact else 3 * 1.04 / math.sqrt(1 << self.precision)
+
+    def column_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per column: dtype, missing count, distinct count and the three most common values"""
+        with self._lock:
+            if self._column_stats is None:
+                self._column_stats = {
+                    column: self._profile_column(self._df[column]) for column in self.columns
+                }
+                self._df = None
+        return self._column_stats
+
+    def _profile_column(self, col_data: pd.Series) -> Dict[str, Any]:
+        stats = {'dtype': str(col_data.dtype), 'missing_count': self.missing_counts[col_data.name]}
+        if self.exact:
+            # Un seul comptage donne le nombre de valeurs distinctes et les plus fréquentes
+            counts = col_data.value_counts()
+            stats['unique_values'] = len(counts)
+            stats['most_common'] = counts.head(3).to_dict()
+            if self.group_column is not None and col_data.name != self.group_column and len(counts) <= self.value_list_max:
+                # Colonne peu distincte (dimension possible): ses valeurs et le nombre maximal
+                # de groupes (variations) dans lesquels une même valeur apparaît
+                groups_per_value = self._df[self.group_column].groupby(col_data, observed=True, sort=False).nunique()
+                stats['values'] = counts.index.tolist()
+                stats['max_groups_per_value'] = int(groups_per_value.max()) if len(groups_per_value) else 0
+            return stats
+
+        distinct = HyperLogLog(self.precision)
+        heavy_hitters = SpaceSaving(self.sketch_size)
+        for start in range(0, len(col_data), self.chunk_size):
+            chunk = col_data.iloc[start:start + self.chunk_size].dropna()
+            if chunk.empty:
+                continue
+            # Une seule agrégation par tranche: les valeurs distinctes alimentent les deux résumés
+            counts = chunk.value_counts()
+            distinct.add_hashes(pd.util.hash_pandas_object(counts.index).to_numpy())
+            heavy_hitters.add_counts(counts)
+        stats['unique_values'] = distinct.count()
+        stats['most_common'] = dict(heavy_hitters.top(3))
+        return stats
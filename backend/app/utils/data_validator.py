@@ -4,12 +4,38 @@ from typing import List, Dict, Any, Optional, Tuple
 import warnings
 from datetime import datetime
 
+from .data_profile import DataProfile
+from .fingerprint import row_key_hashes
+
+# Résultats de pd.api.types.infer_dtype correspondant à un seul type Python (ou int + float)
+SINGLE_TYPE_KINDS = {
+    'string': 1, 'bytes': 1, 'integer': 1, 'floating': 1, 'decimal': 1, 'complex': 1,
+    'boolean': 1, 'datetime64': 1, 'datetime': 1, 'date': 1, 'timedelta64': 1,
+    'timedelta': 1, 'time': 1, 'period': 1, 'interval': 1, 'categorical': 1,
+    'mixed-integer-float': 2, 'empty': 0,
+}
+
 class DataValidator:
     """Data validation and cleaning utilities"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        duplicate_subset: Optional[List[str]] = None,
+        variation_column: Optional[str] = None
+    ):
+        """
+        Args:
+            duplicate_subset: Columns identifying a duplicate row (whole row by default)
+            variation_column: Column used to break duplicate counts down by variation
+        """
         self.validation_warnings = []
         self.cleaning_actions = []
+        self._column_types: Dict[str, Dict[str, Any]] = {}
+        self.profile: Optional[DataProfile] = None
+        self.duplicate_subset = duplicate_subset
+        self.variation_column = variation_column
+        self.duplicate_rows = 0
+        self.duplicate_counts: Dict[str, int] = {}
     
     def validate_and_clean(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -21,26 +47,41 @@ class DataValidator:
         Returns:
             Cleaned data
         """
-        self.validation_warnings = []
-        self.cleaning_actions = []
-        
         if not data:
             raise ValueError("Data cannot be empty")
         
-        # Convert to DataFrame for easier manipulation
-        df = pd.DataFrame(data)
+        # Convert back to list of dictionaries
+        return self.validate_and_clean_frame(pd.DataFrame(data)).to_dict('records')
+    
+    def validate_and_clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate and clean a DataFrame without going through records
+        
+        Args:
+            df: Raw data (left untouched)
+            
+        Returns:
+            New cleaned DataFrame with a fresh index
+        """
+        self.validation_warnings = []
+        self.cleaning_actions = []
+        self._column_types = {}
+        self.duplicate_rows = 0
+        self.duplicate_counts = {}
         
         # Validate structure
         self._validate_structure(df)
         
         # Clean data
-        cleaned_df = self._clean_data(df)
+        cleaned_df = self._clean_data(df).reset_index(drop=True)
+        
+        # Profil des colonnes réutilisé par la suite (validation, rapport, résultats globaux)
+        self.profile = DataProfile(cleaned_df, group_column=self.variation_column)
         
         # Final validation
         self._final_validation(cleaned_df)
         
-        # Convert back to list of dictionaries
-        return cleaned_df.to_dict('records')
+        return cleaned_df
     
     def apply_filters(self, data: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -53,8 +94,19 @@ class DataValidator:
         Returns:
             Filtered data
         """
-        df = pd.DataFrame(data)
+        return self.apply_filters_frame(pd.DataFrame(data), filters).to_dict('records')
+    
+    def apply_filters_frame(self, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Apply filters to a DataFrame
         
+        Args:
+            df: Data to filter (left untouched)
+            filters: Filter specifications
+            
+        Returns:
+            Filtered DataFrame with a fresh index
+        """
         for column, filter_spec in filters.items():
             if column not in df.columns:
                 self.validation_warnings.append(f"Filter column '{column}' not found in data")
@@ -69,7 +121,7 @@ class DataValidator:
                     f"Applied filter on '{column}': {original_size} -> {filtered_size} rows"
                 )
         
-        return df.to_dict('records')
+        return df.reset_index(drop=True)
     
     def _validate_structure(self, df: pd.DataFrame):
         """Validate basic data structure"""
@@ -95,28 +147,83 @@ class DataValidator:
         """Validate and infer appropriate data types"""
         
         for column in df.columns:
-            col_data = df[column].dropna()
+            inferred = self._infer_column_types(df[column])
+            self._column_types[column] = inferred
             
-            if col_data.empty:
+            if inferred['non_null_count'] == 0:
                 continue
             
             # Check for mixed types
-            types = col_data.apply(type).unique()
-            if len(types) > 2:  # Allow for some type mixing (e.g., int and float)
+            if len(inferred['type_names']) > 2:  # Allow for some type mixing (e.g., int and float)
                 self.validation_warnings.append(
-                    f"Column '{column}' has mixed data types: {[t.__name__ for t in types]}"
+                    f"Column '{column}' has mixed data types: {inferred['type_names']}"
                 )
             
             # Try to convert numeric columns
-            if col_data.dtype == 'object':
-                numeric_converted = pd.to_numeric(col_data, errors='coerce')
-                if not numeric_converted.isnull().all():
-                    # Some values could be converted to numeric
-                    non_numeric_count = numeric_converted.isnull().sum()
-                    if non_numeric_count > 0:
-                        self.validation_warnings.append(
-                            f"Column '{column}' has {non_numeric_count} non-numeric values in apparently numeric data"
-                        )
+            numeric = inferred['numeric']
+            if numeric is not None and inferred['numeric_count'] > 0:
+                # Some values could be converted to numeric
+                non_numeric_count = inferred['non_null_count'] - inferred['numeric_count']
+                if non_numeric_count > 0:
+                    self.validation_warnings.append(
+                        f"Column '{column}' has {non_numeric_count} non-numeric values in apparently numeric data"
+                    )
+    
+    @staticmethod
+    def _is_text_dtype(col_data: pd.Series) -> bool:
+        return pd.api.types.is_object_dtype(col_data) or pd.api.types.is_string_dtype(col_data)
+    
+    def _infer_column_types(self, col_data: pd.Series) -> Dict[str, Any]:
+        """
+        Single type-inference pass over a column.
+        
+        Python types are only enumerated cell by cell when infer_dtype reports a
+        mixed column; numeric coercion of text columns runs once per distinct
+        value and is mapped back to the rows through the factorized codes.
+        The coerced values are kept (index-aligned) for the cleaning stage.
+        """
+        non_null = col_data.notna()
+        non_null_count = int(non_null.sum())
+        inferred = {
+            'type_names': [],
+            'non_null_count': non_null_count,
+            'numeric': None,
+            'numeric_count': 0,
+        }
+        if non_null_count == 0:
+            return inferred
+        
+        if not self._is_text_dtype(col_data):
+            inferred['type_names'] = [col_data.dtype.name]
+            return inferred
+        
+        values = col_data[non_null]
+        kind = pd.api.types.infer_dtype(values, skipna=False)
+        if kind in SINGLE_TYPE_KINDS:
+            inferred['type_names'] = [kind] * SINGLE_TYPE_KINDS[kind]
+        else:
+            type_of = np.frompyfunc(lambda value: type(value).__name__, 1, 1)
+            inferred['type_names'] = list(pd.unique(type_of(values.to_numpy(dtype=object))))
+        
+        codes, uniques = pd.factorize(col_data)
+        numeric_uniques = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy()
+        if (codes < 0).any():
+            numeric_uniques = np.append(numeric_uniques.astype(float), np.nan)  # le code -1 pointe sur NaN
+        numeric = pd.Series(numeric_uniques[codes], index=col_data.index, name=col_data.name)
+        
+        inferred['numeric'] = numeric
+        inferred['numeric_count'] = int(numeric.notna().sum())
+        return inferred
+    
+    def _coerced_numeric(self, col_data: pd.Series) -> Optional[pd.Series]:
+        """Numeric coercion of a text column from the inference cache, aligned on its current rows"""
+        inferred = self._column_types.get(col_data.name)
+        if inferred is None or inferred['numeric'] is None:
+            return None
+        try:
+            return inferred['numeric'].loc[col_data.index]
+        except KeyError:
+            return None
     
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean the data"""
@@ -136,13 +243,42 @@ class DataValidator:
         
         # Remove duplicate rows
         initial_rows = len(cleaned_df)
-        cleaned_df = cleaned_df.drop_duplicates()
+        cleaned_df = self._drop_duplicate_rows(cleaned_df)
         removed_duplicates = initial_rows - len(cleaned_df)
         if removed_duplicates > 0:
             self.cleaning_actions.append(f"Removed {removed_duplicates} duplicate rows")
         
         return cleaned_df
     
+    def _drop_duplicate_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep the first occurrence of each row (or of each duplicate_subset key),
+        comparing 64-bit row hashes instead of the object columns themselves
+        (collisions are negligible below billions of rows)
+        """
+        subset = None
+        if self.duplicate_subset:
+            subset = [column for column in self.duplicate_subset if column in df.columns]
+            missing_columns = [column for column in self.duplicate_subset if column not in df.columns]
+            if missing_columns:
+                self.validation_warnings.append(
+                    f"Duplicate key columns not found in data: {missing_columns}"
+                )
+            subset = subset or None
+        
+        row_hashes = row_key_hashes(df, subset)
+        keep = ~pd.Series(row_hashes).duplicated().to_numpy()
+        if keep.all():
+            return df
+        self.duplicate_rows = int(len(df) - keep.sum())
+        
+        # Doublons par variation: signal de qualité (collecte ou export dupliqué dans un bras)
+        if self.variation_column in df.columns:
+            duplicates = df.loc[~keep, self.variation_column].value_counts(dropna=False)
+            self.duplicate_counts = {str(variation): int(count) for variation, count in duplicates.items()}
+        
+        return df[keep]
+    
     def _clean_column(self, df: pd.DataFrame, column: str) -> pd.DataFrame:
         """Clean a single column"""
         
@@ -160,13 +296,16 @@ class DataValidator:
     
     def _is_numeric_column(self, col_data: pd.Series) -> bool:
         """Check if column should be treated as numeric"""
-        non_null_data = col_data.dropna()
-        if non_null_data.empty:
+        non_null = col_data.notna()
+        non_null_count = int(non_null.sum())
+        if non_null_count == 0:
             return False
         
-        # Try to convert to numeric
-        numeric_converted = pd.to_numeric(non_null_data, errors='coerce')
-        numeric_ratio = numeric_converted.notna().sum() / len(non_null_data)
+        # Try to convert to numeric (réutilise la conversion de la validation des types)
+        numeric_converted = self._coerced_numeric(col_data)
+        if numeric_converted is None:
+            numeric_converted = pd.to_numeric(col_data[non_null], errors='coerce')
+        numeric_ratio = int(numeric_converted[non_null].notna().sum()) / non_null_count
         
         return numeric_ratio > 0.8  # 80% of values can be converted to numeric
     
@@ -178,7 +317,9 @@ class DataValidator:
         # Convert to numeric if needed
         if col_data.dtype == 'object':
             original_nulls = col_data.isnull().sum()
-            numeric_col = pd.to_numeric(col_data, errors='coerce')
+            numeric_col = self._coerced_numeric(col_data)
+            if numeric_col is None:
+                numeric_col = pd.to_numeric(col_data, errors='coerce')
             new_nulls = numeric_col.isnull().sum()
             
             if new_nulls > original_nulls:
@@ -216,30 +357,65 @@ class DataValidator:
         return df
     
     def _clean_string_column(self, df: pd.DataFrame, column: str) -> pd.DataFrame:
-        """Clean string column"""
+        """
+        Clean string column: strip whitespace and map empty strings and null
+        tokens to NaN in a single pass over the distinct values
+        """
         
         col_data = df[column]
         
+        # Une seule conversion en texte, puis nettoyage des valeurs distinctes
+        text = col_data.astype(str)
+        codes, uniques = pd.factorize(text)
+        uniques = pd.Index(uniques, dtype=object)
+        stripped_uniques = uniques.str.strip()
+        unique_counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        
         # Strip whitespace
-        stripped = col_data.astype(str).str.strip()
-        whitespace_changes = (stripped != col_data.astype(str)).sum()
+        changed = np.asarray(stripped_uniques != uniques, dtype=bool)
+        whitespace_changes = int(unique_counts[changed].sum())
+        missing = codes < 0
+        if missing.any() and bool((text[missing] != text[missing]).iloc[0]):
+            # Texte pandas 3: les valeurs manquantes restent NaN et comptent comme modifiées
+            whitespace_changes += int(missing.sum())
         if whitespace_changes > 0:
-            df[column] = stripped
             self.cleaning_actions.append(f"Column '{column}': stripped whitespace from {whitespace_changes} values")
+        else:
+            # Les valeurs d'origine (éventuellement non textuelles) sont conservées
+            stripped_uniques = uniques
         
-        # Replace empty strings with NaN
-        empty_strings = (df[column] == '').sum()
-        if empty_strings > 0:
-            df[column] = df[column].replace('', np.nan)
-            self.cleaning_actions.append(f"Column '{column}': replaced {empty_strings} empty strings with NaN")
-        
-        # Standardize common null representations
+        # Replace empty strings and common null representations with NaN
         null_representations = ['null', 'NULL', 'None', 'NONE', 'n/a', 'N/A', 'na', 'NA', '#N/A']
+        null_positions = {}
+        for position, value in enumerate(stripped_uniques):
+            if value == '' or value in null_representations:
+                null_positions.setdefault(value, []).append(position)
+        
+        null_counts = {}
+        for value, positions in null_positions.items():
+            if whitespace_changes > 0:
+                count = int(unique_counts[positions].sum())
+            else:
+                # Une valeur non textuelle peut avoir la même représentation (None -> 'None')
+                count = int((col_data[np.isin(codes, positions)] == value).sum())
+            if count > 0:
+                null_counts[value] = count
+        
+        if whitespace_changes > 0:
+            cleaned_uniques = stripped_uniques.to_numpy(dtype=object, copy=True)
+            for positions in null_positions.values():
+                cleaned_uniques[positions] = np.nan
+            # Le code -1 (valeur manquante) pointe sur la dernière case
+            cleaned = np.append(cleaned_uniques, np.nan)[codes]
+            df[column] = pd.Series(cleaned, index=col_data.index, dtype=text.dtype)
+        elif null_counts:
+            df[column] = col_data.replace(list(null_counts), np.nan)
+        
+        if null_counts.get(''):
+            self.cleaning_actions.append(f"Column '{column}': replaced {null_counts['']} empty strings with NaN")
         for null_rep in null_representations:
-            null_count = (df[column] == null_rep).sum()
-            if null_count > 0:
-                df[column] = df[column].replace(null_rep, np.nan)
-                self.cleaning_actions.append(f"Column '{column}': replaced {null_count} '{null_rep}' values with NaN")
+            if null_counts.get(null_rep):
+                self.cleaning_actions.append(f"Column '{column}': replaced {null_counts[null_rep]} '{null_rep}' values with NaN")
         
         return df
     
@@ -250,8 +426,10 @@ class DataValidator:
         if df.empty:
             raise ValueError("All data was removed during cleaning process")
         
+        profile = self.profile if self.profile is not None else DataProfile(df)
+        
         # Check missing data percentage
-        missing_percentage = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+        missing_percentage = (profile.missing_cells / profile.total_cells) * 100
         if missing_percentage > 50:
             self.validation_warnings.append(
                 f"High percentage of missing data: {missing_percentage:.1f}%"
@@ -259,7 +437,7 @@ class DataValidator:
         
         # Check for columns with too much missing data
         for column in df.columns:
-            col_missing_pct = (df[column].isnull().sum() / len(df)) * 100
+            col_missing_pct = (profile.missing_counts[column] / len(df)) * 100
             if col_missing_pct > 80:
                 self.validation_warnings.append(
                     f"Column '{column}' has {col_missing_pct:.1f}% missing data"
@@ -290,25 +468,25 @@ class DataValidator:
         
         return df
     
-    def get_data_quality_report(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Generate a data quality report"""
+    def get_data_quality_report(self, df: pd.DataFrame, profile: Optional[DataProfile] = None) -> Dict[str, Any]:
+        """Generate a data quality report (from the profile of df when given)"""
         
         if isinstance(df, list):
             df = pd.DataFrame(df)
+        profile = profile or DataProfile(df)
         
-        total_cells = len(df) * len(df.columns)
-        missing_cells = df.isnull().sum().sum()
+        total_cells = profile.total_cells
+        missing_cells = profile.missing_cells
         
         # Column-level statistics
         column_stats = {}
-        for column in df.columns:
-            col_data = df[column]
+        for column, stats in profile.column_stats().items():
             column_stats[column] = {
-                'dtype': str(col_data.dtype),
-                'missing_count': int(col_data.isnull().sum()),
-                'missing_percentage': round((col_data.isnull().sum() / len(df)) * 100, 2),
-                'unique_values': int(col_data.nunique()),
-                'most_common': col_data.value_counts().head(3).to_dict() if not col_data.empty else {}
+                'dtype': stats['dtype'],
+                'missing_count': stats['missing_count'],
+                'missing_percentage': round((stats['missing_count'] / len(df)) * 100, 2),
+                'unique_values': int(stats['unique_values']),
+                'most_common': stats['most_common'] if len(df) else {}
             }
         
         return {
@@ -324,16 +502,18 @@ class DataValidator:
             'generated_at': datetime.utcnow().isoformat()
         }
     
-    def suggest_data_improvements(self, df: pd.DataFrame) -> List[str]:
-        """Suggest improvements for data quality"""
+    def suggest_data_improvements(self, df: pd.DataFrame, profile: Optional[DataProfile] = None) -> List[str]:
+        """Suggest improvements for data quality (from the profile of df when given)"""
         
         suggestions = []
         
         if isinstance(df, list):
             df = pd.DataFrame(df)
+        profile = profile or DataProfile(df)
+        column_stats = profile.column_stats()
         
         # Check for high missing data
-        missing_pct = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+        missing_pct = (profile.missing_cells / profile.total_cells) * 100
         if missing_pct > 20:
             suggestions.append(
                 f"Consider investigating the source of missing data ({missing_pct:.1f}% missing)"
@@ -347,17 +527,19 @@ class DataValidator:
         
         # Check for columns with very few unique values
         for column in df.columns:
-            unique_ratio = df[column].nunique() / len(df)
-            if unique_ratio < 0.01 and df[column].nunique() > 1:  # Less than 1% unique values
+            unique_values = column_stats[column]['unique_values']
+            unique_ratio = unique_values / len(df)
+            if unique_ratio < 0.01 and unique_values > 1:  # Less than 1% unique values
                 suggestions.append(
-                    f"Column '{column}' has very few unique values ({df[column].nunique()}). Consider if this column is useful for analysis."
+                    f"Column '{column}' has very few unique values ({unique_values}). Consider if this column is useful for analysis."
                 )
         
         # Check for potential ID columns that might not be useful
         for column in df.columns:
-            if df[column].nunique() == len(df):  # All unique values
+            # Comptes approchés: tolérance de l'estimateur au-delà du mode exact
+            if column_stats[column]['unique_values'] >= len(df) * (1 - profile.distinct_tolerance):  # All unique values
                 suggestions.append(
                     f"Column '{column}' appears to be an identifier (all unique values). Consider excluding from statistical analysis."
                 )
         
-        return suggestions 
\ No newline at end of file
+        return suggestions
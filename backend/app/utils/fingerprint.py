@@ -0,0 +1,181 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _canonical_json(value: Any) -> bytes:
+    """Serialize a value deterministically (sorted keys, enums/dates as strings)"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def dataset_digest(data: List[Dict[str, Any]]) -> "hashlib.blake2b":
+    """
+    Running hash of a dataset's rows, hashed one at a time so no full
+    serialized copy of the dataset is ever held in memory. Computed once
+    when several analyses share the same dataset.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(len(data)).encode())
+    for row in data:
+        digest.update(b"\n")
+        digest.update(_canonical_json(row))
+    return digest
+
+
+def analysis_fingerprint(
+    data: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    data_digest: Optional["hashlib.blake2b"] = None
+) -> str:
+    """
+    Stable fingerprint of an analysis: dataset content plus everything that
+    changes the results (metrics config, variation/user column, confidence,
+    method, correction, filters...).
+    data_digest (from dataset_digest) skips re-hashing a shared dataset.
+    """
+    digest = (data_digest or dataset_digest(data)).copy()
+    digest.update(b"\0")
+    digest.update(_canonical_json(config))
+    return digest.hexdigest()
+
+
+def derived_fingerprint(parent_fingerprint: str, **parts: Any) -> str:
+    """Fingerprint of a computation derived from another one (e.g. parent job + filters)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(parent_fingerprint.encode())
+    digest.update(_canonical_json(parts))
+    return digest.hexdigest()
+
+
+TRANSACTION_FINGERPRINT_COLUMNS = ['transaction_id', 'variation', 'revenue', 'quantity']
+
+
+def frame_row_hashes(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 1_000_000
+) -> np.ndarray:
+    """
+    64-bit hash of each row of df (restricted to columns), computed with
+    pandas' vectorized hashing chunk by chunk: peak memory beyond the 8 bytes
+    per row of the result is bounded by the chunk size.
+    """
+    if columns is not None:
+        df = df[columns]
+
+    hashes = np.empty(len(df), dtype=np.uint64)
+    for start in range(0, len(df), chunk_size):
+        hashes[start:start + chunk_size] = pd.util.hash_pandas_object(
+            df.iloc[start:start + chunk_size], index=False
+        ).to_numpy()
+    return hashes
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads uint64 values over the whole 64-bit range"""
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def row_key_hashes(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 1_000_000
+) -> np.ndarray:
+    """
+    64-bit hash of each row following pandas equality (same rows as
+    DataFrame.duplicated): each column is factorized on its own and its codes
+    are folded into the row hash chunk by chunk, so only one column of codes
+    is held at a time whatever the width of the frame.
+    """
+    columns = list(df.columns) if columns is None else columns
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for position, column in enumerate(columns):
+        codes = pd.factorize(df[column])[0].astype(np.uint64)
+        salt = np.uint64(position)
+        for start in range(0, len(df), chunk_size):
+            end = start + chunk_size
+            hashes[start:end] = _mix64(hashes[start:end] ^ _mix64(codes[start:end] + salt))
+    return hashes
+
+
+def transaction_row_hashes(
+    transaction_df: pd.DataFrame,
+    user_column: Optional[str] = None,
+    chunk_size: int = 1_000_000
+) -> np.ndarray:
+    """
+    64-bit hash of each (transaction_id, variation, revenue, quantity) row,
+    computed with pandas' vectorized hashing chunk by chunk.
+    With user_column, the user of each row and the column name are hashed
+    too: per-user aggregates and statistics keyed by the fingerprint then
+    change whenever orders are assigned to different users.
+    """
+    columns = {
+        'transaction_id': transaction_df['transaction_id'].astype(str),
+        'variation': transaction_df['variation'].astype(str),
+        'revenue': transaction_df['revenue'].astype('float64'),
+        'quantity': (
+            transaction_df['quantity'].astype('float64')
+            if 'quantity' in transaction_df.columns
+            else pd.Series(1.0, index=transaction_df.index)
+        ),
+    }
+    names = list(TRANSACTION_FINGERPRINT_COLUMNS)
+    if user_column is not None and user_column != 'transaction_id':
+        columns['user'] = transaction_df[user_column].astype(str)
+        names.append('user')
+
+    canonical = pd.DataFrame(columns)[names]
+    hashes = frame_row_hashes(canonical, chunk_size=chunk_size)
+    if 'user' in columns:
+        salt = np.uint64(int.from_bytes(hashlib.blake2b(user_column.encode(), digest_size=8).digest(), 'little'))
+        hashes = _mix64(hashes ^ salt)
+    return hashes
+
+
+def reduce_row_hashes(row_hashes: np.ndarray) -> Tuple[int, int, int]:
+    """Commutative (count, wrapping sum, xor) reduction of row hashes"""
+    # La somme uint64 de numpy boucle modulo 2**64 sur le tableau
+    total_sum = int(row_hashes.sum(dtype=np.uint64)) if len(row_hashes) else 0
+    total_xor = int(np.bitwise_xor.reduce(row_hashes)) if len(row_hashes) else 0
+    return len(row_hashes), total_sum, total_xor
+
+
+def combine_fingerprint_parts(*parts: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Parts of the union of disjoint row sets (e.g. existing rows + appended rows)"""
+    count, total_sum, total_xor = 0, 0, 0
+    for part_count, part_sum, part_xor in parts:
+        count += part_count
+        total_sum = (total_sum + part_sum) % (1 << 64)
+        total_xor ^= part_xor
+    return count, total_sum, total_xor
+
+
+def format_transaction_fingerprint(parts: Tuple[int, int, int]) -> str:
+    count, total_sum, total_xor = parts
+    return f"{count:x}-{total_sum:016x}-{total_xor:016x}"
+
+
+def transaction_fingerprint(
+    transaction_df: pd.DataFrame,
+    user_column: Optional[str] = None,
+    chunk_size: int = 1_000_000
+) -> str:
+    """
+    Order-independent fingerprint of a transaction frame.
+
+    Each row of (transaction_id, variation, revenue, quantity[, user]) is hashed to a
+    64-bit value with pandas' vectorized hashing, then rows are combined with
+    commutative reductions (wrapping sum and xor) plus the row count. Runs in
+    O(n) over the columnar arrays, chunk by chunk, without sorting or building
+    a string copy of the data. Shuffled rows give the same fingerprint, and
+    the fingerprint of appended rows can be combined with the existing one.
+    """
+    row_hashes = transaction_row_hashes(transaction_df, user_column, chunk_size)
+    return format_transaction_fingerprint(reduce_row_hashes(row_hashes))
@@ -0,0 +1,25 @@
+import importlib
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """
+    Proxy importing a module on first attribute access.
+
+    Keeps heavy statistical modules (scipy.stats) out of the application
+    import so workers start serving sooner; the first analysis, or the
+    optional warm-up, pays for the import instead.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
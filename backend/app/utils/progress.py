@@ -0,0 +1,237 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class JobCancelledError(Exception):
+    """Raised at a cooperative checkpoint when the job has been cancelled"""
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Process resident memory high-water mark"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilo-octets sous Linux, octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ProgressTracker:
+    """
+    Per-stage progress tracker for background jobs.
+
+    Updates (start_stage / advance) are plain attribute writes so they can be
+    called from hot loops; percentages, elapsed times and ETA are only computed
+    when a snapshot is requested (e.g. by /api/status).
+
+    The tracker also carries the job's cancellation flag: long-running code
+    calls checkpoint() between units of work to stop early once cancelled.
+
+    Each stage, and each unit of work timed with step() (e.g. one metric),
+    records its wall time, the CPU time of the job thread, the growth of the
+    process RSS high-water mark and, when tracemalloc is tracing, the peak
+    memory allocated above the level at its start. tracemalloc peaks are
+    process-wide, so they are only exact when jobs do not overlap.
+    """
+
+    def __init__(self, stage_weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            stage_weights: Relative weight of each expected stage in the overall
+                percentage. Stages not listed are still timed but weigh nothing.
+        """
+        self.stage_weights = dict(stage_weights or {})
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._order: List[str] = []
+        self._current: Optional[str] = None
+        self._current_done = 0
+        self._step: Optional[Dict[str, Any]] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._cancelled = False
+
+    def start_stage(self, name: str, total_steps: int = 1):
+        """Close the current stage and start a new one with total_steps units of work"""
+        now = time.monotonic()
+        self._close_current(now)
+        if self._started_at is None:
+            self._started_at = now
+
+        self._stages[name] = {
+            "started": now,
+            "ended": None,
+            "total_steps": max(int(total_steps), 1),
+            "completed_steps": 0,
+            "steps": [],
+            **self._resource_start(),
+        }
+        if name not in self._order:
+            self._order.append(name)
+        self._current = name
+        self._current_done = 0
+
+    def advance(self, steps: int = 1):
+        """Mark steps of the current stage as done (cheap, safe in hot loops)"""
+        self._current_done += steps
+
+    @contextmanager
+    def step(self, name: str):
+        """Time one unit of work of the current stage, then advance by one step"""
+        self._fold_traced_peak()
+        self._step = {"name": name, "started": time.monotonic(), **self._resource_start()}
+        try:
+            yield
+        finally:
+            step, self._step = self._step, None
+            self._fold_traced_peak(step)
+            step["ended"] = time.monotonic()
+            self._resource_end(step)
+            if self._current is not None:
+                self._stages[self._current]["steps"].append(step)
+            self.advance()
+
+    def cancel(self):
+        """Request cancellation; running code stops at its next checkpoint"""
+        self._cancelled = True
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def checkpoint(self):
+        """Cooperative cancellation point, raises JobCancelledError if cancelled"""
+        if self._cancelled:
+            raise JobCancelledError("Job was cancelled")
+
+    def finish(self):
+        """Close the current stage and mark the whole job as done"""
+        now = time.monotonic()
+        self._close_current(now)
+        self._current = None
+        self._finished_at = now
+
+    def _close_current(self, now: float):
+        if self._current is None:
+            return
+        stage = self._stages[self._current]
+        self._fold_traced_peak()
+        stage["ended"] = now
+        stage["completed_steps"] = stage["total_steps"]
+        self._resource_end(stage)
+
+    def _resource_start(self) -> Dict[str, Any]:
+        """CPU time and memory levels at the start of a stage or step"""
+        sample = {
+            "cpu_started": time.thread_time(),
+            "rss_started": _peak_rss_bytes(),
+            "traced_started": None,
+            "traced_peak": 0,
+        }
+        if tracemalloc.is_tracing():
+            sample["traced_started"] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return sample
+
+    def _resource_end(self, entry: Dict[str, Any]):
+        """Turn the start levels of a finished stage or step into measurements"""
+        entry["cpu_seconds"] = time.thread_time() - entry["cpu_started"]
+        rss = _peak_rss_bytes()
+        entry["rss_growth_bytes"] = rss - entry["rss_started"] if rss is not None else None
+        if entry["traced_started"] is not None:
+            entry["peak_allocated_bytes"] = max(entry["traced_peak"] - entry["traced_started"], 0)
+
+    def _fold_traced_peak(self, step: Optional[Dict[str, Any]] = None):
+        """Report the tracemalloc peak since the last reset to the current stage (and step)"""
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        for entry in (step, self._stages.get(self._current) if self._current else None):
+            if entry is not None:
+                entry["traced_peak"] = max(entry["traced_peak"], peak)
+
+    def _stage_fraction(self, name: str) -> float:
+        stage = self._stages.get(name)
+        if stage is None:
+            return 0.0
+        if stage["ended"] is not None:
+            return 1.0
+        done = self._current_done if name == self._current else stage["completed_steps"]
+        return min(done / stage["total_steps"], 1.0)
+
+    @property
+    def percentage(self) -> float:
+        """Overall weighted completion percentage (0-100)"""
+        if self._finished_at is not None:
+            return 100.0
+        total_weight = sum(self.stage_weights.values())
+        if total_weight <= 0:
+            return 0.0
+        done_weight = sum(
+            weight * self._stage_fraction(name)
+            for name, weight in self.stage_weights.items()
+        )
+        return round(min(done_weight / total_weight * 100, 100.0), 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view of the progress"""
+        now = self._finished_at or time.monotonic()
+        elapsed = now - self._started_at if self._started_at is not None else 0.0
+        percentage = self.percentage
+
+        if self._finished_at is not None:
+            eta = 0.0
+        elif percentage > 0:
+            eta = elapsed * (100 - percentage) / percentage
+        else:
+            eta = None
+
+        stages = []
+        for name in list(self._order):
+            stage = self._stages[name]
+            ended = stage["ended"]
+            is_current = name == self._current and ended is None
+            entry = {
+                "name": name,
+                "status": "running" if is_current else "completed",
+                "completed_steps": self._current_done if is_current else stage["completed_steps"],
+                "total_steps": stage["total_steps"],
+                "elapsed_seconds": round((ended or now) - stage["started"], 3),
+                **self._measurements(stage),
+            }
+            steps = list(stage["steps"])
+            if steps:
+                entry["steps"] = [
+                    {
+                        "name": step["name"],
+                        "elapsed_seconds": round(step["ended"] - step["started"], 3),
+                        **self._measurements(step),
+                    }
+                    for step in steps
+                ]
+            stages.append(entry)
+
+        return {
+            "percentage": percentage,
+            "current_stage": self._current,
+            "elapsed_seconds": round(elapsed, 3),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "stages": stages,
+        }
+
+    @staticmethod
+    def _measurements(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """CPU and memory figures of a finished stage or step (None while running)"""
+        cpu = entry.get("cpu_seconds")
+        return {
+            "cpu_seconds": round(cpu, 3) if cpu is not None else None,
+            "peak_allocated_bytes": entry.get("peak_allocated_bytes"),
+            "rss_growth_bytes": entry.get("rss_growth_bytes"),
+        }
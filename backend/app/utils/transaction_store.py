@@ -0,0 +1,314 @@
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_TRANSACTION_COLUMNS = ['transaction_id', 'variation', 'revenue']
+
+# Une colonne texte devient catégorielle si elle a au plus cette proportion de valeurs distinctes
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+
+def prepare_transaction_frame(transaction_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the validated, typed transaction frame from raw records.
+
+    revenue and quantity are numeric (rows without a valid revenue are dropped,
+    missing quantities default to 1), variation is a stripped categorical and
+    other text columns (segments, user ids...) become categoricals when they
+    repeat enough for the dictionary encoding to pay off.
+
+    Raises:
+        ValueError: If required columns are missing
+    """
+    df = pd.DataFrame(transaction_data)
+
+    missing_columns = [col for col in REQUIRED_TRANSACTION_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+
+    if 'quantity' not in df.columns:
+        df['quantity'] = 1
+
+    df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce')
+    df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(1)
+    df = df.dropna(subset=['revenue']).reset_index(drop=True)
+
+    df['variation'] = df['variation'].astype(str).str.strip().astype('category')
+
+    for column in df.columns:
+        if column in ('variation', 'revenue', 'quantity'):
+            continue
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if len(series) and series.nunique(dropna=True) <= CATEGORICAL_MAX_UNIQUE_RATIO * len(series):
+            df[column] = series.astype('category')
+
+    return df
+
+
+def concat_transaction_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate prepared transaction frames, keeping categorical columns
+    categorical (categories are unioned and codes remapped, no string copy).
+    Columns missing from some frames are filled with missing values.
+    """
+    columns = list(dict.fromkeys(column for frame in frames for column in frame.columns))
+    combined = {}
+    for column in columns:
+        parts = [
+            frame[column] if column in frame.columns else pd.Series(np.nan, index=frame.index, dtype=object)
+            for frame in frames
+        ]
+        if not any(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            combined[column] = pd.concat(parts, ignore_index=True)
+            continue
+
+        categories = pd.Index([])
+        for part in parts:
+            part_categories = (
+                part.cat.categories if isinstance(part.dtype, pd.CategoricalDtype)
+                else pd.Index(part.dropna().unique())
+            )
+            categories = categories.union(part_categories)
+
+        codes = []
+        for part in parts:
+            if isinstance(part.dtype, pd.CategoricalDtype):
+                mapping = np.append(categories.get_indexer(part.cat.categories), -1)
+                codes.append(mapping[part.cat.codes.to_numpy()])  # -1 pointe sur la dernière case
+            else:
+                codes.append(categories.get_indexer(part))
+        combined[column] = pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+
+    return pd.DataFrame(combined)
+
+
+def _js_string(value: Any) -> str:
+    """Scalar rendered like JavaScript String(): 1.0 -> '1', True -> 'true'"""
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (float, np.floating)) and np.isfinite(value) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _as_js_strings(values: pd.Series) -> pd.Series:
+    """
+    Values rendered like JavaScript String(). An integer column with missing
+    values is float64 here, and its 1.0 must still match the segment value "1".
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values.map(_js_string)
+    if pd.api.types.is_float_dtype(values):
+        numbers = values.to_numpy(dtype=float)
+        integral = np.isfinite(numbers) & (np.mod(numbers, 1) == 0) & (np.abs(numbers) < 2 ** 53)
+        rendered = values.astype(str).to_numpy(dtype=object)
+        rendered[integral] = numbers[integral].astype(np.int64).astype(str)
+        return pd.Series(rendered, index=values.index)
+    if values.dtype == object:
+        return values.map(_js_string)
+    return values.astype(str)
+
+
+def _match_filter(values: pd.Series, filter_spec: Any) -> np.ndarray:
+    """
+    Boolean mask of values matching a filter spec (DataValidator filter format).
+
+    List filters follow the segment filters of the results view: values are
+    compared as JavaScript strings and rows with a missing value are kept.
+    """
+    if isinstance(filter_spec, dict):
+        # Range filter: {"min": 0, "max": 100}
+        mask = np.ones(len(values), dtype=bool)
+        if 'min' in filter_spec:
+            mask &= (values >= filter_spec['min']).to_numpy(dtype=bool)
+        if 'max' in filter_spec:
+            mask &= (values <= filter_spec['max']).to_numpy(dtype=bool)
+        return mask
+    if isinstance(filter_spec, list):
+        allowed = [_js_string(value) for value in filter_spec]
+        return (_as_js_strings(values).isin(allowed) | values.isna()).to_numpy(dtype=bool)
+    if isinstance(filter_spec, str) and filter_spec.startswith('!'):
+        return (values != filter_spec[1:]).to_numpy(dtype=bool)
+    return (values == filter_spec).to_numpy(dtype=bool)
+
+
+class TransactionStore:
+    """
+    Cached transaction upload kept as typed columns instead of raw dicts.
+
+    The frame can optionally be spilled to a directory of .npy files: numeric
+    columns and categorical codes are then memory-mapped on access, only the
+    category dictionaries (and remaining free-text columns, as codes plus
+    uniques) stay on the heap.
+
+    Filters on dictionary-encoded columns are evaluated once per distinct
+    value and mapped to rows through the codes, so segment filters never
+    compare strings row by row.
+
+    Appended transactions are kept as pending chunks and only merged into the
+    columns the next time the frame is read.
+    """
+
+    def __init__(self, frame: pd.DataFrame, spill_dir: Optional[str] = None):
+        self.row_count = len(frame)
+        self.columns = list(frame.columns)
+        self._frame: Optional[pd.DataFrame] = frame
+        self._path: Optional[str] = None
+        self._dtypes: Dict[str, pd.CategoricalDtype] = {}
+        self._uniques: Dict[str, pd.Index] = {}
+        self._spill_dir = spill_dir
+        self._pending: List[pd.DataFrame] = []
+        self._lock = threading.RLock()
+
+        if spill_dir:
+            self._spill(frame, spill_dir)
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._path is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes held by the store (memory-mapped columns are not counted)"""
+        pending = sum(int(chunk.memory_usage(index=True, deep=True).sum()) for chunk in self._pending)
+        if self._frame is not None:
+            return int(self._frame.memory_usage(index=True, deep=True).sum()) + pending
+        return int(
+            sum(dtype.categories.memory_usage(deep=True) for dtype in self._dtypes.values())
+            + sum(uniques.memory_usage(deep=True) for uniques in self._uniques.values())
+        ) + pending
+
+    def frame(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Return the transaction frame, restricted to the rows matching filters.
+
+        Filter columns absent from the upload are ignored. Spilled columns are
+        memory-mapped and only the selected rows are copied to the heap.
+        """
+        with self._lock:
+            if self._frame is None and self._path is None:
+                raise ValueError("Transaction store has been released")
+
+            self._consolidate()
+            mask = self._filter_mask(filters) if filters else None
+            return self._select(mask)
+
+    def append(self, frame: pd.DataFrame):
+        """Add prepared transactions (merged into the columns on the next read)"""
+        with self._lock:
+            self._pending.append(frame)
+            self.row_count += len(frame)
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+
+        combined = concat_transaction_frames([self._select(None)] + self._pending)
+        self._pending = []
+        self.columns = list(combined.columns)
+        if self._path is None:
+            self._frame = combined
+            return
+
+        # Réécrire les colonnes sur disque avec les lignes ajoutées
+        shutil.rmtree(self._path, ignore_errors=True)
+        self._dtypes = {}
+        self._uniques = {}
+        self._spill(combined, self._spill_dir)
+
+    def _select(self, mask: Optional[np.ndarray]) -> pd.DataFrame:
+        if self._frame is not None:
+            return self._frame if mask is None else self._frame[mask].reset_index(drop=True)
+
+        columns = {}
+        for column in self.columns:
+            values = self._load(column)
+            if mask is not None:
+                values = values[mask]
+            if column in self._dtypes:
+                columns[column] = pd.Categorical.from_codes(values, dtype=self._dtypes[column])
+            elif column in self._uniques:
+                columns[column] = self._uniques[column].take(values)
+            else:
+                columns[column] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a {column: filter_spec} mapping"""
+        with self._lock:
+            self._consolidate()
+            return self._filter_mask(filters)
+
+    def _filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self.row_count, dtype=bool)
+        for column, filter_spec in filters.items():
+            if column not in self.columns:
+                continue
+
+            codes, dictionary = self._encoded(column)
+            if dictionary is None:
+                mask &= _match_filter(pd.Series(codes), filter_spec)
+                continue
+
+            # Évaluer le filtre une fois par valeur distincte, puis indexer par les codes
+            matches = _match_filter(pd.Series(dictionary), filter_spec)
+            missing_match = _match_filter(pd.Series([np.nan], dtype=object), filter_spec)
+            lookup = np.append(matches, missing_match)  # le code -1 (manquant) pointe sur la dernière case
+            mask &= lookup[codes]
+        return mask
+
+    def release(self):
+        """Drop the in-memory frame and delete spilled files"""
+        self._frame = None
+        self._pending = []
+        self._dtypes = {}
+        self._uniques = {}
+        if self._path is not None:
+            shutil.rmtree(self._path, ignore_errors=True)
+            self._path = None
+
+    def _encoded(self, column: str):
+        """(codes or values, dictionary or None) of a column, without materializing text"""
+        if self._frame is not None:
+            series = self._frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                return series.cat.codes.to_numpy(), series.cat.categories
+            return series.to_numpy(), None
+
+        values = self._load(column)
+        if column in self._dtypes:
+            return values, self._dtypes[column].categories
+        if column in self._uniques:
+            return values, self._uniques[column]
+        return values, None
+
+    def _load(self, column: str) -> np.ndarray:
+        return np.load(self._column_file(column), mmap_mode='r')
+
+    def _column_file(self, column: str) -> str:
+        return os.path.join(self._path, f"{self.columns.index(column)}.npy")
+
+    def _spill(self, frame: pd.DataFrame, spill_dir: str):
+        os.makedirs(spill_dir, exist_ok=True)
+        self._path = tempfile.mkdtemp(prefix="transactions_", dir=spill_dir)
+
+        for column in self.columns:
+            series = frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                self._dtypes[column] = series.dtype
+            elif pd.api.types.is_numeric_dtype(series) and series.dtype != object:
+                values = series.to_numpy()
+            else:
+                values, uniques = pd.factorize(series, use_na_sentinel=False)
+                self._uniques[column] = pd.Index(uniques)
+            np.save(self._column_file(column), values)
+
+        self._frame = None
@@ -0,0 +1,432 @@
+"""
+Numerical equivalence harness: runs a frozen reference version of the
+statistical engines (any git revision) and the working tree side by side on
+the same datasets, compares every numeric field of the outputs within
+tolerances and reports per-field drift and speedup.
+
+Both engines run the path of a job: DataValidator.validate_and_clean then
+ABTestAnalyzer.analyze (all pairwise comparisons), and for transaction cases
+TransactionEnricher.enrich_results on the analysis results.
+
+Usage (from the backend directory):
+    python -m benchmarks.equivalence --reference HEAD
+    python -m benchmarks.equivalence --reference a363222 --dataset export.json --output drift.json
+
+Recorded datasets are AnalysisRequest JSON bodies, optionally with a
+`transaction_data` list to also compare the enrichment. The exit status is 1
+when a field drifts beyond its tolerance outside the known divergences.
+"""
+import argparse
+import copy
+import fnmatch
+import io
+import json
+import math
+import os
+import pickle
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .generators import generate_aggregated, generate_raw, generate_transactions, experiment_for_transactions
+
+DEFAULT_RTOL = 1e-9
+DEFAULT_ATOL = 1e-12
+
+# Champs qui changent à chaque exécution ou d'une version à l'autre sans être des résultats
+IGNORED_FIELDS = [
+    '*analysis_duration_seconds',
+    '*transaction_hash',
+    'configuration*',
+    'warnings*',
+    'recommendations*',
+]
+
+# Divergences voulues par rapport aux versions précédentes: signalées, mais sans échec
+KNOWN_DIVERGENCES = [
+    {
+        'fields': [
+            'metric_results[Revenue*].pairwise_comparisons[*].p_value',
+            'metric_results[Revenue*].pairwise_comparisons[*].statistical_test.*',
+            'metric_results[Revenue*].pairwise_comparisons[*].is_significant',
+            'metric_results[Revenue*].pairwise_comparisons[*].confidence_interval.*',
+            'metric_results[Revenue*].is_significant',
+        ],
+        'kind': 'enrichment',
+        'reason': "Revenue total bootstrap resamples sorted per-variation arrays since the per-variation "
+                  "statistics table: same seed, different draws, p-values move within Monte Carlo noise",
+    },
+    {
+        'fields': [
+            'metric_results[*per user*].pairwise_comparisons[*].p_value',
+            'metric_results[*per user*].pairwise_comparisons[*].statistical_test.*',
+            'metric_results[*per user*].pairwise_comparisons[*].is_significant',
+            'metric_results[*per user*].pairwise_comparisons[*].confidence_interval.*',
+            'metric_results[*per user*].pairwise_comparisons[*].effect_size',
+            'metric_results[*per user*].is_significant',
+        ],
+        'kind': 'enrichment',
+        'reason': "RPU Welch t-test uses each purchaser's revenue (sum of squares) instead of replacing "
+                  "it with the purchaser mean, which understated the variance",
+    },
+]
+
+
+# --- Worker: runs in a subprocess with the engine under test first on sys.path ---
+
+def _normalize(value: Any) -> Any:
+    """JSON round trip: numpy scalars and enums become plain values, NaN stays NaN"""
+    return json.loads(json.dumps(value, default=lambda obj: obj.item() if hasattr(obj, 'item') else str(obj)))
+
+
+def _run_analysis(request: Dict[str, Any]) -> Dict[str, Any]:
+    from app.analysis.analyzer import ABTestAnalyzer
+    from app.models import AnalysisRequest
+    from app.utils.data_validator import DataValidator
+
+    parsed = AnalysisRequest(**request)
+    data = DataValidator().validate_and_clean(parsed.data)
+    analyzer = ABTestAnalyzer(
+        confidence_level=parsed.confidence_level,
+        statistical_method=parsed.statistical_method,
+        multiple_testing_correction=parsed.multiple_testing_correction
+    )
+    if parsed.filters:
+        return analyzer.analyze_with_filters(
+            data=data, metrics_config=parsed.metrics_config, variation_column=parsed.variation_column,
+            filters=parsed.filters, user_column=parsed.user_column, data_type=parsed.data_type
+        )
+    return analyzer.analyze(
+        data=data, metrics_config=parsed.metrics_config, variation_column=parsed.variation_column,
+        user_column=parsed.user_column, data_type=parsed.data_type
+    )
+
+
+def _run_enrichment(original_results: Dict[str, Any], transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from app.analysis.transaction_enricher import TransactionEnricher
+
+    return TransactionEnricher(original_results, transactions).enrich_results()
+
+
+def _timed(func, repeat: int) -> Tuple[Any, float]:
+    best, result = math.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_worker(cases_path: str, output_path: str, repeat: int):
+    with open(cases_path, 'rb') as f:
+        cases = pickle.load(f)
+
+    outputs = {}
+    for case in cases:
+        entry: Dict[str, Any] = {}
+        try:
+            analysis, entry['analysis_seconds'] = _timed(lambda: _run_analysis(case['request']), repeat)
+            entry['analysis'] = _normalize(analysis)
+            if case.get('transactions'):
+                # enrich_results modifie les résultats reçus: une copie par exécution
+                enriched, entry['enrichment_seconds'] = _timed(
+                    lambda: _run_enrichment(copy.deepcopy(analysis), case['transactions']), repeat
+                )
+                entry['enrichment'] = _normalize(enriched)
+        except Exception as e:
+            entry['error'] = f"{type(e).__name__}: {e}"
+        outputs[case['name']] = entry
+
+    with open(output_path, 'wb') as f:
+        pickle.dump(outputs, f)
+
+
+# --- Comparaison ---
+
+def _item_label(item: Any, index: int) -> str:
+    """Stable label of a list item: its metric / variation name when it has one"""
+    if isinstance(item, dict):
+        for key in ('metric_name', 'variation_name', 'variation', 'name'):
+            if isinstance(item.get(key), str):
+                return item[key]
+    return str(index)
+
+
+def flatten(value: Any, prefix: str = '') -> Dict[str, Any]:
+    """{'a.b[label].c': leaf} view of nested dicts and lists"""
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for index, item in enumerate(value):
+            flat.update(flatten(item, f"{prefix}[{_item_label(item, index)}]"))
+        return flat
+    return {prefix: value}
+
+
+def _field_pattern(pattern: str) -> str:
+    """fnmatch pattern where [ and ] are literal (list labels), * and ? stay wildcards"""
+    return ''.join({'[': '[[]', ']': '[]]'}.get(char, char) for char in pattern)
+
+
+def _matches(field: str, patterns: List[str]) -> bool:
+    return any(fnmatch.fnmatchcase(field, _field_pattern(pattern)) for pattern in patterns)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _known_divergence(field: str, kind: str) -> Optional[str]:
+    for divergence in KNOWN_DIVERGENCES:
+        if divergence['kind'] == kind and _matches(field, divergence['fields']):
+            return divergence['reason']
+    return None
+
+
+def compare_outputs(
+    reference: Dict[str, Any],
+    current: Dict[str, Any],
+    kind: str,
+    rtol: float,
+    atol: float,
+    tolerances: Dict[str, Tuple[float, float]]
+) -> Dict[str, Any]:
+    """Per-field drift between two outputs (numeric fields within tolerance, others exact)"""
+    reference_fields = {k: v for k, v in flatten(reference).items() if not _matches(k, IGNORED_FIELDS)}
+    current_fields = {k: v for k, v in flatten(current).items() if not _matches(k, IGNORED_FIELDS)}
+
+    drifts, failures, known = [], [], []
+    numeric_fields = 0
+    for field in sorted(set(reference_fields) & set(current_fields)):
+        before, after = reference_fields[field], current_fields[field]
+        field_rtol, field_atol = next(
+            (tolerance for pattern, tolerance in tolerances.items() if _matches(field, [pattern])),
+            (rtol, atol)
+        )
+        if _is_number(before) and _is_number(after):
+            numeric_fields += 1
+            if math.isnan(before) and math.isnan(after):
+                continue
+            absolute = abs(after - before)
+            relative = absolute / abs(before) if before else (0.0 if absolute == 0 else math.inf)
+            if absolute == 0:
+                continue
+            ok = absolute <= field_atol + field_rtol * abs(before)
+            record = {'field': field, 'reference': before, 'current': after,
+                      'abs_diff': absolute, 'rel_diff': relative}
+        else:
+            if before == after:
+                continue
+            ok = False
+            record = {'field': field, 'reference': before, 'current': after}
+
+        drifts.append(record)
+        if not ok:
+            reason = _known_divergence(field, kind)
+            if reason is not None:
+                known.append({**record, 'reason': reason})
+            else:
+                failures.append(record)
+
+    return {
+        'compared_fields': len(set(reference_fields) & set(current_fields)),
+        'numeric_fields': numeric_fields,
+        'drifted_fields': len(drifts),
+        'max_rel_diff': max((d['rel_diff'] for d in drifts if 'rel_diff' in d), default=0.0),
+        'failures': failures,
+        'known_divergences': known,
+        'drifts': sorted(drifts, key=lambda d: d.get('rel_diff', math.inf), reverse=True),
+        'only_in_reference': sorted(set(reference_fields) - set(current_fields)),
+        'only_in_current': sorted(set(current_fields) - set(reference_fields)),
+    }
+
+
+# --- Datasets ---
+
+def generated_cases(args) -> List[Dict[str, Any]]:
+    cases = []
+    for method in args.methods:
+        aggregated, metrics = generate_aggregated(
+            args.aggregated_rows, variations=3, metrics=4, dimensions=2, seed=args.seed
+        )
+        cases.append({'name': f"aggregated/{method}", 'request': {
+            'data': aggregated.to_dict('records'), 'metrics_config': metrics,
+            'variation_column': 'variation', 'data_type': 'aggregated', 'statistical_method': method,
+        }})
+        cases.append({'name': f"aggregated_filtered/{method}", 'request': {
+            'data': aggregated.to_dict('records'), 'metrics_config': metrics,
+            'variation_column': 'variation', 'data_type': 'aggregated', 'statistical_method': method,
+            'filters': {'dimension_0': ['d0_value_0', 'd0_value_1']},
+        }})
+
+        raw, metrics = generate_raw(args.raw_rows, variations=2, metrics=3, seed=args.seed)
+        raw['user_id'] = 'user_' + raw['user_id'].astype(str)
+        cases.append({'name': f"raw/{method}", 'request': {
+            'data': raw.to_dict('records'), 'metrics_config': metrics, 'variation_column': 'variation',
+            'user_column': 'user_id', 'data_type': 'raw', 'statistical_method': method,
+        }})
+
+    transactions = generate_transactions(args.transaction_rows, variations=2, seed=args.seed)
+    experiment, metrics = experiment_for_transactions(transactions)
+    transactions['transaction_id'] = 'tx_' + transactions['transaction_id'].astype(str)
+    transactions['user_id'] = 'user_' + transactions['user_id'].astype(str)
+    cases.append({
+        'name': 'transactions',
+        'request': {'data': experiment.to_dict('records'), 'metrics_config': metrics,
+                    'variation_column': 'variation', 'data_type': 'aggregated'},
+        'transactions': transactions.to_dict('records'),
+    })
+    return cases
+
+
+def recorded_cases(paths: List[str]) -> List[Dict[str, Any]]:
+    cases = []
+    for path in paths:
+        with open(path) as f:
+            body = json.load(f)
+        transactions = body.pop('transaction_data', None)
+        cases.append({'name': os.path.basename(path), 'request': body, 'transactions': transactions})
+    return cases
+
+
+# --- Orchestration ---
+
+def extract_reference(revision: str, directory: str) -> str:
+    """Write the app package of a git revision to directory and return it"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Lancé depuis backend/, git archive prend et restitue des chemins relatifs à ce dossier
+    archive = subprocess.run(
+        ['git', 'archive', '--format=tar', revision, 'app'],
+        cwd=backend_dir, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def run_engine(app_dir: str, cases_path: str, output_path: str, repeat: int) -> Dict[str, Any]:
+    """Run the worker with app_dir's app package first on the import path"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [backend_dir, os.environ.get('PYTHONPATH')]))}
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks.equivalence', '--worker', cases_path, output_path, '--repeat', str(repeat)],
+        cwd=app_dir, env=env, check=True
+    )
+    with open(output_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def parse_tolerances(values: List[str]) -> Dict[str, Tuple[float, float]]:
+    """'pattern=rtol[:atol]' overrides"""
+    tolerances = {}
+    for value in values:
+        pattern, _, spec = value.partition('=')
+        rtol, _, atol = spec.partition(':')
+        tolerances[pattern] = (float(rtol), float(atol) if atol else DEFAULT_ATOL)
+    return tolerances
+
+
+def main(argv: Optional[List[str]] = None):
+    if argv is None and len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        worker = argparse.ArgumentParser()
+        worker.add_argument('--worker', nargs=2)
+        worker.add_argument('--repeat', type=int, default=1)
+        worker_args = worker.parse_args()
+        run_worker(worker_args.worker[0], worker_args.worker[1], worker_args.repeat)
+        return
+
+    parser = argparse.ArgumentParser(description="Compare a reference revision of the statistical engines with the working tree")
+    parser.add_argument('--reference', default='HEAD', help="Git revision of the reference engines")
+    parser.add_argument('--dataset', action='append', default=[], help="Recorded AnalysisRequest JSON (repeatable)")
+    parser.add_argument('--no-generated', action='store_true', help="Only compare recorded datasets")
+    parser.add_argument('--methods', default='frequentist,bootstrap', help="Statistical methods of generated cases")
+    parser.add_argument('--aggregated-rows', type=int, default=200)
+    parser.add_argument('--raw-rows', type=int, default=5000)
+    parser.add_argument('--transaction-rows', type=int, default=5000)
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL)
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL)
+    parser.add_argument('--tolerance', action='append', default=[],
+                        help="Per-field tolerance 'pattern=rtol[:atol]', e.g. '*.p_value=1e-6'")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case for timing (minimum kept)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON report to write")
+    args = parser.parse_args(argv)
+    args.methods = [method.strip() for method in args.methods.split(',') if method.strip()]
+
+    cases = ([] if args.no_generated else generated_cases(args)) + recorded_cases(args.dataset)
+    tolerances = parse_tolerances(args.tolerance)
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as tmp:
+        cases_path = os.path.join(tmp, 'cases.pkl')
+        with open(cases_path, 'wb') as f:
+            pickle.dump(cases, f)
+        reference_dir = extract_reference(args.reference, os.path.join(tmp, 'reference'))
+        print(f"Running reference engines ({args.reference})", file=sys.stderr)
+        reference = run_engine(reference_dir, cases_path, os.path.join(tmp, 'reference.pkl'), args.repeat)
+        print("Running current engines (working tree)", file=sys.stderr)
+        current = run_engine(backend_dir, cases_path, os.path.join(tmp, 'current.pkl'), args.repeat)
+
+    results = []
+    for case in cases:
+        before, after = reference[case['name']], current[case['name']]
+        entry: Dict[str, Any] = {'case': case['name'], 'errors': {
+            engine: output['error'] for engine, output in (('reference', before), ('current', after)) if 'error' in output
+        }}
+        for kind in ('analysis', 'enrichment'):
+            if kind not in before or kind not in after:
+                continue
+            comparison = compare_outputs(before[kind], after[kind], kind, args.rtol, args.atol, tolerances)
+            seconds_before, seconds_after = before[f"{kind}_seconds"], after[f"{kind}_seconds"]
+            comparison.update({
+                'reference_seconds': round(seconds_before, 6),
+                'current_seconds': round(seconds_after, 6),
+                'speedup': round(seconds_before / seconds_after, 3) if seconds_after > 0 else None,
+            })
+            entry[kind] = comparison
+        entry['passed'] = not entry['errors'] and all(
+            not entry[kind]['failures'] for kind in ('analysis', 'enrichment') if kind in entry
+        )
+        results.append(entry)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'reference': args.reference,
+        'config': {key: value for key, value in vars(args).items()},
+        'passed': all(entry['passed'] for entry in results),
+        'results': results,
+    }
+
+    for entry in results:
+        print(f"{'PASS' if entry['passed'] else 'FAIL'} {entry['case']}", file=sys.stderr)
+        for engine, error in entry['errors'].items():
+            print(f"  {engine} error: {error}", file=sys.stderr)
+        for kind in ('analysis', 'enrichment'):
+            if kind not in entry:
+                continue
+            comparison = entry[kind]
+            print(f"  {kind:<10} x{comparison['speedup']} speedup, {comparison['drifted_fields']}/{comparison['compared_fields']} "
+                  f"fields drifted (max rel {comparison['max_rel_diff']:.2e}), {len(comparison['failures'])} failures, "
+                  f"{len(comparison['known_divergences'])} known divergences", file=sys.stderr)
+            for failure in comparison['failures'][:10]:
+                print(f"    {failure['field']}: {failure['reference']!r} -> {failure['current']!r}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
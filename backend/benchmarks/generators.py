@@ -0,0 +1,201 @@
+"""
+Synthetic experiment generators for the benchmark suite.
+
+Three input shapes handled by the backend:
+- aggregated rows (one row per segment with a `users` count),
+- raw per-user rows,
+- transaction-level rows for TransactionEnricher.
+
+Everything is vectorized with numpy so 10M-row frames can be built quickly.
+Identifiers are integers to keep memory reasonable at large scales; text
+columns (variations, dimensions) reuse a handful of string objects, like
+frames built from JSON records.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+METRIC_KINDS = ['conversion', 'revenue', 'count']
+AGGREGATED_METRIC_KINDS = METRIC_KINDS + ['ratio']
+
+
+def variation_names(variations: int) -> List[str]:
+    """control, then variant_A, variant_B..."""
+    return ['control'] + [f"variant_{chr(ord('A') + i)}" for i in range(variations - 1)]
+
+
+def _text_column(rng: np.random.Generator, values: List[str], rows: int) -> np.ndarray:
+    return np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+
+def _dimensions(rng: np.random.Generator, rows: int, dimensions: int, cardinality: int) -> Dict[str, np.ndarray]:
+    return {
+        f"dimension_{d}": _text_column(rng, [f"d{d}_value_{k}" for k in range(cardinality)], rows)
+        for d in range(dimensions)
+    }
+
+
+def _lifts(variation_codes: np.ndarray) -> np.ndarray:
+    """Relative lift of each row's variation (control 1.0, then +5% per variant)"""
+    return 1.0 + 0.05 * variation_codes
+
+
+def generate_aggregated(
+    rows: int = 10_000,
+    variations: int = 2,
+    metrics: int = 3,
+    dimensions: int = 2,
+    cardinality: int = 5,
+    conversion_rate: float = 0.05,
+    seed: int = 0
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Aggregated rows: variation, dimension columns, `users` and one column per
+    metric (conversions, revenue or event counts summed over the segment),
+    cycling through conversion, revenue, count and ratio (revenue per
+    conversion) metrics.
+
+    Returns:
+        Tuple of the frame and the metrics configuration
+    """
+    rng = np.random.default_rng(seed)
+    names = variation_names(variations)
+    codes = rng.integers(0, variations, rows)
+    users = rng.integers(200, 2000, rows)
+    lifts = _lifts(codes)
+
+    columns: Dict[str, Any] = {'variation': np.array(names, dtype=object)[codes]}
+    columns.update(_dimensions(rng, rows, dimensions, cardinality))
+    columns['users'] = users
+
+    metrics_config = []
+    for i in range(metrics):
+        kind = AGGREGATED_METRIC_KINDS[i % len(AGGREGATED_METRIC_KINDS)]
+        if kind == 'conversion':
+            column = f"conversions_{i}"
+            columns[column] = rng.binomial(users, np.minimum(conversion_rate * lifts, 1.0))
+            metrics_config.append({'name': f"Conversion {i}", 'column': column, 'type': 'conversion'})
+        elif kind == 'revenue':
+            column = f"revenue_{i}"
+            columns[column] = np.round(columns['conversions_0'] * rng.lognormal(3.5, 0.4, rows) * lifts, 2)
+            metrics_config.append({'name': f"Revenue {i}", 'column': column, 'type': 'revenue'})
+        elif kind == 'count':
+            column = f"events_{i}"
+            columns[column] = rng.poisson(users * 2.0 * lifts)
+            metrics_config.append({'name': f"Events {i}", 'column': column, 'type': 'count'})
+        else:
+            # Ratio: revenu par conversion à partir des deux premières métriques
+            metrics_config.append({
+                'name': f"AOV {i}", 'column': 'revenue_1', 'type': 'revenue',
+                'numerator_column': 'revenue_1', 'denominator_column': 'conversions_0'
+            })
+
+    return pd.DataFrame(columns), metrics_config
+
+
+def generate_raw(
+    rows: int = 10_000,
+    variations: int = 2,
+    metrics: int = 3,
+    dimensions: int = 2,
+    cardinality: int = 5,
+    conversion_rate: float = 0.05,
+    seed: int = 0
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Raw per-user rows: user_id, variation, dimension columns and one column
+    per metric (0/1 conversion, revenue of converted users, event count).
+    No ratio metric: on raw data their statistics loop over rows in Python.
+
+    Returns:
+        Tuple of the frame and the metrics configuration
+    """
+    rng = np.random.default_rng(seed)
+    names = variation_names(variations)
+    codes = rng.integers(0, variations, rows)
+    lifts = _lifts(codes)
+
+    columns: Dict[str, Any] = {
+        'user_id': np.arange(rows, dtype=np.int64),
+        'variation': np.array(names, dtype=object)[codes],
+    }
+    columns.update(_dimensions(rng, rows, dimensions, cardinality))
+
+    metrics_config = []
+    converted = (rng.random(rows) < conversion_rate * lifts).astype(np.int64)
+    for i in range(metrics):
+        kind = METRIC_KINDS[i % len(METRIC_KINDS)]
+        if kind == 'conversion':
+            column = f"converted_{i}"
+            columns[column] = converted if i == 0 else (rng.random(rows) < conversion_rate * lifts).astype(np.int64)
+            metrics_config.append({'name': f"Conversion {i}", 'column': column, 'type': 'conversion'})
+        elif kind == 'revenue':
+            column = f"revenue_{i}"
+            columns[column] = np.round(converted * rng.lognormal(3.5, 0.6, rows) * lifts, 2)
+            metrics_config.append({'name': f"Revenue {i}", 'column': column, 'type': 'revenue'})
+        else:
+            column = f"events_{i}"
+            columns[column] = rng.poisson(2.0 * lifts)
+            metrics_config.append({'name': f"Events {i}", 'column': column, 'type': 'count'})
+
+    return pd.DataFrame(columns), metrics_config
+
+
+def generate_transactions(
+    rows: int = 10_000,
+    variations: int = 2,
+    users: Optional[int] = None,
+    dimensions: int = 1,
+    cardinality: int = 5,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Transaction rows: transaction_id, user_id (each user stays in one
+    variation), variation, revenue, quantity and dimension columns.
+    users defaults to half the number of transactions.
+    """
+    rng = np.random.default_rng(seed)
+    names = variation_names(variations)
+    users = users or max(rows // 2, 1)
+
+    user_ids = rng.integers(0, users, rows)
+    codes = user_ids % variations
+    columns: Dict[str, Any] = {
+        'transaction_id': np.arange(rows, dtype=np.int64),
+        'user_id': user_ids,
+        'variation': np.array(names, dtype=object)[codes],
+        'revenue': np.round(rng.lognormal(3.5, 0.6, rows) * _lifts(codes), 2),
+        'quantity': rng.integers(1, 4, rows),
+    }
+    columns.update(_dimensions(rng, rows, dimensions, cardinality))
+    return pd.DataFrame(columns)
+
+
+def experiment_for_transactions(
+    transactions: pd.DataFrame,
+    conversion_rate: float = 0.05,
+    segments: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Aggregated experiment matching a transaction frame (one row per
+    variation, or per variation and segment columns, visitors derived from the
+    purchasers and the conversion rate), with the revenue metrics
+    TransactionEnricher recalculates.
+    """
+    grouped = transactions.groupby(['variation'] + list(segments or []), sort=False)
+    frame = pd.DataFrame({
+        'purchases': grouped['user_id'].nunique(),
+        'revenue': grouped['revenue'].sum().round(2),
+    }).reset_index()
+    frame['users'] = np.ceil(frame['purchases'] / conversion_rate).astype(np.int64)
+
+    metrics_config = [
+        {'name': 'Conversion Rate', 'column': 'purchases', 'type': 'conversion'},
+        {'name': 'Revenue', 'column': 'revenue', 'type': 'revenue'},
+        {'name': 'AOV', 'column': 'revenue', 'type': 'revenue',
+         'numerator_column': 'revenue', 'denominator_column': 'purchases'},
+        {'name': 'Revenue per user', 'column': 'revenue', 'type': 'revenue',
+         'numerator_column': 'revenue', 'denominator_column': 'users'},
+    ]
+    return frame, metrics_config
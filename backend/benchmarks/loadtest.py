@@ -0,0 +1,333 @@
+"""
+Load test of the HTTP API: concurrent virtual users replaying the frontend flow
+analyze -> poll -> results -> filters -> enrich -> filtered enrich on
+generated payloads.
+
+Usage (from the backend directory):
+    # Against a running deployment (e.g. gunicorn with 4 workers)
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 16 --duration 120
+
+    # Against an in-process uvicorn server
+    python -m benchmarks.loadtest --in-process --users 8 --iterations 3 --output loadtest.json
+
+Reports latency percentiles per endpoint, throughput, error rates and the
+process memory (from /metrics) sampled over the run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .generators import generate_transactions, experiment_for_transactions
+
+SEGMENT_COLUMN = 'dimension_0'
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class FlowError(Exception):
+    """A request of a flow failed; the rest of the flow is skipped"""
+
+
+class LoadStats:
+    """Latencies and errors per endpoint, plus memory samples"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.error_messages: Dict[str, str] = {}
+        self.flows_completed = 0
+        self.flows_failed = 0
+        self.memory_samples: List[Dict[str, Any]] = []
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if error is not None:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            self.error_messages.setdefault(endpoint, error)
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            latencies = np.array(values) * 1000
+            errors = self.errors.get(endpoint, 0)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': errors,
+                'error_rate': round(errors / len(values), 4),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+                'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+                'max_ms': round(float(latencies.max()), 2),
+                'first_error': self.error_messages.get(endpoint),
+            }
+
+        total_requests = sum(len(values) for values in self.latencies.values())
+        rss = [sample['rss_bytes'] for sample in self.memory_samples if sample.get('rss_bytes') is not None]
+        return {
+            'duration_seconds': round(duration, 3),
+            'requests': total_requests,
+            'requests_per_second': round(total_requests / duration, 2) if duration > 0 else None,
+            'errors': sum(self.errors.values()),
+            'flows_completed': self.flows_completed,
+            'flows_failed': self.flows_failed,
+            'flows_per_second': round(self.flows_completed / duration, 3) if duration > 0 else None,
+            'endpoints': endpoints,
+            'memory': {
+                'rss_start_bytes': rss[0] if rss else None,
+                'rss_end_bytes': rss[-1] if rss else None,
+                'rss_max_bytes': max(rss) if rss else None,
+                'rss_growth_bytes': rss[-1] - rss[0] if rss else None,
+                'samples': self.memory_samples,
+            },
+        }
+
+
+def build_flow_payloads(seed: int, args) -> Dict[str, Any]:
+    """Analysis payload, transactions and segment values of one flow"""
+    transactions = generate_transactions(
+        args.transactions, variations=args.variations, dimensions=1,
+        cardinality=args.cardinality, seed=seed
+    )
+    experiment, metrics = experiment_for_transactions(
+        transactions, args.conversion_rate, segments=[SEGMENT_COLUMN]
+    )
+    # Identifiants textuels, comme dans les exports CSV
+    transactions['transaction_id'] = 'tx_' + transactions['transaction_id'].astype(str)
+    transactions['user_id'] = 'user_' + transactions['user_id'].astype(str)
+    return {
+        'analysis': {
+            'data': experiment.to_dict('records'),
+            'metrics_config': metrics,
+            'variation_column': 'variation',
+            'data_type': 'aggregated',
+        },
+        'transactions': transactions.to_dict('records'),
+        'segments': sorted(experiment[SEGMENT_COLUMN].unique().tolist()),
+    }
+
+
+async def timed_request(
+    client: httpx.AsyncClient, stats: LoadStats, endpoint: str, method: str, path: str, **kwargs
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        stats.record(endpoint, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+        raise FlowError(endpoint)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        stats.record(endpoint, elapsed, f"HTTP {response.status_code}: {response.text[:200]}")
+        raise FlowError(endpoint)
+    stats.record(endpoint, elapsed)
+    return response.json()
+
+
+async def wait_for_job(client: httpx.AsyncClient, stats: LoadStats, job_id: str, args) -> Dict[str, Any]:
+    """Poll the job status like the frontend, then fetch its results"""
+    deadline = time.monotonic() + args.job_timeout
+    while True:
+        status = await timed_request(client, stats, 'GET /api/status/{job_id}', 'GET', f"/api/status/{job_id}")
+        if status['status'] in TERMINAL_STATUSES:
+            break
+        if time.monotonic() > deadline:
+            stats.record('job_timeout', args.job_timeout, f"Job {job_id} still {status['status']}")
+            raise FlowError('job_timeout')
+        await asyncio.sleep(args.poll_interval)
+
+    if status['status'] != 'completed':
+        stats.record('job_failed', 0.0, f"Job {job_id} {status['status']}: {status.get('error')}")
+        raise FlowError('job_failed')
+    return await timed_request(client, stats, 'GET /api/results/{job_id}', 'GET', f"/api/results/{job_id}")
+
+
+async def run_flow(client: httpx.AsyncClient, stats: LoadStats, payloads: Dict[str, Any], args):
+    analysis = await timed_request(client, stats, 'POST /api/analyze', 'POST', '/api/analyze', json=payloads['analysis'])
+    job_id = analysis['job_id']
+    await wait_for_job(client, stats, job_id, args)
+
+    filter_job_ids = []
+    for segment in payloads['segments'][:args.filters]:
+        filtered = await timed_request(
+            client, stats, 'POST /api/analyze/filter', 'POST', '/api/analyze/filter',
+            json={'job_id': job_id, 'filters': {SEGMENT_COLUMN: [segment]}}
+        )
+        await wait_for_job(client, stats, filtered['job_id'], args)
+        filter_job_ids.append((segment, filtered['job_id']))
+
+    enrichment = await timed_request(
+        client, stats, 'POST /api/analyze/enrich-transaction', 'POST', '/api/analyze/enrich-transaction',
+        json={'job_id': job_id, 'transaction_data': payloads['transactions']}
+    )
+    await wait_for_job(client, stats, enrichment['job_id'], args)
+
+    for segment, filter_job_id in filter_job_ids:
+        filtered_enrichment = await timed_request(
+            client, stats, 'POST /api/analyze/enrich-transaction-filtered', 'POST',
+            '/api/analyze/enrich-transaction-filtered',
+            json={
+                'job_id': enrichment['job_id'],
+                'original_job_id': filter_job_id,
+                'transaction_filters': {SEGMENT_COLUMN: [segment]},
+            }
+        )
+        await wait_for_job(client, stats, filtered_enrichment['job_id'], args)
+
+
+async def virtual_user(user: int, client: httpx.AsyncClient, stats: LoadStats, args, stop_at: Optional[float]):
+    iteration = 0
+    while (stop_at is None and iteration < args.iterations) or (stop_at is not None and time.monotonic() < stop_at):
+        # Données différentes à chaque flux pour ne pas mesurer la déduplication
+        payloads = build_flow_payloads(args.seed + user * 100_000 + iteration, args)
+        try:
+            await run_flow(client, stats, payloads, args)
+            stats.flows_completed += 1
+        except FlowError:
+            stats.flows_failed += 1
+        iteration += 1
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled samples of a Prometheus text exposition"""
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#') or '{' in line:
+            continue
+        name, _, value = line.partition(' ')
+        try:
+            values[name] = float(value)
+        except ValueError:
+            continue
+    return values
+
+
+async def sample_memory(client: httpx.AsyncClient, stats: LoadStats, interval: float, started: float, done: asyncio.Event):
+    """Record the server RSS, queue depth and in-flight jobs from /metrics"""
+    while True:
+        try:
+            response = await client.get('/metrics')
+            values = parse_metrics(response.text) if response.status_code == 200 else {}
+        except httpx.HTTPError:
+            values = {}
+        stats.memory_samples.append({
+            'elapsed_seconds': round(time.monotonic() - started, 2),
+            'rss_bytes': values.get('process_resident_memory_bytes'),
+            'queue_depth': values.get('ab_job_queue_depth'),
+            'in_flight': values.get('ab_jobs_in_flight'),
+        })
+        if done.is_set():
+            return
+        try:
+            await asyncio.wait_for(done.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load_test(base_url: str, args) -> Dict[str, Any]:
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=args.users * 2 + 2)
+    timeout = httpx.Timeout(args.request_timeout)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.monotonic()
+        stop_at = started + args.duration if args.duration else None
+        done = asyncio.Event()
+        sampler = asyncio.create_task(sample_memory(client, stats, args.memory_interval, started, done))
+        await asyncio.gather(*(virtual_user(user, client, stats, args, stop_at) for user in range(args.users)))
+        duration = time.monotonic() - started
+        done.set()
+        await sampler
+    return stats.report(duration)
+
+
+def start_in_process_server() -> Tuple[str, Any]:
+    """Start the app with uvicorn in a background thread on a free local port"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("In-process server failed to start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['requests']} requests in {report['duration_seconds']}s "
+          f"({report['requests_per_second']} req/s), {report['flows_completed']} flows completed, "
+          f"{report['flows_failed']} failed, {report['errors']} errors", file=sys.stderr)
+    print(f"  {'endpoint':<50} {'n':>6} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9}", file=sys.stderr)
+    for endpoint, values in report['endpoints'].items():
+        print(f"  {endpoint:<50} {values['requests']:>6} {values['error_rate'] * 100:>5.1f}% "
+              f"{values['p50_ms']:>7.1f}ms {values['p95_ms']:>7.1f}ms {values['p99_ms']:>7.1f}ms", file=sys.stderr)
+    memory = report['memory']
+    if memory['rss_start_bytes'] is not None:
+        print(f"  RSS {memory['rss_start_bytes'] / 2**20:.0f} MB -> {memory['rss_end_bytes'] / 2**20:.0f} MB "
+              f"(max {memory['rss_max_bytes'] / 2**20:.0f} MB)", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the analysis API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Base URL of a running server")
+    target.add_argument('--in-process', action='store_true', help="Start the app with uvicorn in this process")
+    parser.add_argument('--users', type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument('--iterations', type=int, default=3, help="Flows per user (ignored with --duration)")
+    parser.add_argument('--duration', type=float, help="Run for this many seconds instead of a fixed number of flows")
+    parser.add_argument('--filters', type=int, default=3, help="Filtered analyses (and filtered enrichments) per flow")
+    parser.add_argument('--transactions', type=int, default=2000, help="Transactions uploaded per flow")
+    parser.add_argument('--variations', type=int, default=2)
+    parser.add_argument('--cardinality', type=int, default=5, help="Segments of the filter dimension")
+    parser.add_argument('--conversion-rate', type=float, default=0.05)
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument('--job-timeout', type=float, default=300)
+    parser.add_argument('--request-timeout', type=float, default=60)
+    parser.add_argument('--memory-interval', type=float, default=2, help="Seconds between /metrics samples")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file to write")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if args.in_process:
+        base_url, server = start_in_process_server()
+
+    try:
+        report = asyncio.run(run_load_test(base_url, args))
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'target': 'in-process' if args.in_process else base_url,
+        'config': vars(args),
+        **report,
+    }
+    print_report(report)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
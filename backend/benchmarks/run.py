@@ -0,0 +1,273 @@
+"""
+Benchmark suite: times each stage of the analysis pipeline on synthetic
+experiments and writes machine-readable results.
+
+Usage (from the backend directory):
+    python -m benchmarks.run --scales 10k,1m,10m --output benchmarks/results/current.json
+    python -m benchmarks.run --scales 10k --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from app.analysis.analyzer import ABTestAnalyzer
+from app.analysis.transaction_enricher import TransactionEnricher
+from app.models import MetricConfig, MultipleTestingCorrection, StatisticalMethod
+from app.utils.data_validator import DataValidator
+from app.utils.json_encoder import clean_json_nan
+from app.utils.transaction_store import prepare_transaction_frame
+
+from .generators import (
+    generate_aggregated,
+    generate_raw,
+    generate_transactions,
+    experiment_for_transactions
+)
+
+SHAPES = ['aggregated', 'raw', 'transactions']
+SCALE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_scale(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500"""
+    value = value.strip().lower()
+    if value[-1:] in SCALE_SUFFIXES:
+        return int(float(value[:-1]) * SCALE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+class StageTimer:
+    """Collects wall-clock seconds per named stage (min over repeats) and stage errors"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.errors: Dict[str, str] = {}
+
+    def run(self, name: str, func: Callable[[], Any]) -> Any:
+        # Une étape en erreur n'a pas de durée: elle fausserait --compare
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+            return None
+        self.stages.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'stages': {name: round(min(times), 6) for name, times in self.stages.items()},
+            'errors': self.errors,
+        }
+
+
+def _analyzer(args) -> ABTestAnalyzer:
+    return ABTestAnalyzer(
+        confidence_level=95.0,
+        statistical_method=StatisticalMethod.FREQUENTIST,
+        multiple_testing_correction=MultipleTestingCorrection(args.correction)
+    )
+
+
+def bench_analysis(timer: StageTimer, df: pd.DataFrame, metrics: List[Dict[str, Any]], data_type: str, args):
+    """Stages of run_analysis, called one by one on the same frame"""
+    user_column = 'user_id' if data_type == 'raw' else None
+    metrics_config = [MetricConfig(**metric) for metric in metrics]
+
+    if len(df) <= args.records_max_rows:
+        records = df.to_dict('records')
+        timer.run('records_to_frame', lambda: pd.DataFrame(records))
+        del records
+
+    validator = DataValidator(variation_column='variation')
+    cleaned = timer.run('validation', lambda: validator.validate_and_clean_frame(df))
+    if cleaned is None:
+        return
+
+    analyzer = _analyzer(args)
+    variations = list(cleaned['variation'].unique())
+    control = analyzer._identify_control(variations)
+    treatments = [variation for variation in variations if variation != control]
+
+    timer.run('dimension_detection', lambda: analyzer._identify_dimension_columns(cleaned, 'variation', user_column))
+
+    metric_results = []
+    for metric_config in metrics_config:
+        result = timer.run(
+            f"metric:{metric_config.name}",
+            lambda: analyzer._analyze_metric(cleaned, metric_config, 'variation', control, treatments, user_column, data_type)
+        )
+        if result is not None:
+            metric_results.append(result)
+
+    if analyzer.multiple_testing_correction != MultipleTestingCorrection.NONE:
+        timer.run('correction', lambda: analyzer.correction_handler.apply_correction(
+            [dict(result) for result in metric_results], analyzer.multiple_testing_correction, analyzer.alpha
+        ))
+
+    overall = timer.run('summary', lambda: analyzer._calculate_overall_results(
+        cleaned, 'variation', control, treatments, metric_results, None, data_type, validator.profile
+    ))
+
+    results = {'overall_results': overall, 'metric_results': metric_results}
+    timer.run('serialization', lambda: json.dumps(clean_json_nan(results), default=str))
+
+    # Chemin complet (validation + analyse) tel qu'exécuté par un job
+    timer.run('end_to_end', lambda: _analyzer(args).analyze_frame(
+        DataValidator(variation_column='variation').validate_and_clean_frame(df),
+        metrics_config, 'variation', user_column, data_type
+    ))
+
+
+def bench_transactions(timer: StageTimer, transactions: pd.DataFrame, args):
+    """Transaction preparation and enrichment stages"""
+    experiment, metrics = experiment_for_transactions(transactions, args.conversion_rate)
+    original_results = timer.run('baseline_analysis', lambda: _analyzer(args).analyze_frame(
+        experiment, [MetricConfig(**metric) for metric in metrics], 'variation'
+    ))
+    if original_results is None:
+        return
+
+    # prepare_transaction_frame modifie ses colonnes: on lui passe des enregistrements ou une copie
+    source = transactions.to_dict('records') if len(transactions) <= args.records_max_rows else transactions.copy()
+    frame = timer.run('transaction_prepare', lambda: prepare_transaction_frame(source))
+    del source
+    if frame is None:
+        return
+
+    enricher = TransactionEnricher(original_results, transaction_frame=frame)
+    timer.run('transaction_validation', enricher.validate_transaction_data)
+    user_data = timer.run('user_aggregation', enricher.aggregate_by_user)
+    for metric_name in enricher._identify_revenue_metrics():
+        timer.run(f"enrichment:{metric_name}", lambda: enricher.recalculate_statistics(metric_name, user_data))
+
+    enriched = timer.run('enrichment_total', lambda: TransactionEnricher(
+        original_results, transaction_frame=frame
+    ).enrich_results())
+    timer.run('serialization', lambda: json.dumps(clean_json_nan(enriched), default=str))
+
+
+def run_case(shape: str, rows: int, args) -> Dict[str, Any]:
+    timer = StageTimer()
+    start = time.perf_counter()
+    if shape == 'transactions':
+        transactions = generate_transactions(
+            rows, variations=args.variations, dimensions=args.dimensions,
+            cardinality=args.cardinality, seed=args.seed
+        )
+        generated = time.perf_counter() - start
+        for _ in range(args.repeat):
+            bench_transactions(timer, transactions, args)
+    else:
+        generator = generate_aggregated if shape == 'aggregated' else generate_raw
+        df, metrics = generator(
+            rows, variations=args.variations, metrics=args.metrics, dimensions=args.dimensions,
+            cardinality=args.cardinality, conversion_rate=args.conversion_rate, seed=args.seed
+        )
+        generated = time.perf_counter() - start
+        for _ in range(args.repeat):
+            bench_analysis(timer, df, metrics, shape, args)
+
+    return {'shape': shape, 'rows': rows, 'generation_seconds': round(generated, 6), **timer.summary()}
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Per-stage speed ratio (baseline / current, > 1 means faster) for matching cases"""
+    baseline_cases = {(case['shape'], case['rows']): case for case in baseline.get('results', [])}
+    lines = []
+    for case in current['results']:
+        previous = baseline_cases.get((case['shape'], case['rows']))
+        if previous is None:
+            continue
+        lines.append(f"{case['shape']} @ {case['rows']} rows")
+        for stage, seconds in case['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None:
+                continue
+            ratio = before / seconds if seconds > 0 else float('inf')
+            lines.append(f"  {stage:<40} {before:>10.4f}s -> {seconds:>10.4f}s  x{ratio:.2f}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the A/B analysis pipeline on synthetic data")
+    parser.add_argument('--scales', default='10k,1m,10m', help="Comma-separated row counts (10k, 1m, 10m...)")
+    parser.add_argument('--shapes', default=','.join(SHAPES), help="Comma-separated input shapes")
+    parser.add_argument('--variations', type=int, default=2)
+    parser.add_argument('--metrics', type=int, default=4)
+    parser.add_argument('--dimensions', type=int, default=2)
+    parser.add_argument('--cardinality', type=int, default=5)
+    parser.add_argument('--conversion-rate', type=float, default=0.05)
+    parser.add_argument('--correction', default='none', choices=[c.value for c in MultipleTestingCorrection])
+    parser.add_argument('--records-max-rows', type=int, default=1_000_000,
+                        help="Largest scale for which the records -> DataFrame conversion is timed")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case (minimum time is kept)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file to write")
+    parser.add_argument('--compare', help="Previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    shapes = [shape.strip() for shape in args.shapes.split(',') if shape.strip()]
+    unknown = [shape for shape in shapes if shape not in SHAPES]
+    if unknown:
+        parser.error(f"Unknown shapes: {unknown} (expected {SHAPES})")
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'config': vars(args),
+        'results': [],
+    }
+    for rows in [parse_scale(scale) for scale in args.scales.split(',') if scale.strip()]:
+        for shape in shapes:
+            print(f"[{datetime.utcnow().isoformat()}] {shape} @ {rows} rows", file=sys.stderr)
+            case = run_case(shape, rows, args)
+            report['results'].append(case)
+            for stage, seconds in case['stages'].items():
+                print(f"  {stage:<40} {seconds:>10.4f}s", file=sys.stderr)
+            for stage, error in case['errors'].items():
+                print(f"  {stage:<40} ERROR {error}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(compare(report, json.load(f))), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration (loaded automatically from the backend directory):
+    gunicorn app.main:app
+
+The application is imported once in the master (preload) and, when
+WARMUP_ON_STARTUP is set, warmed up there before the workers are forked,
+so every worker shares the already imported and initialised modules
+(copy-on-write) instead of paying the imports and first-call costs itself.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    """Warm-up in the master, before the workers are forked"""
+    if not preload_app or os.getenv("WARMUP_ON_STARTUP", "false").lower() != "true":
+        return
+    from app.main import startup_timings, warm_up
+
+    seconds = warm_up()
+    server.log.info(
+        "Preloaded app: imports %.3fs, warm-up %.3fs (shared by %d workers)",
+        startup_timings["import_seconds"], seconds, workers
+    )
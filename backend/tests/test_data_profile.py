@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from app.utils.data_profile import DataProfile, HyperLogLog, SpaceSaving
+
+
+def _hashes(values) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def test_hyperloglog_count_within_tolerance():
+    cardinality = 200_000
+    counter = HyperLogLog(precision=14)
+    # Doublons: chaque valeur est vue deux fois
+    counter.add_hashes(_hashes(np.arange(cardinality)))
+    counter.add_hashes(_hashes(np.arange(cardinality)))
+
+    tolerance = DataProfile(pd.DataFrame({'a': [1]}), exact_max_rows=0).distinct_tolerance
+    assert abs(counter.count() - cardinality) / cardinality <= tolerance
+
+
+def test_hyperloglog_small_cardinality_uses_linear_counting():
+    counter = HyperLogLog(precision=14)
+    counter.add_hashes(_hashes(np.arange(100)))
+    assert abs(counter.count() - 100) <= 2
+
+
+def test_hyperloglog_merge_matches_single_counter():
+    values = np.arange(50_000)
+    single = HyperLogLog()
+    single.add_hashes(_hashes(values))
+
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add_hashes(_hashes(values[:30_000]))
+    right.add_hashes(_hashes(values[20_000:]))
+    left.merge(right)
+
+    assert left.count() == single.count()
+
+
+def test_space_saving_top_k_on_skewed_stream():
+    rng = np.random.default_rng(0)
+    stream = pd.Series(rng.zipf(1.3, size=200_000))
+    stream = stream[stream < 10_000]
+    true_counts = stream.value_counts()
+
+    summary = SpaceSaving(capacity=64)
+    for start in range(0, len(stream), 10_000):
+        summary.add_counts(stream.iloc[start:start + 10_000].value_counts())
+
+    top = summary.top(5)
+    assert [value for value, _ in top] == true_counts.index[:5].tolist()
+    for value, count in top:
+        # Bornes supérieures, surestimées d'au plus floor
+        assert true_counts[value] <= count <= true_counts[value] + summary.floor
+
+
+def test_approximate_profile_matches_exact_profile():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'user_id': np.arange(60_000),
+        'country': rng.choice(['FR', 'DE', 'ES', 'IT'], size=60_000, p=[0.55, 0.25, 0.15, 0.05]),
+    })
+    exact = DataProfile(df).column_stats()
+    approximate_profile = DataProfile(df, exact_max_rows=1_000, chunk_size=7_000)
+    approximate = approximate_profile.column_stats()
+
+    assert not approximate_profile.exact
+    tolerance = approximate_profile.distinct_tolerance
+    assert abs(approximate['user_id']['unique_values'] - 60_000) / 60_000 <= tolerance
+    assert approximate['country']['unique_values'] == exact['country']['unique_values']
+    # Peu de valeurs distinctes: les comptes du résumé sont exacts
+    assert approximate['country']['most_common'] == exact['country']['most_common']
+
+
+def test_exact_profile_keeps_dimension_values_per_group():
+    df = pd.DataFrame({
+        'variation': ['A', 'A', 'B', 'B'],
+        'device': ['mobile', 'desktop', 'mobile', 'desktop'],
+        'cohort': ['c1', 'c1', 'c2', 'c2'],
+    })
+    stats = DataProfile(df, group_column='variation').column_stats()
+
+    assert sorted(stats['device']['values']) == ['desktop', 'mobile']
+    assert stats['device']['max_groups_per_value'] == 2
+    # Une valeur par variation: pas une dimension
+    assert stats['cohort']['max_groups_per_value'] == 1
+    assert 'values' not in stats['variation']
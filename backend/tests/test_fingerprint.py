@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from app.utils.fingerprint import (
+    combine_fingerprint_parts,
+    format_transaction_fingerprint,
+    reduce_row_hashes,
+    transaction_fingerprint,
+    transaction_row_hashes,
+)
+
+
+def _transactions(start: int, count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(start)
+    return pd.DataFrame({
+        'transaction_id': [f"t{i}" for i in range(start, start + count)],
+        'user_id': [f"u{i % 37}" for i in range(start, start + count)],
+        'variation': rng.choice(['A', 'B'], size=count),
+        'revenue': rng.gamma(2.0, 20.0, size=count).round(2),
+        'quantity': rng.integers(1, 4, size=count),
+    })
+
+
+def test_combined_parts_match_fingerprint_of_concatenated_rows():
+    existing, appended = _transactions(0, 500), _transactions(500, 120)
+
+    parts = combine_fingerprint_parts(
+        reduce_row_hashes(transaction_row_hashes(existing, 'user_id')),
+        reduce_row_hashes(transaction_row_hashes(appended, 'user_id'))
+    )
+    fresh = transaction_fingerprint(pd.concat([existing, appended], ignore_index=True), 'user_id')
+
+    assert format_transaction_fingerprint(parts) == fresh
+
+
+def test_fingerprint_ignores_row_order():
+    df = _transactions(0, 300)
+    shuffled = df.sample(frac=1, random_state=3).reset_index(drop=True)
+    assert transaction_fingerprint(df) == transaction_fingerprint(shuffled)
+
+
+def test_fingerprint_changes_with_user_assignment():
+    df = _transactions(0, 300)
+    reassigned = df.assign(user_id=df['user_id'].iloc[::-1].to_numpy())
+
+    assert transaction_fingerprint(df) == transaction_fingerprint(reassigned)
+    assert transaction_fingerprint(df, 'user_id') != transaction_fingerprint(reassigned, 'user_id')
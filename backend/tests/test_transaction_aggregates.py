@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from app.analysis.transaction_aggregates import TransactionAggregates, TransactionIdIndex
+from app.utils.fingerprint import transaction_fingerprint
+
+
+def _transactions(ids) -> pd.DataFrame:
+    ids = list(ids)
+    return pd.DataFrame({
+        'transaction_id': [f"t{i}" for i in ids],
+        'user_id': [f"u{i % 11}" for i in ids],
+        'variation': ['A' if i % 2 else 'B' for i in ids],
+        'revenue': [10.0 + i % 7 for i in ids],
+        'quantity': [1] * len(ids),
+    })
+
+
+def test_add_new_skips_known_and_repeated_ids_across_buffer_merge():
+    index = TransactionIdIndex()
+    index.MIN_BUFFER = 8
+
+    first = index.add_new(pd.Series([f"t{i}" for i in range(20)]))
+    assert first.all()
+    # Le tampon a dépassé MIN_BUFFER: tout est passé dans le tableau principal
+    assert len(index._buffer) == 0 and len(index._main) == 20
+
+    # Ids connus (tableau principal), répétés dans le lot, puis connus du tampon
+    batch = pd.Series(['t3', 't20', 't21', 't20', 't19'])
+    assert index.add_new(batch).tolist() == [False, True, True, False, False]
+    assert len(index._buffer) == 2
+    assert index.add_new(pd.Series(['t21', 't22'])).tolist() == [False, True]
+
+    # Après une nouvelle fusion, les ids du tampon restent connus
+    index.add_new(pd.Series([f"t{i}" for i in range(23, 40)]))
+    assert len(index._buffer) == 0
+    assert not index.add_new(pd.Series(['t0', 't20', 't22', 't39'])).any()
+    assert len(index) == 40
+
+
+def test_append_matches_aggregates_of_concatenated_rows():
+    initial, appended = _transactions(range(200)), _transactions(range(150, 260))
+    aggregates = TransactionAggregates(initial)
+
+    added, affected = aggregates.append(appended)
+
+    expected = pd.concat([initial, appended.iloc[50:]], ignore_index=True)
+    fresh = TransactionAggregates(expected)
+    assert len(added) == 60
+    assert affected == {'A', 'B'}
+    assert aggregates.row_count == len(expected)
+    assert aggregates.transaction_hash == fresh.transaction_hash
+    assert aggregates.transaction_hash == transaction_fingerprint(expected, 'user_id')
+    for variation, table in fresh.variation_table.items():
+        current = aggregates.variation_table[variation]
+        assert current['fingerprint'] == table['fingerprint']
+        assert current['count'] == table['count']
+        assert np.isclose(current['sum'], table['sum'])
+        assert np.isclose(current['var'], table['var'])
+    assert aggregates.user_variation_table == fresh.user_variation_table
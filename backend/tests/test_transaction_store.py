@@ -0,0 +1,31 @@
+import pandas as pd
+
+from app.utils.transaction_store import TransactionStore, prepare_transaction_frame
+
+
+def _transactions(stores):
+    return [
+        {'transaction_id': f"t{i}", 'variation': 'A' if i % 2 else 'B', 'revenue': 10.0 + i, 'store': store}
+        for i, store in enumerate(stores)
+    ]
+
+
+def test_list_filter_matches_integer_column_with_missing_values():
+    stores = [[0, 1, 2, None][i % 4] for i in range(30)]
+    frame = prepare_transaction_frame(_transactions(stores))
+    # Entiers avec valeurs manquantes: colonne float64, 1.0 doit correspondre à "1"
+    assert pd.api.types.is_float_dtype(frame['store'])
+
+    filtered = TransactionStore(frame).frame({'store': ['1']})
+
+    assert len(filtered) == stores.count(1) + stores.count(None)
+    assert set(filtered['store'].dropna()) == {1.0}
+
+
+def test_list_filter_on_dictionary_encoded_column():
+    stores = ['paris', 'lyon', 'paris', None, 'lille', 'paris'] * 5
+    store = TransactionStore(prepare_transaction_frame(_transactions(stores)))
+
+    filtered = store.frame({'store': ['paris', 'lille']})
+
+    assert len(filtered) == stores.count('paris') + stores.count('lille') + stores.count(None)
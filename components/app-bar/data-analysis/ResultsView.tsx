@@ -246,23 +246,14 @@ export const ResultsView = forwardRef<ResultsViewRef, ResultsViewProps>(({
         // Wait for filtered analysis to complete
         const filteredResults = await analysisAPI.getResults(response.job_id)
 
-        // Apply the same filters to transaction data
-        const filteredTransactionData = applyFiltersToTransactionData(transactionData, newFilters)
-
-        // Check if we have any transaction data left after filtering
-        if (filteredTransactionData.length === 0) {
-          setFilteredResults(filteredResults.results)
-          return
-        }
-
-        // Now enrich the filtered results with filtered transaction data using the new endpoint
+        // Now enrich the filtered results: the backend applies the same filters to its cached transactions
         // CRITIQUE: Utiliser l'originalJobId (celui qui a été enrichi) pour trouver le cache
         // response.job_id = analyse filtrée, originalJobId = analyse originale enrichie
         const cacheJobId = enrichedJobId || originalJobId // Fallback to original prop if no enriched
         
         const enrichmentResponse = await analysisAPI.enrichWithFilteredTransactionData(
           cacheJobId!, // Job ID de l'enrichissement original (celui qui a le cache)
-          filteredTransactionData,
+          newFilters,
           response.job_id // Job ID de l'analyse filtrée (pour référence)
         )
 
@@ -311,32 +302,6 @@ export const ResultsView = forwardRef<ResultsViewRef, ResultsViewProps>(({
     }
   }, [originalData, metrics, variationColumn, userColumn, dataType, confidenceLevel, statisticalMethod, multipleTestingCorrection, analysisResults, enrichedJobId, transactionData, originalJobId])
 
-  // Helper function to apply filters to transaction data
-  const applyFiltersToTransactionData = (transactionData: Record<string, unknown>[], filters: Record<string, string[]>): Record<string, unknown>[] => {
-    if (!filters || Object.keys(filters).length === 0) {
-      return transactionData
-    }
-
-
-    const filteredData = transactionData.filter(transaction => {
-      const matchesAllFilters = Object.entries(filters).every(([dimension, allowedValues]) => {
-        const transactionValue = transaction[dimension]
-        
-        // If the dimension doesn't exist in transaction data, skip this filter
-        if (transactionValue === null || transactionValue === undefined) {
-          return true // Don't filter out records for missing dimensions
-        }
-        
-        return allowedValues.includes(String(transactionValue))
-      })
-      
-      return matchesAllFilters
-    })
-
-
-    return filteredData
-  }
-
   // Use filtered results if available, otherwise use original
   const currentResults = filteredResults || analysisResults
 
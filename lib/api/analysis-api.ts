@@ -10,6 +10,7 @@ export interface AnalysisConfig {
   statistical_method: 'frequentist' | 'bayesian' | 'bootstrap'
   multiple_testing_correction: 'none' | 'bonferroni' | 'fdr'
   filters?: Record<string, string[]>
+  duplicate_key_columns?: string[]
 }
 
 export interface MetricConfig {
@@ -110,12 +111,18 @@ export interface OverallResults {
   total_variations: number
 }
 
+export interface DataQuality {
+  duplicate_rows: number
+  duplicate_rows_by_variation: Record<string, number>
+}
+
 export interface AnalysisResults {
   overall_results: OverallResults
   metric_results: MetricResult[]
   analysis_duration_seconds?: number
   warnings: string[]
   recommendations: string[]
+  data_quality?: DataQuality
 }
 
 export interface GetResultsResponse {
@@ -125,7 +132,18 @@ export interface GetResultsResponse {
   completed_at: string
 }
 
+// Identifiant propre à chaque onglet : un filtre plus récent du même onglet
+// remplace ses filtres encore en file d'attente, sans toucher aux autres onglets
+function generateClientId(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID()
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+}
+
 export class AnalysisAPI {
+  private readonly clientId = generateClientId()
+
   private async makeRequest<T>(
     endpoint: string, 
     options: RequestInit = {}
@@ -187,7 +205,7 @@ export class AnalysisAPI {
       '/api/analyze/filter',
       {
         method: 'POST',
-        body: JSON.stringify({ job_id: jobId, filters }),
+        body: JSON.stringify({ job_id: jobId, filters, client_id: this.clientId }),
       }
     )
   }
@@ -210,16 +228,17 @@ export class AnalysisAPI {
 
   async enrichWithFilteredTransactionData(
     jobId: string,
-    transactionData: Array<Record<string, unknown>>,
+    transactionFilters: Record<string, unknown>,
     originalJobId?: string
-  ): Promise<{ job_id: string; parent_job_id: string; transaction_records: number; cached_records: number }> {
-    return this.makeRequest<{ job_id: string; parent_job_id: string; transaction_records: number; cached_records: number }>(
+  ): Promise<{ job_id: string; parent_job_id: string; transaction_records: number | null; cached_records: number }> {
+    // Les transactions sont filtrées côté serveur à partir du cache: seuls les filtres sont envoyés
+    return this.makeRequest<{ job_id: string; parent_job_id: string; transaction_records: number | null; cached_records: number }>(
       '/api/analyze/enrich-transaction-filtered',
       {
         method: 'POST',
         body: JSON.stringify({ 
           job_id: jobId, 
-          transaction_data: transactionData,
+          transaction_filters: transactionFilters,
           original_job_id: originalJobId
         }),
       }